@@ -10,8 +10,6 @@ PRODTOOLS_PATH = os.path.dirname(os.path.realpath(__file__))
 
 CURRENT_DIR_PARENT_PATH = os.path.dirname(os.getcwd())
 CURRENT_NAME = os.path.basename(os.getcwd())
-print(CURRENT_DIR_PARENT_PATH)
-print(CURRENT_NAME)
 
 BIN_PATH = CURRENT_DIR_PARENT_PATH
 BIN_MARKUP_PATH = path_join(BIN_PATH, 'markup')
@@ -19,11 +17,6 @@ BIN_MARKUP_PATH = path_join(BIN_PATH, 'markup')
 XC_SERVER_CONFIG_PATH = path_join(CURRENT_DIR_PARENT_PATH, 'config')
 LOG_PATH = path_join(CURRENT_DIR_PARENT_PATH, 'logs')
 
-if not os.path.isdir(LOG_PATH):
-    os.makedirs(LOG_PATH)
-if not os.path.isdir(BIN_MARKUP_PATH):
-    os.makedirs(BIN_MARKUP_PATH)
-
 TABLES_PATH = path_join(PRODTOOLS_PATH, 'settings', 'tables')
 LOCALE_PATH = path_join(PRODTOOLS_PATH, 'locale')
 FST_PATH = path_join(PRODTOOLS_PATH, 'settings', 'fst')
@@ -35,4 +28,5 @@ XPM_VERSION_FILE_PATH = path_join(PRODTOOLS_PATH, 'xpm_version.txt')
 
 ICON = path_join(PRODTOOLS_PATH, 'settings', 'Scielo.ico')
 
-_ = app_texts.get_texts(LOCALE_PATH)
+# o catálogo de textos é carregado na primeira chamada
+_ = app_texts.LazyTexts(LOCALE_PATH)
@@ -0,0 +1,207 @@
+# coding=utf-8
+"""
+Substituto local do CISIS (mx, id2i, i2id, crunchmf) para o benchmark
+
+Implementa somente os comandos usados por `dbm_isis.CISIS`. A "base" é o
+próprio arquivo ID gravado em <base>.mst (<base>.xrf fica vazio) e o
+índice gerado por `fullinv` (e atualizado por `ifupd`) tem como termos os valores dos campos e, nos
+registros de fascículo, ISSN + rótulo do fascículo (como em issue.fst);
+é gravado em JSON em <invertido>.ifp.
+Cada comando é um processo, como no CISIS, de modo que a quantidade e o
+custo dos subprocessos da conversão são mantidos.
+
+    make_cisis_path(path)  # cria os executáveis em `path`
+"""
+import os
+import sys
+import json
+import stat
+
+
+COMMANDS = ('mx', 'id2i', 'i2id', 'crunchmf')
+ENCODING = 'iso-8859-1'
+
+SCRIPT = """#!/bin/sh
+PYTHONPATH="{pythonpath}" exec "{python}" -m prodtools.benchmark.cisis {command} "$@"
+"""
+
+
+def make_cisis_path(path):
+    """
+    Cria em `path` os executáveis do CISIS substituto
+    """
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    pythonpath = os.path.dirname(
+        os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+    for command in COMMANDS:
+        file_path = os.path.join(path, command)
+        with open(file_path, 'w') as fp:
+            fp.write(SCRIPT.format(
+                pythonpath=pythonpath, python=sys.executable,
+                command=command))
+        os.chmod(file_path, os.stat(file_path).st_mode | stat.S_IEXEC)
+    return path
+
+
+def read_id_file(file_path):
+    """
+    Registros (sem a linha !ID) de um arquivo no formato ID
+    """
+    if not os.path.isfile(file_path):
+        return []
+    with open(file_path, encoding=ENCODING) as fp:
+        content = fp.read()
+    return [
+        record[record.find('\n') + 1:]
+        for record in content.split('!ID ')[1:]]
+
+
+def read_records(db):
+    return read_id_file(db + '.mst')
+
+
+def write_records(db, records, append=False):
+    records = (read_records(db) if append else []) + list(records)
+    with open(db + '.mst', 'w', encoding=ENCODING) as fp:
+        fp.write(format_records(records))
+    open(db + '.xrf', 'w').close()
+
+
+def format_records(records):
+    return ''.join(
+        '!ID {}\n{}'.format(str(i).zfill(6), record)
+        for i, record in enumerate(records, 1))
+
+
+def record_fields(record):
+    fields = {}
+    for line in record.splitlines():
+        if line.startswith('!v') and line[5:6] == '!':
+            fields.setdefault(int(line[2:5]), []).append(line[6:])
+    return fields
+
+
+def issue_label(fields):
+    def value(tag):
+        return fields.get(tag, [''])[0].split('^')[0]
+
+    label = ''
+    if value(32) in ('ahead', 'review'):
+        label = value(65)[:4]
+    for prefix, tag in (('v', 31), ('s', 131), ('n', 32), ('s', 132)):
+        if value(tag):
+            label += prefix + value(tag)
+    return label + value(41)
+
+
+def index_terms(record):
+    fields = record_fields(record)
+    terms = set()
+    for occs in fields.values():
+        for occ in occs:
+            if occ.split('^')[0]:
+                terms.add(occ.split('^')[0].upper())
+    if 930 in fields and 35 in fields:
+        label = issue_label(fields)
+        for tag in (35, 435, 935):
+            for occ in fields.get(tag, []):
+                terms.add((occ.split('^')[0] + label).upper())
+    return terms
+
+
+def fullinv(db, inverted):
+    index = {}
+    for mfn, record in enumerate(read_records(db)):
+        for term in index_terms(record):
+            index.setdefault(term, []).append(mfn)
+    with open(inverted + '.ifp', 'w') as fp:
+        json.dump(index, fp)
+
+
+def ifupd(db, inverted, first_mfn):
+    """
+    Acrescenta ao índice os registros a partir de `first_mfn` (1, 2, ...)
+    """
+    with open(inverted + '.ifp') as fp:
+        index = json.load(fp)
+    records = read_records(db)
+    for mfn in range(first_mfn - 1, len(records)):
+        for term in index_terms(records[mfn]):
+            index.setdefault(term, []).append(mfn)
+    with open(inverted + '.ifp', 'w') as fp:
+        json.dump(index, fp)
+
+
+def search(db, expression):
+    terms = [term.strip().upper() for term in expression.split(' OR ')]
+    if os.path.isfile(db + '.ifp'):
+        with open(db + '.ifp') as fp:
+            index = json.load(fp)
+    else:
+        index = {}
+    mfns = sorted(set(
+        mfn for term in terms for mfn in index.get(term, [])))
+    records = read_records(db)
+    return [records[mfn] for mfn in mfns]
+
+
+def mx(args):
+    options = dict(
+        arg.split('=', 1) for arg in args if '=' in arg)
+    databases = [
+        arg for arg in args
+        if '=' not in arg and not arg.startswith(('-', '+')) and
+        arg not in ('now', 'null', 'count', 'what')]
+    if args == ['what']:
+        print('CISIS Interface (benchmark stand-in)')
+        return
+    if '+control' in args:
+        print('nxtmfn={}'.format(len(read_records(databases[0])) + 1))
+        return
+    if 'fullinv' in options:
+        fullinv(databases[0], options['fullinv'])
+        return
+    if 'ifupd' in options:
+        ifupd(databases[0], options['ifupd'], int(options.get('from', 1)))
+        return
+    if 'null' in args:
+        records = []
+    elif 'iso' in options and 'create' in options:
+        records = read_id_file(options['iso'])
+    elif 'bool' in options:
+        records = search(databases[0], options['bool'])
+    else:
+        records = read_records(databases[0])
+    if 'iso' in options and 'create' not in options:
+        with open(options['iso'], 'w', encoding=ENCODING) as fp:
+            fp.write(format_records(records))
+    elif 'create' in options:
+        write_records(options['create'], records)
+    elif 'append' in options:
+        write_records(options['append'], records, append=True)
+
+
+def id2i(args):
+    db = dict(arg.split('=', 1) for arg in args[1:] if '=' in arg)['create']
+    write_records(db, read_id_file(args[0]))
+
+
+def i2id(args):
+    sys.stdout.buffer.write(
+        format_records(read_records(args[0])).encode(ENCODING))
+
+
+def crunchmf(args):
+    write_records(args[1], read_records(args[0]))
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    command, args = argv[0], argv[1:]
+    {'mx': mx, 'id2i': id2i, 'i2id': i2id, 'crunchmf': crunchmf}[command](
+        args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,402 @@
+# coding=utf-8
+"""
+Benchmark do XPM/XC com pacotes sintéticos (`sample`)
+
+Gera uma coleção local (bases title e issue, pasta serial, CISIS
+substituto ou `--cisis`), um pacote sintético e executa as etapas do XC:
+- pack: `PackageMaker.pack`
+- evaluate: `PkgProcessor.evaluate_package`
+- convert: registro de PIDs e `ArticlesConversion.convert`
+- reports: `PkgProcessor.report_result`
+
+De cada etapa são registrados o tempo decorrido, o tempo de CPU (do
+processo e dos subprocessos), o pico de memória (RSS) e a quantidade de
+subprocessos, em JSON, para acompanhar regressões:
+
+    python -m prodtools.benchmark.runner --documents 20 --output bench.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+from datetime import datetime
+
+from prodtools.benchmark import cisis
+from prodtools.benchmark import sample
+from prodtools.config import config
+from prodtools.db.pid_versions import PIDVersionsDB, PIDVersionsManager
+from prodtools.processing import pkg_processors
+from prodtools.processing.sps_pkgmaker import PackageMaker
+from prodtools.utils import tracing
+from prodtools.utils.dbm import dbm_isis
+from prodtools import FST_PATH
+
+
+logger = logging.getLogger()
+
+
+class SubprocessCounter(object):
+    """
+    Conta os subprocessos iniciados (subprocess.Popen), por comando
+    """
+
+    def __init__(self):
+        self.commands = {}
+        self._popen = None
+
+    def add(self, args):
+        if isinstance(args, (str, bytes)):
+            args = args.split() or ['']
+        name = os.path.basename(str(args[0]))
+        self.commands[name] = self.commands.get(name, 0) + 1
+
+    @property
+    def total(self):
+        return sum(self.commands.values())
+
+    def install(self):
+        counter = self
+        self._popen = subprocess.Popen
+
+        class CountingPopen(self._popen):
+
+            def __init__(self, args, *a, **kw):
+                counter.add(args)
+                super().__init__(args, *a, **kw)
+
+        subprocess.Popen = CountingPopen
+
+    def uninstall(self):
+        if self._popen is not None:
+            subprocess.Popen = self._popen
+            self._popen = None
+
+
+def reset_peak_rss():
+    """
+    Reinicia o pico de memória do processo (Linux), para medi-lo por etapa
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as fp:
+            fp.write('5')
+        return True
+    except (IOError, OSError):
+        return False
+
+
+def peak_rss():
+    """
+    Pico de memória (kB) do processo
+    """
+    try:
+        with open('/proc/self/status') as fp:
+            for line in fp:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except (IOError, OSError):
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def cpu_times():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return (
+        usage.ru_utime + usage.ru_stime,
+        children.ru_utime + children.ru_stime)
+
+
+class StageResult(object):
+
+    def __init__(self, name):
+        self.name = name
+        self.wall = None
+        self.cpu = None
+        self.children_cpu = None
+        self.peak_rss = None
+        self.subprocesses = SubprocessCounter()
+        self.error = None
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'wall': self.wall,
+            'cpu': self.cpu,
+            'children_cpu': self.children_cpu,
+            'peak_rss_kb': self.peak_rss,
+            'subprocesses': self.subprocesses.total,
+            'commands': dict(self.subprocesses.commands),
+            'error': self.error,
+        }
+
+
+def measure(name, function, *args):
+    """
+    Executa `function(*args)` e retorna (resultado, StageResult)
+    """
+    stage = StageResult(name)
+    reset_peak_rss()
+    cpu, children_cpu = cpu_times()
+    stage.subprocesses.install()
+    start = time.time()
+    result = None
+    try:
+        result = function(*args)
+    except Exception as e:
+        logger.exception("Benchmark: stage %s failed", name)
+        stage.error = '{}: {}'.format(type(e).__name__, e)
+    finally:
+        stage.wall = round(time.time() - start, 3)
+        stage.subprocesses.uninstall()
+        end_cpu, end_children_cpu = cpu_times()
+        stage.cpu = round(end_cpu - cpu, 3)
+        stage.children_cpu = round(end_children_cpu - children_cpu, 3)
+        stage.peak_rss = peak_rss()
+    return result, stage
+
+
+class BenchmarkCollection(object):
+    """
+    Coleção local usada pelo benchmark: CISIS, bases title e issue,
+    pasta serial e configuração do XC
+    """
+
+    def __init__(self, path, journal, cisis_path=None):
+        self.path = path
+        self.journal = journal
+        self.cisis_path = cisis_path
+        self.serial_path = os.path.join(path, 'serial')
+        self.web_app_path = os.path.join(path, 'web')
+        self.title_db = os.path.join(path, 'bases', 'title', 'title')
+        self.issue_db = os.path.join(path, 'bases', 'issue', 'issue')
+        self.config_filename = os.path.join(path, 'benchmark.xc.ini')
+
+    def setup(self):
+        for path in (self.serial_path, self.web_app_path):
+            if not os.path.isdir(path):
+                os.makedirs(path)
+        if self.cisis_path is None:
+            self.cisis_path = cisis.make_cisis_path(
+                os.path.join(self.path, 'cisis'))
+        cisis1030 = dbm_isis.CISIS(self.cisis_path)
+        db_isis = dbm_isis.UCISIS(cisis1030, cisis1030)
+        for db, fst, records in (
+                (self.title_db, 'title.fst', [self.journal.title_record()]),
+                (self.issue_db, 'issue.fst', [
+                    self.journal.issue_record(),
+                    self.journal.issue_record(aop=True)])):
+            db_isis.create_id_file(db + '.id', records)
+            db_isis.id_file_to_db(
+                db + '.id', db, os.path.join(FST_PATH, fst))
+        items = {
+            'PATH_CISIS_1030': self.cisis_path,
+            'PATH_CISIS_1660': self.cisis_path,
+            'PROC_SERIAL_PATH': self.serial_path,
+            'LOCAL_WEB_APP_PATH': self.web_app_path,
+            'SOURCE_TITLE_DB': self.title_db,
+            'TITLE_DB_COPY': os.path.join(
+                self.path, 'bases', 'title_xc', 'title'),
+            'SOURCE_ISSUE_DB': self.issue_db,
+            'ISSUE_DB_COPY': os.path.join(
+                self.path, 'bases', 'issue_xc', 'issue'),
+            'PID_MANAGER': os.path.join(self.serial_path, 'pid_manager.db'),
+            'ENABLED_WEB_ACCESS': 'off',
+        }
+        with open(self.config_filename, 'w') as fp:
+            fp.write(''.join(
+                '{}={}\n'.format(key, value) for key, value in items.items()))
+
+    @property
+    def config(self):
+        return config.Configuration(self.config_filename)
+
+
+class Benchmark(object):
+
+    def __init__(self, sample_package, path, cisis_path=None,
+                 trace_file_path=None):
+        self.sample = sample_package
+        self.path = path
+        self.trace_file_path = trace_file_path
+        self.collection = BenchmarkCollection(
+            os.path.join(path, 'collection'), sample_package.journal,
+            cisis_path)
+        self.stages = []
+        self.conversion = None
+
+    def setup(self):
+        """
+        Cria a coleção, o pacote e, se houver documentos aop, converte
+        previamente o pacote ahead of print
+        """
+        self.collection.setup()
+        self.processor = pkg_processors.PkgProcessor(
+            self.collection.config, INTERATIVE=False, stage='xc')
+        if self.sample.aop:
+            aop_path = os.path.join(self.path, 'aop')
+            self.sample.write(aop_path, aop=True)
+            self.run_stages(aop_path, os.path.join(self.path, 'aop_output'))
+        self.package_path = os.path.join(self.path, 'package')
+        self.sample.write(self.package_path)
+
+    def pack(self, package_path, output_path):
+        return PackageMaker(package_path, output_path).pack()
+
+    def evaluate(self, pkg):
+        return self.processor.evaluate_package(pkg)
+
+    def convert(self, pkg, registered_issue_data, pkg_eval_result):
+        config = self.processor.config
+        conversion = pkg_processors.ArticlesConversion(
+            registered_issue_data, pkg, pkg_eval_result,
+            not config.interative_mode, config.local_web_app_path,
+            config.web_app_site)
+        with PIDVersionsDB(config.pid_manager_info) as db:
+            conversion.register_pids_and_update_xmls(PIDVersionsManager(db))
+        conversion.convert()
+        return conversion
+
+    def reports(self, pkg, pkg_eval_result, conversion):
+        return self.processor.report_result(pkg, pkg_eval_result, conversion)
+
+    def run_stages(self, package_path, output_path):
+        """
+        Executa as etapas, interrompendo na primeira que falhar
+        Retorna a lista de StageResult
+        """
+        stages = []
+        pkg, stage = measure('pack', self.pack, package_path, output_path)
+        stages.append(stage)
+        if stage.error:
+            return stages
+        result, stage = measure('evaluate', self.evaluate, pkg)
+        stages.append(stage)
+        if stage.error:
+            return stages
+        registered_issue_data, pkg_eval_result = result
+        conversion, stage = measure(
+            'convert', self.convert, pkg, registered_issue_data,
+            pkg_eval_result)
+        stages.append(stage)
+        if stage.error:
+            return stages
+        reports, stage = measure(
+            'reports', self.reports, pkg, pkg_eval_result, conversion)
+        stages.append(stage)
+        self.conversion = conversion
+        return stages
+
+    def conversion_summary(self):
+        if self.conversion is None:
+            return None
+        return {
+            'status': self.conversion.xc_status,
+            'converted': self.conversion.total_converted,
+            'not_converted': self.conversion.total_not_converted,
+            'aop': {
+                status: len(items)
+                for status, items in self.conversion.aop_status.items()},
+        }
+
+    def run(self):
+        setup_start = time.time()
+        self.setup()
+        setup_time = round(time.time() - setup_start, 3)
+        self.conversion = None
+        with tracing.Trace(
+                'benchmark', self.trace_file_path,
+                package=self.package_path) as trace:
+            self.stages = self.run_stages(
+                self.package_path, os.path.join(self.path, 'output'))
+        commands = trace.stats.get('commands')
+        return {
+            'date': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'sample': self.sample.as_dict(),
+            'setup_time': setup_time,
+            'conversion': self.conversion_summary(),
+            'stages': [stage.as_dict() for stage in self.stages],
+            'commands': commands.as_dict() if commands else {},
+            'total': {
+                'wall': round(sum(s.wall for s in self.stages), 3),
+                'cpu': round(sum(s.cpu for s in self.stages), 3),
+                'children_cpu': round(
+                    sum(s.children_cpu for s in self.stages), 3),
+                'peak_rss_kb': max(
+                    [s.peak_rss for s in self.stages] or [None]),
+                'subprocesses': sum(
+                    s.subprocesses.total for s in self.stages),
+            },
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='XPM/XC benchmark with synthetic SPS packages')
+    parser.add_argument('--documents', type=int, default=10)
+    parser.add_argument(
+        '--references', type=int, default=30,
+        help='references per document')
+    parser.add_argument(
+        '--figures', type=int, default=3, help='figures per document')
+    parser.add_argument(
+        '--figure-formats', default=','.join(sample.FIGURE_FORMATS),
+        help='comma separated (tif,png,svg)')
+    parser.add_argument(
+        '--languages', default='en,pt',
+        help='comma separated; the first one is the main language')
+    parser.add_argument(
+        '--aop', type=int, default=0,
+        help='documents previously published as ahead of print')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--cisis', default=None,
+        help='CISIS path (default: local stand-in, see benchmark.cisis)')
+    parser.add_argument(
+        '--workdir', default=None,
+        help='keep the generated files in this folder')
+    parser.add_argument(
+        '--output', default=None, help='JSON file (default: stdout)')
+    parser.add_argument(
+        '--trace', default=None,
+        help='Chrome trace (JSON) file of the measured stages')
+    args = parser.parse_args()
+
+    sample_package = sample.SamplePackage(
+        sample.SampleJournal(),
+        documents=args.documents,
+        references=args.references,
+        figures=args.figures,
+        figure_formats=tuple(args.figure_formats.split(',')),
+        languages=tuple(args.languages.split(',')),
+        aop=args.aop,
+        seed=args.seed)
+
+    path = args.workdir or tempfile.mkdtemp(prefix='prodtools_benchmark_')
+    try:
+        result = Benchmark(
+            sample_package, path, args.cisis, args.trace).run()
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(path, ignore_errors=True)
+
+    content = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fp:
+            fp.write(content + '\n')
+    else:
+        print(content)
+    if any(stage['error'] for stage in result['stages']):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,420 @@
+# coding=utf-8
+"""
+Pacotes SPS sintéticos para medir o desempenho do XPM e do XC
+
+O conteúdo é gerado de modo determinístico (`seed`), com a quantidade de
+documentos, de referências por documento, de figuras (TIFF, PNG, SVG) e
+de idiomas (traduções em sub-article) configuráveis. Os primeiros `aop`
+documentos do fascículo também são gerados como ahead of print (mesmo DOI,
+título e autores), para que a conversão do fascículo encontre as versões
+aop já registradas.
+"""
+import os
+import random
+
+from PIL import Image
+
+
+DOCTYPE = (
+    '<!DOCTYPE article PUBLIC "-//NLM//DTD JATS (Z39.96) Journal Publishing '
+    'DTD v1.1 20151215//EN" '
+    '"https://jats.nlm.nih.gov/publishing/1.1/JATS-journalpublishing1.dtd">')
+SPS_VERSION = 'sps-1.9'
+FIGURE_FORMATS = ('tif', 'png', 'svg')
+FIGURE_SIZE = (600, 400)
+SECTION = 'Articles'
+
+WORDS = (
+    'analysis', 'brazil', 'cell', 'clinical', 'data', 'development',
+    'effect', 'evaluation', 'growth', 'health', 'impact', 'method',
+    'model', 'patients', 'performance', 'population', 'process', 'quality',
+    'research', 'response', 'risk', 'soil', 'species', 'study', 'system',
+    'treatment', 'water', 'women',
+)
+SURNAMES = (
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Costa',
+    'Rodrigues', 'Almeida', 'Nascimento', 'Carvalho', 'Gomes',
+)
+GIVEN_NAMES = (
+    'Ana', 'Bruno', 'Carla', 'Daniel', 'Elisa', 'Fabio', 'Gabriela',
+    'Helena', 'Igor', 'Julia',
+)
+ABSTRACT_TITLES = {'pt': 'Resumo', 'en': 'Abstract', 'es': 'Resumen'}
+KWD_TITLES = {
+    'pt': 'Palavras-chave', 'en': 'Keywords', 'es': 'Palabras clave'}
+
+
+def issn_check_digit(digits):
+    total = sum(int(d) * (8 - i) for i, d in enumerate(digits))
+    check = (11 - total % 11) % 11
+    return 'X' if check == 10 else str(check)
+
+
+def make_issn(number):
+    digits = str(number).zfill(7)[-7:]
+    return '{}-{}{}'.format(
+        digits[:4], digits[4:], issn_check_digit(digits))
+
+
+class SampleJournal(object):
+    """
+    Periódico e fascículo dos pacotes sintéticos, incluindo os registros
+    das bases title e issue
+    """
+
+    def __init__(self, acron='bench', volume='10', number='1', year='2020',
+                 issn_number=1234567):
+        self.acron = acron
+        self.volume = volume
+        self.number = number
+        self.year = year
+        self.print_issn = make_issn(issn_number)
+        self.e_issn = make_issn(issn_number + 1)
+        self.title = 'Benchmark Journal'
+        self.abbrev_title = 'Bench. J.'
+        self.nlm_ta = 'Bench J'
+        self.publisher = 'Benchmark Publisher'
+        self.license = 'by/4.0'
+        self.section_code = acron.upper() + '010'
+
+    @property
+    def issue_label(self):
+        return 'v{}n{}'.format(self.volume, self.number)
+
+    @property
+    def aop_issue_label(self):
+        return '{}nahead'.format(int(self.year) - 1)
+
+    def _issns(self):
+        return [
+            {'_': self.print_issn, 't': 'PRINT'},
+            {'_': self.e_issn, 't': 'ONLIN'},
+        ]
+
+    def title_record(self):
+        return {
+            '30': self.abbrev_title,
+            '35': 'PRINT',
+            '68': self.acron,
+            '100': self.title,
+            '400': self.print_issn,
+            '421': self.nlm_ta,
+            '435': self._issns(),
+            '480': self.publisher,
+            '541': self.license,
+            '935': self.print_issn,
+        }
+
+    def issue_record(self, aop=False):
+        record = {
+            '35': self.print_issn,
+            '49': {'c': self.section_code, 't': SECTION, 'l': 'en'},
+            '62': self.publisher,
+            '130': self.title,
+            '421': self.nlm_ta,
+            '435': self._issns(),
+            '541': self.license,
+            '706': 'i',
+            '930': self.acron.upper(),
+            '935': self.print_issn,
+        }
+        if aop:
+            year = str(int(self.year) - 1)
+            record.update({
+                '32': 'ahead', '36': year + '50', '65': year + '0000'})
+        else:
+            record.update({
+                '31': self.volume, '32': self.number,
+                '36': self.year + self.number, '65': self.year + '0000'})
+        return record
+
+
+class SamplePackage(object):
+    """
+    Gera os documentos de um fascículo de `journal` (ou os de sua versão
+    ahead of print, `aop=True`)
+    """
+
+    def __init__(self, journal, documents=10, references=30, figures=3,
+                 figure_formats=FIGURE_FORMATS, languages=('en', 'pt'),
+                 aop=0, seed=0):
+        self.journal = journal
+        self.documents = documents
+        self.references = references
+        self.figures = figures
+        self.figure_formats = figure_formats
+        self.languages = languages
+        self.aop = min(aop, documents)
+        self.seed = seed
+
+    def as_dict(self):
+        return {
+            'documents': self.documents,
+            'references': self.references,
+            'figures': self.figures,
+            'figure_formats': list(self.figure_formats),
+            'languages': list(self.languages),
+            'aop': self.aop,
+        }
+
+    def xml_name(self, index, aop=False):
+        j = self.journal
+        if aop:
+            return '{}-{}-{}-ahead-e{:03d}'.format(
+                j.print_issn, j.acron, int(j.year) - 1, index)
+        return '{}-{}-{}-{}-e{:03d}'.format(
+            j.print_issn, j.acron, j.volume, j.number, index)
+
+    def write(self, path, aop=False):
+        """
+        Escreve os documentos (e suas figuras) em `path`
+        Retorna a lista dos arquivos XML
+        """
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        total = self.aop if aop else self.documents
+        xml_files = []
+        for index in range(1, total + 1):
+            xml_files.append(self.write_document(path, index, aop))
+        return xml_files
+
+    def write_document(self, path, index, aop=False):
+        # o mesmo documento (aop ou não) tem sempre o mesmo conteúdo
+        rand = random.Random('{}-{}'.format(self.seed, index))
+        name = self.xml_name(index, aop)
+        figures = []
+        for i in range(1, self.figures + 1):
+            ext = self.figure_formats[(i - 1) % len(self.figure_formats)]
+            figures.append(
+                write_figure(
+                    os.path.join(path, '{}-gf{:02d}.{}'.format(name, i, ext)),
+                    rand))
+        document = SampleDocument(self, index, rand, figures, aop)
+        xml_file = os.path.join(path, name + '.xml')
+        with open(xml_file, 'w', encoding='utf-8') as fp:
+            fp.write(document.xml())
+        return xml_file
+
+
+def write_figure(file_path, rand, size=FIGURE_SIZE):
+    ext = os.path.splitext(file_path)[1]
+    color = tuple(rand.randint(0, 255) for i in range(3))
+    if ext == '.svg':
+        with open(file_path, 'w', encoding='utf-8') as fp:
+            fp.write(
+                '<svg xmlns="http://www.w3.org/2000/svg" width="{0}" '
+                'height="{1}"><rect width="{0}" height="{1}" '
+                'fill="rgb{2}"/></svg>'.format(size[0], size[1], color))
+    else:
+        image = Image.new('RGB', size, color)
+        # um pouco de "ruído" para que a compressão não seja trivial
+        for i in range(size[0]):
+            image.putpixel(
+                (i, rand.randint(0, size[1] - 1)),
+                tuple(rand.randint(0, 255) for j in range(3)))
+        image.save(file_path)
+    return os.path.basename(file_path)
+
+
+class SampleDocument(object):
+
+    def __init__(self, sample, index, rand, figures, aop=False):
+        self.sample = sample
+        self.journal = sample.journal
+        self.index = index
+        self.rand = rand
+        self.figures = figures
+        self.aop = aop
+        self.authors = [
+            (rand.choice(SURNAMES), rand.choice(GIVEN_NAMES))
+            for i in range(rand.randint(1, 4))]
+        self.title_words = [rand.choice(WORDS) for i in range(8)]
+
+    def words(self, total):
+        return ' '.join(self.rand.choice(WORDS) for i in range(total))
+
+    def title(self, lang):
+        return '{} ({})'.format(
+            ' '.join(self.title_words).capitalize(), lang)
+
+    @property
+    def doi(self):
+        return '10.1590/{}-{}-{:04d}'.format(
+            self.journal.print_issn, self.journal.year, self.index)
+
+    def contribs(self):
+        items = []
+        for surname, given_names in self.authors:
+            items.append(
+                '<contrib contrib-type="author"><name>'
+                '<surname>{}</surname><given-names>{}</given-names></name>'
+                '<xref ref-type="aff" rid="aff1">1</xref></contrib>'.format(
+                    surname, given_names))
+        return '<contrib-group>{}</contrib-group>'.format(''.join(items))
+
+    def aff(self):
+        return (
+            '<aff id="aff1"><label>1</label>'
+            '<institution content-type="orgname">Universidade de São Paulo'
+            '</institution>'
+            '<institution content-type="orgdiv1">Faculdade de Medicina'
+            '</institution>'
+            '<institution content-type="original">Universidade de São Paulo, '
+            'Faculdade de Medicina, São Paulo, SP, Brasil</institution>'
+            '<addr-line><named-content content-type="city">São Paulo'
+            '</named-content><named-content content-type="state">SP'
+            '</named-content></addr-line>'
+            '<country country="BR">Brasil</country></aff>')
+
+    def issue_data(self):
+        j = self.journal
+        if self.aop:
+            return (
+                '<pub-date publication-format="electronic" date-type="pub">'
+                '<day>15</day><month>06</month><year>{}</year></pub-date>'
+                '<elocation-id>e{:03d}</elocation-id>').format(
+                    int(j.year) - 1, self.index)
+        return (
+            '<pub-date publication-format="electronic" date-type="pub">'
+            '<day>15</day><month>06</month><year>{0}</year></pub-date>'
+            '<pub-date publication-format="electronic" '
+            'date-type="collection"><year>{0}</year></pub-date>'
+            '<volume>{1}</volume><issue>{2}</issue>'
+            '<elocation-id>e{3:03d}</elocation-id>').format(
+                j.year, j.volume, j.number, self.index)
+
+    def abstract(self, tag, lang):
+        return (
+            '<{0}{1}><title>{2}</title><p>{3}</p></{0}>'
+            '<kwd-group xml:lang="{4}"><title>{5}</title>{6}</kwd-group>'
+            ).format(
+                tag,
+                ' xml:lang="{}"'.format(lang) if tag != 'abstract' else '',
+                ABSTRACT_TITLES.get(lang, 'Abstract'), self.words(120), lang,
+                KWD_TITLES.get(lang, 'Keywords'),
+                ''.join('<kwd>{}</kwd>'.format(self.words(2))
+                        for i in range(4)))
+
+    def body(self, lang, id_prefix=''):
+        paragraphs = []
+        refs = self.sample.references
+        for i in range(1, 6):
+            xref = ''
+            if refs:
+                rid = 'B{}'.format((i - 1) * refs // 5 + 1)
+                xref = ' <xref ref-type="bibr" rid="{}">{}</xref>'.format(
+                    rid, rid[1:])
+            paragraphs.append('<p>{}{}</p>'.format(self.words(80), xref))
+        figs = []
+        for i, figure in enumerate(self.figures, 1):
+            figs.append(
+                '<fig id="{0}f{1}"><label>Figure {1}</label>'
+                '<caption><title>{2}</title></caption>'
+                '<graphic xlink:href="{3}"/></fig>'.format(
+                    id_prefix, i, self.words(6).capitalize(), figure))
+            paragraphs.append(
+                '<p><xref ref-type="fig" rid="{0}f{1}">Figure {1}</xref> '
+                '{2}</p>'.format(id_prefix, i, self.words(20)))
+        return (
+            '<sec sec-type="intro"><title>Introduction</title>{}</sec>'
+            '<sec sec-type="results"><title>Results</title>{}</sec>'
+            ).format(''.join(paragraphs), ''.join(figs))
+
+    def ref(self, index):
+        rand = random.Random('{}-ref-{}'.format(self.sample.seed, index))
+        surname, given_names = rand.choice(SURNAMES), rand.choice(GIVEN_NAMES)
+        year = rand.randint(1990, 2019)
+        title = ' '.join(rand.choice(WORDS) for i in range(8)).capitalize()
+        source = ' '.join(rand.choice(WORDS) for i in range(3)).title()
+        volume = rand.randint(1, 60)
+        fpage = rand.randint(1, 900)
+        lpage = fpage + rand.randint(1, 20)
+        mixed = '{}, {}. {}. {}. {};{}:{}-{}.'.format(
+            surname, given_names[0], title, source, year, volume, fpage,
+            lpage)
+        return (
+            '<ref id="B{0}"><mixed-citation>{1}</mixed-citation>'
+            '<element-citation publication-type="journal">'
+            '<person-group person-group-type="author"><name>'
+            '<surname>{2}</surname><given-names>{3}</given-names></name>'
+            '</person-group><article-title>{4}</article-title>'
+            '<source>{5}</source><year>{6}</year><volume>{7}</volume>'
+            '<fpage>{8}</fpage><lpage>{9}</lpage></element-citation>'
+            '</ref>').format(
+                index, mixed, surname, given_names[0], title, source, year,
+                volume, fpage, lpage)
+
+    def translation(self, index, lang):
+        return (
+            '<sub-article article-type="translation" id="s{0}" '
+            'xml:lang="{1}"><front-stub>'
+            '<article-categories><subj-group subj-group-type="heading">'
+            '<subject>{2}</subject></subj-group></article-categories>'
+            '<title-group><article-title>{3}</article-title></title-group>'
+            '{4}</front-stub><body>{5}</body></sub-article>').format(
+                index, lang, SECTION, self.title(lang),
+                self.abstract('abstract', lang),
+                self.body(lang, 's{}'.format(index)))
+
+    def xml(self):
+        j = self.journal
+        lang = self.sample.languages[0]
+        translations = self.sample.languages[1:]
+        refs = ''.join(
+            self.ref(i) for i in range(1, self.sample.references + 1))
+        return (
+            '<?xml version="1.0" encoding="utf-8"?>\n{doctype}\n'
+            '<article xmlns:xlink="http://www.w3.org/1999/xlink" '
+            'xmlns:mml="http://www.w3.org/1998/Math/MathML" '
+            'article-type="research-article" dtd-version="1.1" '
+            'specific-use="{sps}" xml:lang="{lang}">'
+            '<front><journal-meta>'
+            '<journal-id journal-id-type="nlm-ta">{nlm_ta}</journal-id>'
+            '<journal-id journal-id-type="publisher-id">{acron}</journal-id>'
+            '<journal-title-group><journal-title>{journal_title}'
+            '</journal-title><abbrev-journal-title abbrev-type="publisher">'
+            '{abbrev_title}</abbrev-journal-title></journal-title-group>'
+            '<issn pub-type="ppub">{print_issn}</issn>'
+            '<issn pub-type="epub">{e_issn}</issn>'
+            '<publisher><publisher-name>{publisher}</publisher-name>'
+            '</publisher></journal-meta>'
+            '<article-meta>'
+            '<article-id pub-id-type="other">{order:05d}</article-id>'
+            '<article-id pub-id-type="doi">{doi}</article-id>'
+            '<article-categories><subj-group subj-group-type="heading">'
+            '<subject>{section}</subject></subj-group></article-categories>'
+            '<title-group><article-title>{title}</article-title>'
+            '</title-group>{contribs}{aff}{issue_data}'
+            '<history><date date-type="received"><day>10</day>'
+            '<month>01</month><year>{received}</year></date>'
+            '<date date-type="accepted"><day>20</day><month>03</month>'
+            '<year>{received}</year></date></history>'
+            '<permissions><license license-type="open-access" '
+            'xlink:href="http://creativecommons.org/licenses/{license}/" '
+            'xml:lang="en"><license-p>This is an Open Access article '
+            'distributed under the terms of the Creative Commons '
+            'Attribution License</license-p></license></permissions>'
+            '{abstract}'
+            '<counts><fig-count count="{figures}"/>'
+            '<table-count count="0"/><equation-count count="0"/>'
+            '<ref-count count="{references}"/><page-count count="0"/>'
+            '</counts></article-meta></front>'
+            '<body>{body}</body>'
+            '<back><ref-list><title>References</title>{refs}</ref-list>'
+            '</back>{translations}</article>\n').format(
+                doctype=DOCTYPE, sps=SPS_VERSION, lang=lang,
+                nlm_ta=j.nlm_ta, acron=j.acron, journal_title=j.title,
+                abbrev_title=j.abbrev_title, print_issn=j.print_issn,
+                e_issn=j.e_issn, publisher=j.publisher, order=self.index,
+                doi=self.doi,
+                section=SECTION, title=self.title(lang),
+                contribs=self.contribs(), aff=self.aff(),
+                issue_data=self.issue_data(),
+                received=int(j.year) - 1, license=j.license,
+                abstract=self.abstract('abstract', lang),
+                figures=len(self.figures) * len(self.sample.languages),
+                references=self.sample.references, body=self.body(lang),
+                refs=refs,
+                translations=''.join(
+                    self.translation(i, tr_lang)
+                    for i, tr_lang in enumerate(translations, 1)))
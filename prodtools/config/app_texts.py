@@ -28,3 +28,19 @@ def get_texts(locale_path):
         return t.ugettext
     except:
         return t.gettext
+
+
+class LazyTexts(object):
+    """
+    Função de tradução (`_`) que carrega o catálogo somente na primeira
+    chamada
+    """
+
+    def __init__(self, locale_path):
+        self.locale_path = locale_path
+        self._gettext = None
+
+    def __call__(self, text):
+        if self._gettext is None:
+            self._gettext = get_texts(self.locale_path)
+        return self._gettext(text)
@@ -9,6 +9,7 @@ from prodtools.utils.ws import ws_requester
 
 from prodtools import XC_SERVER_CONFIG_PATH
 from prodtools import BIN_PATH
+from prodtools import LOG_PATH
 from prodtools import EMAIL_TEMPLATE_MESSAGES_PATH
 
 
@@ -248,6 +249,34 @@ class Configuration(object):
         if self.serial_path:
             return os.path.join(self.serial_path, 'scilista.lst')
 
+    @property
+    def gerapadrao_state_file(self):
+        """
+        Situação das bases dos fascículos na última execução do GeraPadrão
+        """
+        path = self._data.get('GERAPADRAO_STATE')
+        if not path and self.serial_path:
+            path = os.path.join(self.serial_path, '.gerapadrao_state.json')
+        return path
+
+    @property
+    def gerapadrao_history_file(self):
+        """
+        Registro (status de saída, duração) das execuções do GeraPadrão
+        """
+        return (self._data.get('GERAPADRAO_HISTORY') or
+                os.path.join(LOG_PATH, 'gerapadrao.jsonl'))
+
+    @property
+    def gerapadrao_log_file(self):
+        """
+        Saída do GeraPadrao.bat
+        """
+        path = self._data.get('GERAPADRAO_LOG')
+        if not path and self.gerapadrao_proc_path:
+            path = os.path.join(self.gerapadrao_proc_path, 'gerapadrao.log')
+        return path
+
     @property
     def download_path(self):
         return self._data.get('DOWNLOAD_PATH')
@@ -264,6 +293,70 @@ class Configuration(object):
     def archive_path(self):
         return self._data.get('ARCHIVE_PATH')
 
+    @property
+    def queue_state_path(self):
+        path = self._data.get('QUEUE_STATE_PATH')
+        if path is None and self.queue_path:
+            path = os.path.join(self.queue_path, '.state')
+        return path
+
+    @property
+    def outbox_path(self):
+        """
+        Base sqlite das ações posteriores à conversão (outbox)
+        """
+        path = self._data.get('OUTBOX_PATH')
+        if path is None and self.queue_path:
+            path = os.path.join(self.queue_path, '.outbox.db')
+        return path
+
+    @property
+    def trace_path(self):
+        """
+        Pasta dos arquivos de rastreamento (Chrome trace) de cada pacote
+        processado; sem valor, não há rastreamento
+        """
+        return self._data.get('TRACE_PATH')
+
+    @property
+    def xc_cache_ttl(self):
+        """
+        Tempo (segundos) que os dados de periódicos e das bases title e
+        issue permanecem carregados no processo residente do XC
+        """
+        try:
+            return int(self._data['XC_CACHE_TTL'])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    @property
+    def intake_max_members(self):
+        """
+        Quantidade máxima de arquivos de um pacote recebido
+        """
+        try:
+            return int(self._data.get('INTAKE_MAX_MEMBERS', 5000))
+        except (TypeError, ValueError):
+            return 5000
+
+    @property
+    def intake_max_size(self):
+        """
+        Tamanho máximo (bytes) do conteúdo descompactado de um pacote
+        recebido (INTAKE_MAX_SIZE em MB)
+        """
+        try:
+            return int(self._data.get('INTAKE_MAX_SIZE', 2048)) * 1024 * 1024
+        except (TypeError, ValueError):
+            return 2048 * 1024 * 1024
+
+    @property
+    def xc_workers(self):
+        try:
+            return max(int(self._data.get('XC_WORKERS', 1)), 1)
+        except (TypeError, ValueError):
+            return 1
+
     @property
     def email_sender_name(self):
         return self._data.get('SENDER_NAME')
@@ -362,6 +455,36 @@ class Configuration(object):
             servers = servers.split(';')
         return servers
 
+    @property
+    def transference_workers(self):
+        try:
+            return max(int(self._data.get('TRANSFER_WORKERS', 4)), 1)
+        except (TypeError, ValueError):
+            return 4
+
+    @property
+    def transference_attempts(self):
+        try:
+            return max(int(self._data.get('TRANSFER_ATTEMPTS', 3)), 1)
+        except (TypeError, ValueError):
+            return 3
+
+    @property
+    def transference_journal(self):
+        return (self._data.get('TRANSFER_JOURNAL') or
+                os.path.join(LOG_PATH, 'transfer.jsonl'))
+
+    @property
+    def transference_manifests_path(self):
+        """
+        Manifestos das bases publicadas (transfer_website_bases)
+        """
+        path = self._data.get('TRANSFER_MANIFESTS_PATH')
+        if path is None and self.local_web_app_path:
+            path = os.path.join(
+                self.local_web_app_path, 'bases', '.transfer_manifests')
+        return path
+
     @property
     def is_enabled_email_service(self):
         return self.is_activated('EMAIL_SERVICE_STATUS', 'OFF') and self.is_valid_email_configuration
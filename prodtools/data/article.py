@@ -1794,6 +1794,13 @@ class Article(ArticleXML):
         self.section_code = None
         self.xml = None if self.tree is None else tostring(self.tree.find('.'))
 
+    def tree_updated(self):
+        """
+        Atualiza os dados obtidos de `tree` após a sua modificação
+        (por exemplo, inclusão de article-id)
+        """
+        self.xml = None if self.tree is None else tostring(self.tree.find('.'))
+
     def count_words(self, word):
         return self.xml.count(word)
 
@@ -293,11 +293,18 @@ CONTRIB_ID_URLS = {
 }
 
 
-LICENSES = read_file(TABLES_PATH + '/licenses.csv')
-if LICENSES is None:
-    LICENSES = []
-else:
-    LICENSES = LICENSES.split()
+_LICENSES = None
+
+
+def licenses():
+    """
+    Licenças de licenses.csv, lidas somente no primeiro uso
+    """
+    global _LICENSES
+    if _LICENSES is None:
+        content = read_file(TABLES_PATH + '/licenses.csv')
+        _LICENSES = content.split() if content else []
+    return _LICENSES
 
 
 LICENSE_TEXTS = {
@@ -627,10 +634,10 @@ def validate_license_href(license_href):
     result = None
     if license_href is None:
         result = ('license/@xlink:href', validation_status.STATUS_FATAL_ERROR, _('{label} is required. ').format(label='license/@href'))
-    elif license_href in LICENSES or license_href + '/' in LICENSES:
+    elif license_href in licenses() or license_href + '/' in licenses():
         result = ('license/@xlink:href', validation_status.STATUS_VALID, license_href)
     else:
-        result = ('license/@xlink:href', validation_status.STATUS_WARNING, _('{value} is an invalid value for {label}. ').format(value=license_href, label='license/@href') + _('Expected values: {expected}. ').format(expected=_(' or ').join(LICENSES)))
+        result = ('license/@xlink:href', validation_status.STATUS_WARNING, _('{value} is an invalid value for {label}. ').format(value=license_href, label='license/@href') + _('Expected values: {expected}. ').format(expected=_(' or ').join(licenses())))
         #if not ws_requester.wsr.is_valid_url(license_href):
         #    result = ('license/@xlink:href', validation_status.STATUS_FATAL_ERROR, _('{value} is an invalid value for {label}. ').format(value=license_href, label='license/@href'))
     return result
@@ -39,6 +39,7 @@ def add_article_id_to_received_documents(
         None
     """
 
+    pids = {}
     for xml_name, article in received_docs.items():
         pid_v2 = article.get_scielo_pid("v2")
         pid_v3 = article.get_scielo_pid("v3")
@@ -49,48 +50,68 @@ def add_article_id_to_received_documents(
         # propriedade `registered_aop_pid`
         update_article_with_aop_status(article)
 
-        if pid_v2 and pid_v3:
-            exists_in_database = pid_manager.pids_already_registered(pid_v2, pid_v3)
-
-            if not exists_in_database:
-                pid_manager.register(pid_v2, pid_v3)
-
-            continue
-
         if pid_v2 is None:
             pid_v2 = get_scielo_pid_v2(issn_id, year_and_order, article.order)
             pids_to_append_in_xml.append((pid_v2, "scielo-v2"))
 
+        pids[xml_name] = (pid_v2, pid_v3, pids_to_append_in_xml)
+
+    # os pids v3 já registrados são obtidos numa única consulta
+    v2_list = []
+    for xml_name, (pid_v2, pid_v3, pids_to_append_in_xml) in pids.items():
+        if pid_v3 is None:
+            v2_list.extend(
+                [received_docs[xml_name].registered_aop_pid, pid_v2])
+    registered_pids = pid_manager.get_many_pid_v3(v2_list) if v2_list else {}
+
+    pairs = []
+    for xml_name, (pid_v2, pid_v3, pids_to_append_in_xml) in pids.items():
+        article = received_docs[xml_name]
         if pid_v3 is None:
             pid_v3 = (
                 documents_in_isis.get(xml_name, article).scielo_id
-                or pid_manager.get_pid_v3(article.registered_aop_pid)
-                or pid_manager.get_pid_v3(pid_v2)
+                or registered_pids.get(article.registered_aop_pid)
+                or registered_pids.get(pid_v2)
                 or scielo_id_gen.generate_scielo_pid()
             )
             article.registered_scielo_id = pid_v3
             pids_to_append_in_xml.append((pid_v3, "scielo-v3"))
+        pairs.append((pid_v2, pid_v3))
+
+    # e todos os pares são registrados numa única transação
+    try:
+        pid_manager.register_many(pairs)
+    except sqlite3.OperationalError:
+        LOGGER.exception(
+            "Could not update sql database with pid v2 and v3."
+            " The following exception was captured."
+        )
 
-        try:
-            pid_manager.register(pid_v2, pid_v3)
-        except sqlite3.OperationalError:
-            LOGGER.exception(
-                "Could not update sql database with pid v2 and v3."
-                " The following exception was captured."
-            )
+    for xml_name, (pid_v2, pid_v3, pids_to_append_in_xml) in pids.items():
+        if not pids_to_append_in_xml:
+            continue
 
         file_path = file_paths.get(xml_name)
         if file_path is None:
             LOGGER.debug("Could not find XML path for '%s' xml.", xml_name)
-            return None
+            continue
+
+        # a árvore já carregada no pacote é atualizada e reaproveitada
+        article = received_docs[xml_name]
+        tree = getattr(article, "tree", None)
+        if tree is not None:
+            if add_article_id_to_tree(tree, pids_to_append_in_xml):
+                write_etree_to_file(tree, file_path)
+                article.tree_updated()
+            continue
 
         try:
             tree = xml_utils.get_xml_object(file_path)
         except xml_utils.etree.XMLSyntaxError:
             LOGGER.info("%s is not a valid XML", file_path)
         else:
-            _tree = add_article_id_to_etree(tree, pids_to_append_in_xml)
-            write_etree_to_file(_tree, file_path)
+            if add_article_id_to_tree(tree, pids_to_append_in_xml):
+                write_etree_to_file(tree, file_path)
 
 
 def get_scielo_pid_v2(issn_id, year_and_order, order_in_issue):
@@ -112,22 +133,45 @@ def add_article_id_to_etree(
 
     _tree = copy.deepcopy(tree)
 
-    article_meta = _tree.find(".//article-meta")
+    if not add_article_id_to_tree(_tree, pid_and_specific_use_items):
+        return None
+
+    return _tree
+
+
+def add_article_id_to_tree(
+    tree: etree.ElementTree, pid_and_specific_use_items: list
+) -> bool:
+    """Adiciona (ou atualiza) os pids v2 e v3 na própria árvore lxml de um
+    documento. Retorna True se a árvore foi modificada"""
+    if tree is None or not pid_and_specific_use_items:
+        return False
+
+    article_meta = tree.find(".//article-meta")
 
     if article_meta is None:
         LOGGER.debug(
             "Could not insert articles ids because the article-meta isn't found"
         )
-        return None
+        return False
 
+    modified = False
     for id_value, specific_use in pid_and_specific_use_items:
+        article_id = article_meta.find(
+            'article-id[@specific-use="{}"]'.format(specific_use))
+        if article_id is not None:
+            if article_id.text != id_value:
+                article_id.text = id_value
+                modified = True
+            continue
         article_id = etree.Element("article-id")
         article_id.text = id_value
         article_id.set("specific-use", specific_use)
         article_id.set("pub-id-type", "publisher-id")
         article_meta.insert(0, article_id)
+        modified = True
 
-    return _tree
+    return modified
 
 
 def write_etree_to_file(tree: etree.ElementTree, path: str) -> None:
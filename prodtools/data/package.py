@@ -1,6 +1,9 @@
 # coding=utf-8
 import logging
 
+from prodtools import _
+from prodtools.utils import archive
+from prodtools.utils import encoding
 from prodtools.utils import xml_utils
 from prodtools.data import article
 from prodtools.data import workarea
@@ -65,10 +68,21 @@ class SPPackage(object):
                 return True
 
     def zip(self):
-        if not self.optimised:
-            self.package_folder.zip()
-        for name, pkgfiles in self.package_folder.pkgfiles_items.items():
-            pkgfiles.zip(self.package_folder.path + '_zips')
+        """
+        Cria os zips do pacote. A falha é registrada e exibida, sem
+        interromper o processamento; retorna False neste caso
+        """
+        try:
+            if not self.optimised:
+                self.package_folder.zip()
+            for name, pkgfiles in self.package_folder.pkgfiles_items.items():
+                pkgfiles.zip(self.package_folder.path + '_zips')
+        except archive.ArchiveError as e:
+            logger.error("Unable to zip %s: %s", self.package_folder.path, e)
+            encoding.display_message(
+                _("Unable to create the package zip: {}").format(e))
+            return False
+        return True
 
 
 class PackageIssueData(object):
@@ -5,6 +5,7 @@ import shutil
 
 from prodtools.utils import fs_utils
 from prodtools.utils import img_utils
+from prodtools.utils import svg_conversion
 
 
 logger = logging.getLogger()
@@ -207,10 +208,12 @@ class DocumentPackageFiles(object):
         sgv2png_files = None
         png2tiff_files = None
         if len(self.tiff_items) == 0:
-            sgv2png_files = img_utils.svg2png(self.path)
+            converter = svg_conversion.ImageConverter()
+            sgv2png_files = img_utils.svg2png(self.path, converter)
             self._update()
-            png2tiff_files = img_utils.png2tiff(self.path)
+            png2tiff_files = img_utils.png2tiff(self.path, converter)
             self._update()
+            logger.info("%s: %s", self.name, converter.stats)
         return sgv2png_files, png2tiff_files
 
     @property
@@ -426,6 +429,10 @@ class DocumentOutputFiles(object):
     def data_report_filename(self):
         return os.path.join(self.report_path, self.xml_name + '.contents.html')
 
+    @property
+    def validations_json_filename(self):
+        return os.path.join(self.report_path, self.xml_name + '.validations.json')
+
     @property
     def images_report_filename(self):
         return os.path.join(self.report_path, self.xml_name + '.images.html')
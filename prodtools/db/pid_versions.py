@@ -1,5 +1,7 @@
+import time
 import sqlite3
 import logging
+from contextlib import contextmanager
 
 CREATE_PID_TABLE_QUERY = """
     CREATE TABLE IF NOT EXISTS pid_versions (
@@ -10,6 +12,11 @@ CREATE_PID_TABLE_QUERY = """
     );
 """
 
+# limite de parâmetros de uma consulta no sqlite (SQLITE_MAX_VARIABLE_NUMBER)
+MAX_VARIABLES = 500
+# espera (segundos) pelo lock a partir da qual é contabilizada como disputa
+LOCK_WAIT_THRESHOLD = 0.01
+
 
 class PIDVersionsManager:
     def __init__(self, db):
@@ -22,6 +29,16 @@ class PIDVersionsManager:
     def get_pid_v3(self, v2):
         return self.db.get_pid_v3(v2)
 
+    def get_many_pid_v3(self, v2_list):
+        """Retorna {v2: v3} dos pids v2 registrados"""
+        return self.db.get_many_pid_v3(v2_list)
+
+    def register_many(self, pairs):
+        """Registra os pares (v2, v3) numa única transação.
+        Retorna a quantidade de pares novos"""
+        return self.db.insert_many(
+            "INSERT OR IGNORE INTO pid_versions (v2, v3) VALUES (?,?)", pairs)
+
     def pids_already_registered(self, v2, v3):
         """Verifica se a chave composta (v2 e v3) existe no banco de dadoss"""
         result = self.db.fetch(
@@ -38,14 +55,52 @@ class PIDVersionsDB:
         try:
             self.conn = sqlite3.connect(name, timeout=timeout)
             self.cursor = self.conn.cursor()
+            # leituras não esperam pelas escritas de outros workers
+            self.cursor.execute("PRAGMA journal_mode=WAL")
         except sqlite3.OperationalError as e:
             logging.exception(e)
             raise sqlite3.OperationalError("unable to open database '%s'" % name)
+        self.metrics = {
+            "transactions": 0,
+            "lock_waits": 0,
+            "lock_wait_time": 0.0,
+            "max_lock_wait": 0.0,
+            "lock_errors": 0,
+        }
 
     def close(self):
         if self.conn is not None:
             self.conn.commit()
             self.conn.close()
+            self.conn = None
+            if self.metrics["lock_waits"] or self.metrics["lock_errors"]:
+                logging.info("pid_versions: lock contention %s", self.metrics)
+
+    @contextmanager
+    def transaction(self):
+        """Transação de escrita: o lock é obtido no início (BEGIN
+        IMMEDIATE) e o tempo de espera é contabilizado em `metrics`"""
+        self.conn.commit()
+        start = time.time()
+        try:
+            self.cursor.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError:
+            self.metrics["lock_errors"] += 1
+            raise
+        waited = time.time() - start
+        self.metrics["transactions"] += 1
+        if waited >= LOCK_WAIT_THRESHOLD:
+            self.metrics["lock_waits"] += 1
+            self.metrics["lock_wait_time"] += waited
+            self.metrics["max_lock_wait"] = max(
+                self.metrics["max_lock_wait"], waited)
+        try:
+            yield self.cursor
+        except Exception:
+            self.conn.rollback()
+            raise
+        else:
+            self.conn.commit()
 
     def __enter__(self):
         return self
@@ -73,6 +128,28 @@ class PIDVersionsDB:
             self.conn.commit()
             return True
 
+    def insert_many(self, sql, parameters_list):
+        parameters_list = list(parameters_list)
+        if not parameters_list:
+            return 0
+        with self.transaction() as cursor:
+            changes = self.conn.total_changes
+            cursor.executemany(sql, parameters_list)
+            return self.conn.total_changes - changes
+
+    def get_many_pid_v3(self, v2_list):
+        v2_list = sorted(set(v2 for v2 in v2_list if v2))
+        found = {}
+        for i in range(0, len(v2_list), MAX_VARIABLES):
+            items = v2_list[i:i+MAX_VARIABLES]
+            rows = self.fetch(
+                "SELECT v2, v3 FROM pid_versions WHERE v2 IN ({}) "
+                "ORDER BY id".format(", ".join("?" * len(items))),
+                items)
+            for v2, v3 in rows:
+                found.setdefault(v2, v3)
+        return found
+
     def get_pid_v3(self, v2):
         found = self.fetch("SELECT v3 FROM pid_versions WHERE v2 = ?", (v2,))
 
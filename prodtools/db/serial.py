@@ -2,7 +2,7 @@
 import os
 import shutil
 
-from prodtools.utils import fs_utils, xml_utils, encoding
+from prodtools.utils import fs_utils, publication
 
 
 def filename_language_suffix(filename):
@@ -173,10 +173,10 @@ class IssueFiles(IssuePathsInSerial):
         if not os.path.isdir(self.base_source_path):
             os.makedirs(self.base_source_path)
         for file_path in xml_files:
-            try:
-                shutil.copy(file_path, self.base_source_path)
-            except shutil.SameFileError:
-                continue
+            publication.publish_file(
+                file_path,
+                os.path.join(
+                    self.base_source_path, os.path.basename(file_path)))
 
     def delete_id_files(self, delete_id_items):
         errors = []
@@ -193,10 +193,13 @@ class IssueFiles(IssuePathsInSerial):
     def backup_folder(self, src_path, dest_path):
         if not os.path.isdir(dest_path):
             os.makedirs(dest_path)
+        src_files = set(os.listdir(src_path))
         for fname in os.listdir(dest_path):
-            fs_utils.delete_file_or_folder(os.path.join(dest_path, fname))
-        for fname in os.listdir(src_path):
-            shutil.copy(os.path.join(src_path, fname), dest_path)
+            if fname not in src_files:
+                fs_utils.delete_file_or_folder(os.path.join(dest_path, fname))
+        for fname in src_files:
+            publication.publish_file(
+                os.path.join(src_path, fname), os.path.join(dest_path, fname))
         return (len(os.listdir(src_path)) == len(os.listdir(dest_path)))
 
     def backup_id_folder(self, backup_name='.bkp'):
@@ -318,48 +321,33 @@ class WebsiteFiles(object):
             name, ext = os.path.splitext(file_path)
             destination_path = path.get(ext)
             if destination_path is None:
-                shutil.copy(file_path, path['.img'])
-                msg.append('  {} => {}'.format(f, path['.img']))
+                result = publication.publish_file(
+                    file_path, os.path.join(path['.img'], f), allow_link=True)
+                msg.append('  {} => {} ({})'.format(f, path['.img'], result))
             elif ext == '.pdf':
                 pdf_filenames = [f]
                 new_pdf_filename = new_name_for_pdf_filename(f)
                 if new_pdf_filename:
                     pdf_filenames.append(new_pdf_filename)
                 for pdf_filename in pdf_filenames:
-                    shutil.copy(file_path, destination_path)
-                    msg.append('  {} => {}'.format(
-                        f, os.path.join(destination_path, pdf_filename)))
+                    result = publication.publish_file(
+                        file_path,
+                        os.path.join(destination_path, pdf_filename),
+                        allow_link=True)
+                    msg.append('  {} => {} ({})'.format(
+                        f, os.path.join(destination_path, pdf_filename),
+                        result))
             elif ext == '.xml':
-                xml_content = self._remove_dtd_url_schema(file_path)
-                if xml_content:
-                    fs_utils.write_file(os.path.join(destination_path, f), xml_content)
-                else:
-                    shutil.copy(file_path, destination_path)
-                msg.append('  {} => {}'.format(f, path[ext]))
+                result = publication.publish_xml_with_local_dtd(
+                    file_path, os.path.join(destination_path, f))
+                msg.append('  {} => {} ({})'.format(f, path[ext], result))
             else:
-                shutil.copy(file_path, destination_path)
-                msg.append('  {} => {}'.format(f, path[ext]))
+                result = publication.publish_file(
+                    file_path, os.path.join(destination_path, f),
+                    allow_link=True)
+                msg.append('  {} => {} ({})'.format(f, path[ext], result))
         return '\n'.join(['<p>{}</p>'.format(item) for item in msg])
 
-    def _remove_dtd_url_schema(self, xml_file_path):
-        try:
-            xml_tree = xml_utils.get_xml_object(xml_file_path)
-        except xml_utils.etree.XMLSyntaxError:
-            pass
-        else:
-            if xml_tree.docinfo:
-                url = xml_tree.docinfo.system_url
-                dtd_file_name = os.path.basename(url)
-                xml_tree.docinfo.system_url = dtd_file_name
-                xml_content = encoding.decode(
-                    xml_utils.etree.tostring(
-                        xml_tree,
-                        pretty_print=False,
-                        doctype=xml_tree.docinfo.doctype,
-                    )
-                )
-                return xml_content
-
     def identify_ex_aop_pdf_files_to_update(self, aop_pdf_replacements):
         """
         Identifica quais são os arquivos a serem atualizados
@@ -2,6 +2,7 @@
 
 import os
 import shutil
+import threading
 
 from prodtools import _
 
@@ -9,6 +10,7 @@ from prodtools.utils import utils
 from prodtools.utils import xml_utils
 from prodtools.utils import fs_utils
 from prodtools.utils import encoding
+from prodtools.utils import tracing
 from prodtools.reports import html_reports
 from prodtools.reports import validation_status
 from prodtools.data.article import Issue, Article, Journal
@@ -22,6 +24,8 @@ from prodtools.utils.dbm import dbm_isis
 from prodtools.db import ws_journals
 
 
+DB_COPY_LOCK = threading.RLock()
+
 ISSN_TYPE_CONVERSION = {
     'ONLIN': 'epub',
     'PRINT': 'ppub',
@@ -853,6 +857,7 @@ class ArticlesManager(object):
     def exclude_articles(self, excluded_orders):
         return self.base_manager.exclude_articles(excluded_orders)
 
+    @tracing.traced()
     def get_valid_aop(self, article):
         valid_aop, aop_status, messages = self.aop_db_manager.get_validated_aop(article)
         self.xc_messages.extend(messages)
@@ -860,6 +865,7 @@ class ArticlesManager(object):
             article.registered_aop_pid = valid_aop.pid
         return (aop_status, valid_aop)
 
+    @tracing.traced()
     def exclude_aop(self, valid_aop):
         is_excluded_aop, messages, aop_issue_folder_name = self.aop_db_manager.manage_ex_aop(valid_aop)
 
@@ -931,6 +937,7 @@ class ArticlesManager(object):
         status_items['aop'] = self.aop_db_manager.still_aop_items()
         return status_items
 
+    @tracing.traced()
     def convert_articles(self, xml_files, articles, i_record, create_windows_base):
         self.articles_conversion_status = {}
         self.articles_aop_status = {}
@@ -944,7 +951,8 @@ class ArticlesManager(object):
         for xml_name, article in articles.items():
             if not article.marked_to_delete:
                 self.articles_orders[xml_name] = article.order
-                self.convert_article(article, i_record, xml_name)
+                with tracing.span('convert_document', document=xml_name):
+                    self.convert_article(article, i_record, xml_name)
                 if self.articles_conversion_status[xml_name] is False:
                     error = True
 
@@ -960,6 +968,7 @@ class ArticlesManager(object):
                 scilista_items.append(self.issue_files.acron_issue_label)
         return scilista_items
 
+    @tracing.traced()
     def finish_conversion(self, i_record):
         self.base_manager.finish_conversion(i_record)
 
@@ -1058,15 +1067,14 @@ class BaseManager(object):
 
     def create_db(self):
         if os.path.isfile(self.issue_files.id_filename):
-            self.db_isis.id_file_to_db(
-                self.issue_files.id_filename, self.issue_files.base)
+            id_filenames = [self.issue_files.id_filename]
             for f in os.listdir(self.issue_files.id_path):
                 file_path = os.path.join(self.issue_files.id_path, f)
                 if f == '00000.id':
                     fs_utils.delete_file_or_folder(file_path)
                 if f.endswith('.id') and f != '00000.id' and f != 'i.id':
-                    self.db_isis.append_id_file_to_db(
-                        file_path, self.issue_files.base)
+                    id_filenames.append(file_path)
+            self.db_isis.id_files_to_db(id_filenames, self.issue_files.base)
 
     def article_records(self, i_record, article, article_files):
         _article_records = None
@@ -1117,6 +1125,7 @@ class BaseManager(object):
         self.create_issue_id_file(i_record)
         self.create_db()
 
+    @tracing.traced()
     def generate_windows_version(self):
         if not os.path.isdir(self.issue_files.windows_base_path):
             os.makedirs(self.issue_files.windows_base_path)
@@ -1346,6 +1355,7 @@ class AopManager(object):
     def scilista_items(self):
         return [self.journal_files.acron + ' ' + base for base in self.updated_issue_bases if 'ex-' not in base]
 
+    @tracing.traced()
     def update_all_aop_db(self):
         if len(self.updated_issue_bases) > 0:
             for issueid in self.updated_issue_bases:
@@ -1401,6 +1411,7 @@ class IssueAndTitleManager(object):
         self.db_isis = db_isis
         self.serial_path = serial_path
 
+    @tracing.traced()
     def update_db_copy(self, isis_db, isis_db_copy, fst_file):
         d = os.path.dirname(isis_db_copy)
         if not os.path.isdir(d):
@@ -1434,6 +1445,11 @@ class IssueAndTitleManager(object):
         return ' OR '.join(_expr) if len(_expr) > 0 else None
 
     def update_and_search(self, db, expr, source_db, fst_filename):
+        # as cópias de title e issue são compartilhadas pelos workers
+        with DB_COPY_LOCK:
+            return self._update_and_search(db, expr, source_db, fst_filename)
+
+    def _update_and_search(self, db, expr, source_db, fst_filename):
         result = []
         updated = False
         if os.path.isfile(db + '.mst'):
@@ -2,11 +2,13 @@
 import logging
 import os
 import shutil
+import time
 
 from prodtools import _
 from prodtools import XPM_VERSION_FILE_PATH
 from prodtools.utils import encoding
 from prodtools.utils import fs_utils
+from prodtools.utils import tracing
 from prodtools.utils.exporter import Exporter
 from prodtools.reports import html_reports
 from prodtools.reports import validation_status
@@ -112,6 +114,7 @@ class ArticlesConversion(object):
         self.updated_scilista_items = None
         self.sps_pkg_info = None
 
+    @tracing.traced()
     def convert(self):
         self.updated_scilista_items = None
         self.articles_conversion_validations = validations_module.ValidationsResultItems()
@@ -132,6 +135,7 @@ class ArticlesConversion(object):
 
         return scilista_items
 
+    @tracing.traced()
     def register_pids_and_update_xmls(self, pid_manager: PIDVersionsManager) -> None:
         """Invoca o registro de PIDs em um banco de dados e logo após registra
         os PIDs nos documentos XMLs presentes no pacote."""
@@ -151,6 +155,7 @@ class ArticlesConversion(object):
         )
         logger.debug("Articles that compose this package were updated with SciELO Pids (v2, and v3)")
 
+    @tracing.traced()
     def export_package_to_spf_directory(self, exporter: callable, package_name: str):
         """Exporta o pacote SPS de acordo com a estratégia utilizada"""
         if self.updated_scilista_items is None:
@@ -176,6 +181,7 @@ class ArticlesConversion(object):
             return self.db.db_aop_status
         return {}
 
+    @tracing.traced()
     def update_local_website_with_asset_files(self):
         if self.updated_scilista_items and self.local_web_app_path:
             # copia os arquivos do pacote para o sítio local
@@ -369,6 +375,12 @@ class ArticlesConversion(object):
     def spf_message(self):
         if not self.sps_pkg_info:
             return ""
+        if self.sps_pkg_info.get("status") == "failed":
+            return html_reports.p_message(
+                _("[ERROR] Unable to make {} available for SPF: {}").format(
+                    self.sps_pkg_info.get("file"),
+                    self.sps_pkg_info.get("error"))
+            )
         ftp = ""
         if self.sps_pkg_info.get("server"):
             ftp = _("(FTP: {} | User: {})").format(
@@ -390,21 +402,40 @@ class PkgProcessor(object):
         self.is_db_generation = stage == 'xc'
         self.xpm_version = xpm_version() if stage == 'xpm' else None
         self.registered_issues_manager = None
+        self._registered_issues_manager_time = None
         self._pid_manager = None
+        # recebe o resultado da exportação do pacote (envio em segundo plano)
+        self.export_callback = None
 
     @property
     def export_documents_package(self):
         if self.config.kernel_gate:
-            return Exporter(self.config.kernel_gate).export
-
+            return Exporter(
+                self.config.kernel_gate, self.export_callback).export
+
+    def refresh(self, ttl=None):
+        """
+        Descarta os dados de periódicos e das bases title e issue
+        carregados há mais de `ttl` segundos (processo residente)
+        """
+        ttl = ttl if ttl is not None else self.config.xc_cache_ttl
+        if (ttl is not None and
+                self._registered_issues_manager_time is not None and
+                time.time() - self._registered_issues_manager_time > ttl):
+            logger.info("Refresh registered issues data")
+            self.registered_issues_manager = None
+
+    @tracing.traced()
     def evaluate_package(self, pkg):
         logger.info("Analize package")
-        self.registered_issues_manager = (
-            self.registered_issues_manager or
-            xc_models.RegisteredIssuesManager(
-                self.config, self.is_db_generation))
+        self.refresh()
+        if self.registered_issues_manager is None:
+            self.registered_issues_manager = xc_models.RegisteredIssuesManager(
+                self.config, self.is_db_generation)
+            self._registered_issues_manager_time = time.time()
 
-        registered_issue_data = self.registered_issues_manager.get_registered_issue_data(pkg.issue_data)
+        with tracing.span('registered_issue_data'):
+            registered_issue_data = self.registered_issues_manager.get_registered_issue_data(pkg.issue_data)
 
         if len(registered_issue_data.registered_articles) > 0:
             logging.info(_('Previously registered: ({n} files)').format(
@@ -417,6 +448,7 @@ class PkgProcessor(object):
         pkg_eval_result = evaluator.evaluate()
         return registered_issue_data, pkg_eval_result
 
+    @tracing.traced()
     def make_package(self, pkg, GENERATE_PMC=False):
         registered_issue_data, pkg_eval_result = self.evaluate_package(pkg)
         self.report_result(pkg, pkg_eval_result, conversion=None)
@@ -424,6 +456,7 @@ class PkgProcessor(object):
         if not self.is_xml_generation:
             pkg.zip()
 
+    @tracing.traced()
     def convert_package(self, pkg):
         if len(pkg.package_folder.xml_list) == 0:
             raise PackageHasNoXMLFilesError(
@@ -458,6 +491,7 @@ class PkgProcessor(object):
         mail_info = subject, mail_content
         return (scilista_items, conversion.xc_status, mail_info)
 
+    @tracing.traced()
     def report_result(self, pkg, pkg_eval_result, conversion=None):
         logger.info("Generate reports")
         if conversion is None:
@@ -487,6 +521,7 @@ class PkgProcessor(object):
 
         return reports
 
+    @tracing.traced()
     def make_pmc_package(self, pkg, GENERATE_PMC):
         if GENERATE_PMC:
             logger.info("Make PMC Package")
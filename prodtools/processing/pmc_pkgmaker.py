@@ -2,10 +2,13 @@
 import logging
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 
 from prodtools import _
+from prodtools.utils import archive
 from prodtools.utils import encoding
 from prodtools.utils import xml_utils
+from prodtools.utils import tracing
 from prodtools.reports import html_reports
 from prodtools.validations import sps_xml_validators
 from prodtools.processing import xml_versions
@@ -15,6 +18,8 @@ from prodtools.data import article
 
 logger = logging.getLogger()
 
+MAX_WORKERS = 4
+
 
 class PMCPackageMaker(object):
 
@@ -30,25 +35,40 @@ class PMCPackageMaker(object):
         encoding.display_message('\n')
         encoding.display_message(_('Generating PMC Package'))
         n = '/' + str(len(self.article_items))
-        index = 0
 
-        for xml_name, doc in self.article_items.items():
-            index += 1
-            item_label = str(index) + n + ': ' + xml_name
-            encoding.display_message(item_label)
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            futures = []
+            for index, xml_name in enumerate(self.article_items.keys(), 1):
+                item_label = str(index) + n + ': ' + xml_name
+                encoding.display_message(item_label)
+
+                pmc_filename = os.path.join(
+                    self.wk.pmc_package_path, xml_name + '.xml')
 
-            pmc_filename = os.path.join(
-                self.wk.pmc_package_path, xml_name + '.xml')
+                futures.append(executor.submit(
+                    tracing.bind(self.make_package_item),
+                    xml_name, pmc_filename))
+            for future in futures:
+                doit = future.result()
 
-            doit = PMCPackageItemMaker(
+        if doit:
+            try:
+                workarea.MultiDocsPackageFolder(
+                    self.wk.pmc_package_path).zip()
+            except archive.ArchiveError as e:
+                logger.error(
+                    "Unable to zip %s: %s", self.wk.pmc_package_path, e)
+                encoding.display_message(
+                    _("Unable to create the PMC package zip: {}").format(e))
+
+    def make_package_item(self, xml_name, pmc_filename):
+        with tracing.span('pmc_document', document=xml_name):
+            return PMCPackageItemMaker(
                 self.outputs[xml_name],
                 self.pkg_files[xml_name],
                 self.article_items[xml_name],
                 pmc_filename).make_package()
 
-        if doit:
-            workarea.MultiDocsPackageFolder(self.wk.pmc_package_path).zip()
-
 
 class PMCPackageItemMaker(object):
 
@@ -76,20 +96,20 @@ class PMCPackageItemMaker(object):
             return True
 
     def make_xml(self, scielo_dtd_files, pmc_dtd_files):
-
+        """
+        Gera o XML PMC em memória (xml2pmc.xsl, ajustes de href e math/@id,
+        pmc.xsl), grava o arquivo uma única vez e valida o resultado
+        """
         sps_xml = self.article.tree
         # j1.1/xsl/sgml2xml/xml2pmc.xsl
         pmc_xml = xml_utils.transform(sps_xml, scielo_dtd_files.xsl_output)
-        xml_utils.write(self.pmc_xml_filepath, pmc_xml)
-
-        # recarrega
-        pmc_xml = xml_utils.SuitableXML(self.pmc_xml_filepath)
 
-        filenames, changed = self._get_filenames(pmc_xml.xml)
-        numbers = self._insert_math_id(pmc_xml.xml)
+        # equivale a gravar e recarregar o arquivo
+        pmc_xml = xml_utils.SuitableXML(
+            encoding.decode(xml_utils.xml_bytes(pmc_xml)))
 
-        if numbers or changed:
-            pmc_xml.write(self.pmc_xml_filepath)
+        filenames = self._get_filenames(pmc_xml.xml)[0]
+        self._insert_math_id(pmc_xml.xml)
 
         dirname = os.path.dirname(self.pmc_xml_filepath)
         for old, new in filenames:
@@ -104,11 +124,14 @@ class PMCPackageItemMaker(object):
 
         # j1.1/xsl/sgml2xml/pmc.xsl
         result = xml_utils.transform(pmc_xml.xml, pmc_dtd_files.xsl_output)
-        xml_utils.write(self.pmc_xml_filepath, result)
+        content = xml_utils.xml_bytes(result)
+        with open(self.pmc_xml_filepath, "wb") as fp:
+            fp.write(content)
 
         # validate
         xml_validator = sps_xml_validators.PMCXMLValidator(pmc_dtd_files)
-        xml_validator.validate(
+        xml_validator.validate_tree(
+            xml_utils.parse_bytes(content),
             self.pmc_xml_filepath,
             self.outputs.pmc_dtd_report_filename,
             self.outputs.pmc_style_report_filename
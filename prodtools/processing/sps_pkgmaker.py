@@ -6,10 +6,10 @@ from mimetypes import MimeTypes
 from urllib.request import pathname2url
 
 from prodtools import _
-from packtools.utils import SPPackage
-from packtools.exceptions import SPPackageError
+from prodtools.utils import archive
 from prodtools.utils import fs_utils
 from prodtools.utils import xml_utils
+from prodtools.utils import tracing
 from prodtools.data import attributes
 from prodtools.data import workarea
 from prodtools.data import package
@@ -339,6 +339,10 @@ class PackageMaker(object):
         if not files:
             return
 
+        # packtools é importado somente quando necessário
+        from packtools.utils import SPPackage
+        from packtools.exceptions import SPPackageError
+
         try:
             zip_regular = os.path.join(tmp_path, "regular.zip")
             zip_optimised = os.path.join(tmp_path, "optimised.zip")
@@ -352,7 +356,7 @@ class PackageMaker(object):
                 raise PackageMakerOptimiserPreReqError(
                     "{} must not be a existing file")
 
-            fs_utils.zip(zip_regular, files)
+            fs_utils.zip(zip_regular, files, archive.TEMP)
             if not os.path.isfile(zip_regular):
                 raise PackageMakerOptimiserPreReqError(
                     "{} was not created")
@@ -373,6 +377,7 @@ class PackageMaker(object):
             fs_utils.delete_file_or_folder(zip_optimised)
             fs_utils.delete_file_or_folder(zip_regular)
 
+    @tracing.traced()
     def pack(self, xml_list=None, dtd_location_type='remote',
              sgmxml_name=None):
         """
@@ -423,18 +428,20 @@ class PackageMaker(object):
 
             logger.debug("Pack %s", item.filename)
             print("Pack", item.filename)
-            doc_outs = self.output_folder.get_doc_outputs(item.name)
-            enhanced_pkg_path = self._enhance_doc_package(
-                item, doc_outs, dtd_location_type, optimise_individually)
+            with tracing.span('pack_document', document=item.name):
+                doc_outs = self.output_folder.get_doc_outputs(item.name)
+                enhanced_pkg_path = self._enhance_doc_package(
+                    item, doc_outs, dtd_location_type, optimise_individually)
 
-            if self.optimise and optimise_individually:
-                tmp_path = doc_outs.create_dir_at_work_path("opt")
-                self._optimise_doc_package(enhanced_pkg_path, tmp_path)
+                if self.optimise and optimise_individually:
+                    tmp_path = doc_outs.create_dir_at_work_path("opt")
+                    self._optimise_doc_package(enhanced_pkg_path, tmp_path)
 
         if self.optimise and not optimise_individually:
-            self._optimise_doc_package(
-                self.destination_path,
-                self.output_folder.tmp_path)
+            with tracing.span('optimise_package'):
+                self._optimise_doc_package(
+                    self.destination_path,
+                    self.output_folder.tmp_path)
 
         logger.debug("Packed: %s", self.destination_path)
         print("Packed:", self.destination_path)
@@ -5,13 +5,27 @@ from prodtools import DTD_AND_XSL_PATH
 
 import configparser
 
-XPM_FILES = configparser.ConfigParser()
-XPM_FILES.read(os.path.join(DTD_AND_XSL_PATH, 'versions.ini'))
+_XPM_FILES = None
 
 
-DEFAULT_VERSION = XPM_FILES.sections()[0]
+def xpm_files():
+    """
+    Dados de versions.ini, lidos somente no primeiro uso
+    """
+    global _XPM_FILES
+    if _XPM_FILES is None:
+        data = configparser.ConfigParser()
+        data.read(os.path.join(DTD_AND_XSL_PATH, 'versions.ini'))
+        _XPM_FILES = data
+    return _XPM_FILES
 
-valid_dtd_items = XPM_FILES.sections()
+
+def valid_dtd_items():
+    return xpm_files().sections()
+
+
+def default_version():
+    return valid_dtd_items()[0]
 
 _SPS_VERSIONS = (
     ('None', [
@@ -86,15 +100,15 @@ def xsl_getter(sps_version):
     print("SPS version: %s" % sps_version)
     dtd_version = get_dtd_version(sps_version)
     return os.path.join(
-        DTD_AND_XSL_PATH, XPM_FILES[dtd_version]["folder"],
+        DTD_AND_XSL_PATH, xpm_files()[dtd_version]["folder"],
         'xsl', 'sgml2xml', 'sgml2xml.xsl'
     )
 
 
 def dtd_locations():
     locations = {}
-    for version in XPM_FILES.sections():
-        dtd_info = XPM_FILES[version]
+    for version in valid_dtd_items():
+        dtd_info = xpm_files()[version]
         dtd_id = dtd_info['dtd_id']
         if dtd_id not in locations.keys():
             locations[dtd_id] = [
@@ -113,10 +127,10 @@ class DTDFiles(object):
     def __init__(self, database_name, version):
         self.database_name = database_name
         self.version = version
-        if version in XPM_FILES:
-            self.data = XPM_FILES[version]
+        if version in xpm_files():
+            self.data = xpm_files()[version]
         else:
-            self.data = XPM_FILES[DEFAULT_VERSION]
+            self.data = xpm_files()[default_version()]
 
     @property
     def real_dtd_path(self):
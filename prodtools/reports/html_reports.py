@@ -2,7 +2,9 @@
 
 import os
 import webbrowser
+from io import StringIO
 from datetime import datetime
+from contextlib import contextmanager
 
 from prodtools import _
 from prodtools import HTML_REPORTS_PATH
@@ -29,15 +31,48 @@ class TabbedReport(object):
 
     @property
     def report_content(self):
+        output = StringIO()
+        self.write(HTMLWriter(output))
+        return output.getvalue()
+
+    def write(self, writer):
         # tabs
-        content = tabs_items([(tab_id, self.labels[tab_id]) for tab_id in self.tabs if self.tabbed_content.get(tab_id) is not None], self.pre_selected)
+        writer.write(tabs_items([(tab_id, self.labels[tab_id]) for tab_id in self.tabs if self.tabbed_content.get(tab_id) is not None], self.pre_selected))
         # tabs content
         for tab_id in self.tabs:
             c = self.tabbed_content.get(tab_id)
             if c is not None:
                 style = self.style_selected if tab_id == self.pre_selected else self.style_not_selected
-                content += tab_block(tab_id, c, style)
-        return content
+                writer.write(*tab_block_parts(tab_id, c, style))
+
+
+class HTMLWriter(object):
+    """
+    Grava o relatório em `fp` à medida que as partes são geradas, sem
+    montá-lo inteiro em memória.
+    replacements: [(texto, substituto)] aplicados a cada parte gravada
+    (por exemplo, os caminhos {IMG_PATH}, {PDF_PATH})
+    """
+
+    def __init__(self, fp, replacements=None):
+        self.fp = fp
+        self.replacements = [
+            (old, new or '') for old, new in replacements or []]
+
+    def write(self, *parts):
+        for part in parts:
+            if not part:
+                continue
+            for old, new in self.replacements:
+                if old in part:
+                    part = part.replace(old, new)
+            self.fp.write(part)
+
+    def begin(self, title, has_math=False):
+        self.write(html_head(title, has_math))
+
+    def end(self, has_math=False):
+        self.write(html_tail(has_math))
 
 
 class HideAndShowBlocksReport(object):
@@ -228,33 +263,40 @@ def report_title(titles):
     return ''.join([tag('h1', item) for item in titles])
 
 
-def html(title, body):
-    has_math = '<mml:math' in body or ':math' in body
-    s = ''
-    s += '<html>'
-    s += '<head>'
+def html_head(title, has_math=False):
+    s = []
+    s.append('<html>')
+    s.append('<head>')
 
     if title is None:
         title = ''
-    if body is None:
-        body = ''
     if isinstance(title, list):
-        s += '<meta charset="utf-8"/><title>' + ' - '.join(title) + '</title>'
+        s.append('<meta charset="utf-8"/><title>' + ' - '.join(title) + '</title>')
     else:
-        s += '<meta charset="utf-8"/><title>' + title + '</title>'
+        s.append('<meta charset="utf-8"/><title>' + title + '</title>')
     if has_math:
-        s += '    <meta Content-math-Type="text/mathml"/>'
-    s += css_styles()
-    s += '</head>'
-    s += '<body>'
-    s += report_date()
-    s += report_title(title)
-    s += body
-    s += js_styles(has_math)
-    s += '</body>'
-    s += '</html>'
+        s.append('    <meta Content-math-Type="text/mathml"/>')
+    s.append(css_styles())
+    s.append('</head>')
+    s.append('<body>')
+    s.append(report_date())
+    s.append(report_title(title))
+    return ''.join(s)
+
+
+def html_tail(has_math=False):
+    return js_styles(has_math) + '</body>' + '</html>'
+
 
-    return s
+def has_math_content(content):
+    return '<mml:math' in content or ':math' in content
+
+
+def html(title, body):
+    if body is None:
+        body = ''
+    has_math = has_math_content(body)
+    return html_head(title, has_math) + body + html_tail(has_math)
 
 
 def sheet(table_header, table_data, table_style='sheet', row_style=None, colums_styles={}, html_cell_content=[], widths=None):
@@ -331,7 +373,7 @@ def sheet_build(table_header, table_rows_data, table_style='sheet', style4row=No
     if widths is None:
         w = str(int(float(100) / len(table_header)))
         widths = {label: w for label in table_header}
-    rows = ''
+    rows = []
     for row_data in table_rows_data:
         if len(row_data) == 1 and len(table_header) > 1:
             key = list(row_data.keys())[0]
@@ -340,7 +382,7 @@ def sheet_build(table_header, table_rows_data, table_style='sheet', style4row=No
             else:
                 columns = '<td colspan="' + str(len(table_header)) + '">' + row_data.get(key) + '</td>'
         elif len(table_header) <= len(row_data):
-            columns = ''
+            columns = []
             for label in table_header:
                 col_style = sheet_col_style(label, columns_styles)
 
@@ -351,10 +393,11 @@ def sheet_build(table_header, table_rows_data, table_style='sheet', style4row=No
                         col_value = ' - '
                 else:
                     col_value = sheet_column_value(row_data.get(label), widths[label], (label in html_cell_content), _color_text)
-                columns += sheet_column(col_value, style=col_style, width=widths[label])
+                columns.append(sheet_column(col_value, style=col_style, width=widths[label]))
+            columns = ''.join(columns)
         row_style = sheet_row_style(table_header, style4row, columns)
-        rows += sheet_row(columns, row_style)
-    return tag('p', tag('table', tag('thead', tag('tr', th)) + tag('tbody', rows), table_style))
+        rows.append(sheet_row(columns, row_style))
+    return tag('p', tag('table', tag('thead', tag('tr', th)) + tag('tbody', ''.join(rows)), table_style))
 
 
 def break_words(value, width=40):
@@ -481,6 +524,28 @@ def save(filename, title, body, teste=None):
     fs_utils.write_file(filename, r)
 
 
+@contextmanager
+def open_report(filename, title, has_math=False, replacements=None):
+    """
+    Retorna HTMLWriter para gravar o corpo do relatório `filename`.
+    O arquivo é gravado com nome temporário e renomeado ao final
+    """
+    d = os.path.dirname(filename)
+    if d and not os.path.isdir(d):
+        os.makedirs(d)
+    tmp = filename + '.tmp'
+    try:
+        with open(tmp, 'w', encoding='utf-8') as fp:
+            writer = HTMLWriter(fp, replacements)
+            writer.begin(title, has_math)
+            yield writer
+            writer.end(has_math)
+        os.replace(tmp, filename)
+    finally:
+        if os.path.isfile(tmp):
+            os.unlink(tmp)
+
+
 def get_message_style(value, default=''):
     if value is None:
         value = ''
@@ -525,12 +590,16 @@ def section(title, content):
 
 
 def tab_block(tab_id, content, status='not-selected-tab-content'):
+    return ''.join(tab_block_parts(tab_id, content, status))
+
+
+def tab_block_parts(tab_id, content, status='not-selected-tab-content'):
     if content is None:
         content = ''
-    r = '<div id="tab-content-' + tab_id + '" class="' + status + '">'
-    r += content
-    r += '</div>'
-    return r
+    return (
+        '<div id="tab-content-' + tab_id + '" class="' + status + '">',
+        content,
+        '</div>')
 
 
 def tabs_items(tabs, selected):
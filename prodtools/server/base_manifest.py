@@ -0,0 +1,122 @@
+# coding=utf-8
+"""
+Manifesto das bases do sítio (artigo, issue, newissue, title)
+
+Para cada arquivo da base são registrados tamanho, data de modificação e
+o hash de cada bloco de `BLOCK_SIZE` bytes. Comparando o manifesto atual
+com o da última publicação bem sucedida, obtém-se quais arquivos e quais
+trechos (blocos) mudaram, de modo que somente eles sejam transferidos.
+"""
+import os
+import json
+import hashlib
+import logging
+
+
+logger = logging.getLogger()
+
+
+BLOCK_SIZE = 1024 * 1024
+
+
+def block_hashes(file_path, block_size=BLOCK_SIZE):
+    hashes = []
+    with open(file_path, 'rb') as fp:
+        for block in iter(lambda: fp.read(block_size), b''):
+            hashes.append(hashlib.sha1(block).hexdigest())
+    return hashes
+
+
+def build_manifest(base_path, previous=None, block_size=BLOCK_SIZE):
+    """
+    Retorna {caminho relativo: {size, mtime, blocks}}
+    Os hashes de arquivos com tamanho e data iguais aos de `previous`
+    são reaproveitados
+    """
+    previous = previous or {}
+    manifest = {}
+    for path, dirs, files in os.walk(base_path):
+        for name in files:
+            file_path = os.path.join(path, name)
+            relpath = os.path.relpath(file_path, base_path)
+            stat = os.stat(file_path)
+            item = previous.get(relpath)
+            if (item is None or item['size'] != stat.st_size or
+                    item['mtime'] != stat.st_mtime):
+                item = {
+                    'size': stat.st_size,
+                    'mtime': stat.st_mtime,
+                    'blocks': block_hashes(file_path, block_size),
+                }
+            manifest[relpath] = item
+    return manifest
+
+
+def changed_ranges(previous, current, block_size=BLOCK_SIZE):
+    """
+    Retorna {caminho relativo: [(offset, length), ...] ou None}
+    None indica arquivo novo (transferência completa)
+    """
+    previous = previous or {}
+    changes = {}
+    for relpath, item in sorted(current.items()):
+        old = previous.get(relpath)
+        if old is None:
+            changes[relpath] = None
+            continue
+        if old['blocks'] == item['blocks']:
+            continue
+        ranges = []
+        for i, block in enumerate(item['blocks']):
+            if i < len(old['blocks']) and old['blocks'][i] == block:
+                continue
+            offset = i * block_size
+            length = min(block_size, item['size'] - offset)
+            if ranges and ranges[-1][0] + ranges[-1][1] == offset:
+                ranges[-1] = (ranges[-1][0], ranges[-1][1] + length)
+            else:
+                ranges.append((offset, length))
+        changes[relpath] = ranges
+    return changes
+
+
+def changes_size(changes, manifest):
+    """
+    Quantidade de bytes a transferir
+    """
+    total = 0
+    for relpath, ranges in changes.items():
+        if ranges is None:
+            total += manifest[relpath]['size']
+        else:
+            total += sum(length for offset, length in ranges)
+    return total
+
+
+class BaseManifests(object):
+    """
+    Manifestos da última publicação, gravados em `manifests_path`
+    (um arquivo JSON por base)
+    """
+
+    def __init__(self, manifests_path):
+        self.manifests_path = manifests_path
+
+    def _filename(self, name):
+        return os.path.join(self.manifests_path, name + '.json')
+
+    def read(self, name):
+        try:
+            with open(self._filename(name), 'r', encoding='utf-8') as fp:
+                return json.load(fp)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def write(self, name, manifest):
+        if not os.path.isdir(self.manifests_path):
+            os.makedirs(self.manifests_path)
+        filename = self._filename(name)
+        tmp = filename + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as fp:
+            json.dump(manifest, fp)
+        os.replace(tmp, filename)
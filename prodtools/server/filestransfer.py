@@ -1,6 +1,14 @@
 # coding=utf-8
+import os
+import hashlib
+import logging
 
 from prodtools.utils import remote_server
+from prodtools.server import base_manifest
+from prodtools.server import transfer_manager
+
+
+logger = logging.getLogger()
 
 
 class SciELOWebFilesTransfer(object):
@@ -8,32 +16,70 @@ class SciELOWebFilesTransfer(object):
     def __init__(self, config, _logger=None):
         self.config = config
         if self.config.is_enabled_transference:
-            self.servers = [remote_server.RemoteServer(server, self.config.transference_user, _logger) for server in self.config.transference_servers]
+            self.servers = [
+                remote_server.get_server(
+                    server, self.config.transference_user, _logger)
+                for server in self.config.transference_servers]
+            self.manager = transfer_manager.TransferManager(
+                self.servers,
+                max_workers=self.config.transference_workers,
+                max_attempts=self.config.transference_attempts,
+                journal_path=self.config.transference_journal)
 
     def transfer_files(self, acron, issue_id, folders):
         if self.config.is_enabled_transference:
             issue_id_path = acron + '/' + issue_id
-            for server in self.servers:
-                for folder in folders:
-                    dest_path = self.config.remote_web_app_path + folder + issue_id_path
-                    source_path = self.config.local_web_app_path + folder + issue_id_path
-                    server.run_remote_mkdirs(dest_path)
-                    server.run_rsync(source_path, dest_path)
+            items = []
+            for folder in folders:
+                dest_path = self.config.remote_web_app_path + folder + issue_id_path
+                source_path = self.config.local_web_app_path + folder + issue_id_path
+                items.append((source_path, dest_path))
+            return self.manager.transfer(items)
 
     def transfer_website_files(self, acron, issue_id):
         folders = ['/htdocs/img/revistas/', '/bases/pdf/', '/bases/xml/']
-        self.transfer_files(acron, issue_id, folders)
+        return self.transfer_files(acron, issue_id, folders)
 
     def transfer_report_files(self, acron, issue_id):
         folders = ['/htdocs/reports/']
-        self.transfer_files(acron, issue_id, folders)
+        return self.transfer_files(acron, issue_id, folders)
 
-    def transfer_website_bases(self):
+    def transfer_website_bases(self, dry_run=False):
+        """
+        Transfere somente os arquivos (e trechos) das bases alterados desde
+        a última publicação bem sucedida
+        dry_run: não transfere, retorna {base: bytes a transferir}
+        """
         if self.config.is_enabled_transference:
-            dest_path = self.config.remote_web_app_path + '/bases/'
-            folders = ['artigo', 'issue', 'newissue', 'title']
-            for server in self.servers:
-                server.run_remote_mkdirs(dest_path)
-                for folder in folders:
-                    source_path = self.config.local_web_app_path + '/bases/' + folder
-                    server.run_scp(source_path, dest_path)
+            # os manifestos valem para o conjunto de servidores atual
+            manifests = base_manifest.BaseManifests(os.path.join(
+                self.config.transference_manifests_path,
+                hashlib.sha1(
+                    ';'.join(sorted(self.config.transference_servers)).encode(
+                        'utf-8')).hexdigest()[:12]))
+            items = []
+            current = {}
+            sizes = {}
+            for folder in ['artigo', 'issue', 'newissue', 'title']:
+                source_path = self.config.local_web_app_path + '/bases/' + folder
+                previous = manifests.read(folder)
+                current[folder] = base_manifest.build_manifest(
+                    source_path, previous)
+                changes = base_manifest.changed_ranges(
+                    previous, current[folder])
+                sizes[folder] = base_manifest.changes_size(
+                    changes, current[folder])
+                logger.info(
+                    "Transfer bases: %s: %i files, %i bytes",
+                    folder, len(changes), sizes[folder])
+                if changes:
+                    items.append((
+                        source_path,
+                        self.config.remote_web_app_path + '/bases/' + folder,
+                        changes))
+            if dry_run:
+                return sizes
+            self.manager.transfer(items)
+            for folder, manifest in current.items():
+                manifests.write(folder, manifest)
+            return sizes
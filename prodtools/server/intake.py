@@ -0,0 +1,85 @@
+# coding=utf-8
+"""
+Entrada dos pacotes baixados na fila de recepção (XC servidor)
+
+Antes de extrair um pacote, o conteúdo do arquivo compactado é verificado
+(para zip, somente o diretório central é lido): presença de XML,
+quantidade de membros, tamanho total descompactado e caminhos inseguros.
+O arquivo é guardado em `archive_path` com um hard link (ou cópia, se o
+link não for possível) e somente os pacotes aceitos são extraídos.
+"""
+import os
+import time
+import shutil
+import logging
+
+from prodtools.utils import files_extractor
+
+
+logger = logging.getLogger()
+
+
+MAX_MEMBERS = 5000
+MAX_SIZE = 2 * 1024 * 1024 * 1024
+
+
+def archive_package(file_path, archive_path):
+    """
+    Guarda `file_path` em `archive_path`, sem copiar os dados se ambos
+    estão no mesmo sistema de arquivos
+    """
+    archived = os.path.join(archive_path, os.path.basename(file_path))
+    if os.path.isfile(archived):
+        os.unlink(archived)
+    try:
+        os.link(file_path, archived)
+    except OSError:
+        shutil.copy(file_path, archived)
+    return archived
+
+
+class PackageIntake(object):
+
+    def __init__(self, max_members=MAX_MEMBERS, max_size=MAX_SIZE):
+        self.max_members = max_members
+        self.max_size = max_size
+
+    def rejection_reason(self, summary):
+        """
+        Motivo para recusar o pacote ou None se o pacote for aceito
+        """
+        if summary is None:
+            return 'invalid archive'
+        if summary.unsafe:
+            return 'unsafe paths: {}'.format(', '.join(summary.unsafe[:5]))
+        if not summary.xml:
+            return 'no XML files'
+        if self.max_members and summary.members > self.max_members:
+            return 'too many files: {} (max {})'.format(
+                summary.members, self.max_members)
+        if self.max_size and summary.size > self.max_size:
+            return 'too large: {} bytes uncompressed (max {})'.format(
+                summary.size, self.max_size)
+
+    def inspect(self, file_path):
+        """
+        Retorna as métricas de entrada do pacote, incluindo
+        `accepted` e `reason`
+        """
+        start = time.time()
+        summary = files_extractor.inspect_archive(file_path)
+        reason = self.rejection_reason(summary)
+        metrics = {
+            'package': os.path.basename(file_path),
+            'bytes': os.path.getsize(file_path),
+            'members': summary.members if summary else None,
+            'uncompressed': summary.size if summary else None,
+            'xml': summary.xml if summary else None,
+            'accepted': reason is None,
+            'reason': reason,
+            'inspect_time': round(time.time() - start, 3),
+        }
+        if reason:
+            logger.error(
+                "Intake: rejected %s: %s", metrics['package'], reason)
+        return metrics
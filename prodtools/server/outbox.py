@@ -0,0 +1,337 @@
+# coding=utf-8
+"""
+Outbox das ações posteriores à conversão de um pacote (XC servidor)
+
+Atualizar a scilista, transferir os arquivos para o sítio, enviar o
+e-mail com o resultado e transferir os relatórios são registrados numa
+base sqlite e executados por workers em segundo plano, de modo que um
+servidor de e-mail ou um servidor remoto lento não atrasa a conversão do
+próximo pacote. Em caso de falha, a tarefa é repetida após um intervalo
+crescente; esgotadas as tentativas, fica com status `failed`.
+
+As tarefas de tipos ordenados (`scilista`) são executadas uma de cada
+vez, na ordem em que foram registradas.
+
+Consulta: python -m prodtools.server.outbox <outbox.db> [--status failed]
+"""
+import os
+import json
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+
+from prodtools.server import reception_queue
+
+
+logger = logging.getLogger()
+
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+ORDERED_KINDS = ('scilista', )
+MAX_WORKERS = 2
+MAX_ATTEMPTS = 5
+BACKOFF = 30
+POLL_INTERVAL = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    package TEXT,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    error TEXT,
+    pid INTEGER,
+    created TEXT NOT NULL,
+    updated TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, kind, id);
+"""
+
+
+class Outbox(object):
+    """
+    Tarefas gravadas em `db_path`
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        dirname = os.path.dirname(db_path)
+        if dirname and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        with self.transaction() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            columns = [
+                row['name']
+                for row in conn.execute('PRAGMA table_info(tasks)')]
+            if 'pid' not in columns:
+                # bases criadas antes do registro do processo
+                conn.execute('ALTER TABLE tasks ADD COLUMN pid INTEGER')
+
+    def connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        conn = self.connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def add(self, kind, payload, package=None):
+        now = datetime.now().isoformat()
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                'INSERT INTO tasks '
+                '(kind, package, payload, status, created, updated) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (kind, package, json.dumps(payload), PENDING, now, now))
+            return cursor.lastrowid
+
+    def _as_dict(self, row):
+        if row is None:
+            return None
+        task = dict(row)
+        task['payload'] = json.loads(task['payload'])
+        return task
+
+    def get(self, task_id):
+        with self.transaction() as conn:
+            return self._as_dict(conn.execute(
+                'SELECT * FROM tasks WHERE id = ?', (task_id, )).fetchone())
+
+    def tasks(self, status=None):
+        query = 'SELECT * FROM tasks'
+        params = ()
+        if status:
+            query += ' WHERE status = ?'
+            params = (status, )
+        with self.transaction() as conn:
+            return [
+                self._as_dict(row)
+                for row in conn.execute(query + ' ORDER BY id', params)]
+
+    def claim(self, ordered=False):
+        """
+        Marca como `running` e retorna a próxima tarefa pronta para ser
+        executada, ou None.
+        ordered: tarefas de ORDERED_KINDS; somente a mais antiga ainda não
+        concluída pode ser executada
+        """
+        marks = ', '.join('?' * len(ORDERED_KINDS))
+        conn = self.connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            if ordered:
+                row = conn.execute(
+                    'SELECT * FROM tasks WHERE kind IN ({}) '
+                    'AND status IN (?, ?) ORDER BY id LIMIT 1'.format(marks),
+                    ORDERED_KINDS + (PENDING, RUNNING)).fetchone()
+                if row is not None and (
+                        row['status'] != PENDING or
+                        row['next_attempt'] > time.time()):
+                    row = None
+            else:
+                row = conn.execute(
+                    'SELECT * FROM tasks WHERE kind NOT IN ({}) '
+                    'AND status = ? AND next_attempt <= ? '
+                    'ORDER BY id LIMIT 1'.format(marks),
+                    ORDERED_KINDS + (PENDING, time.time())).fetchone()
+            if row is not None:
+                conn.execute(
+                    'UPDATE tasks SET status = ?, attempts = attempts + 1, '
+                    'pid = ?, updated = ? WHERE id = ?',
+                    (RUNNING, os.getpid(), datetime.now().isoformat(),
+                     row['id']))
+            conn.commit()
+        finally:
+            conn.close()
+        if row is not None:
+            return self.get(row['id'])
+
+    def finish(self, task_id, error=None, retry_in=None):
+        """
+        Registra o resultado da tarefa: concluída, a ser repetida após
+        `retry_in` segundos ou, sem `retry_in`, com falha definitiva
+        """
+        if error is None:
+            status, next_attempt = DONE, 0
+        elif retry_in is not None:
+            status, next_attempt = PENDING, time.time() + retry_in
+        else:
+            status, next_attempt = FAILED, 0
+        with self.transaction() as conn:
+            conn.execute(
+                'UPDATE tasks SET status = ?, next_attempt = ?, error = ?, '
+                'updated = ? WHERE id = ?',
+                (status, next_attempt, error, datetime.now().isoformat(),
+                 task_id))
+
+    def retry(self, task_id):
+        """
+        Volta uma tarefa com falha para a fila
+        """
+        with self.transaction() as conn:
+            conn.execute(
+                'UPDATE tasks SET status = ?, attempts = 0, next_attempt = 0 '
+                'WHERE id = ? AND status = ?', (PENDING, task_id, FAILED))
+
+    def recover(self):
+        """
+        Tarefas interrompidas (processo finalizado durante a execução)
+        voltam para a fila. As que estão em execução por outro processo
+        (outra execução do XC com o mesmo outbox) são mantidas; as do
+        próprio processo são de uma execução anterior com o mesmo PID,
+        pois `recover` é chamado antes de iniciar os workers
+        """
+        with self.transaction() as conn:
+            rows = conn.execute(
+                'SELECT id, pid FROM tasks WHERE status = ?',
+                (RUNNING, )).fetchall()
+            for row in rows:
+                if (row['pid'] != os.getpid() and
+                        reception_queue.is_running_process(row['pid'])):
+                    continue
+                conn.execute(
+                    'UPDATE tasks SET status = ? WHERE id = ? AND status = ?',
+                    (PENDING, row['id'], RUNNING))
+
+    def ready(self):
+        """
+        Quantidade de tarefas prontas para execução ou em execução
+        """
+        with self.transaction() as conn:
+            return conn.execute(
+                'SELECT COUNT(*) FROM tasks WHERE status = ? OR '
+                '(status = ? AND next_attempt <= ?)',
+                (RUNNING, PENDING, time.time())).fetchone()[0]
+
+
+class OutboxWorkers(object):
+    """
+    Executa as tarefas do `outbox` usando `handlers` ({kind: função
+    que recebe o payload}). `on_failure(task)` é chamado quando as
+    tentativas de uma tarefa se esgotam
+    """
+
+    def __init__(self, outbox, handlers, max_workers=MAX_WORKERS,
+                 max_attempts=MAX_ATTEMPTS, backoff=BACKOFF,
+                 on_failure=None):
+        self.outbox = outbox
+        self.handlers = handlers
+        self.max_workers = max_workers or 1
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.on_failure = on_failure
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._threads = []
+
+    def run_task(self, task):
+        try:
+            self.handlers[task['kind']](task['payload'])
+        except Exception as e:
+            logger.exception(
+                "Outbox: task %i (%s) failed", task['id'], task['kind'])
+            if task['attempts'] < self.max_attempts:
+                self.outbox.finish(
+                    task['id'], str(e),
+                    self.backoff * 2 ** (task['attempts'] - 1))
+                return False
+            self.outbox.finish(task['id'], str(e))
+            if self.on_failure is not None:
+                task['error'] = str(e)
+                self.on_failure(task)
+            return False
+        self.outbox.finish(task['id'])
+        return True
+
+    def run_pending(self, ordered=False):
+        """
+        Executa as tarefas prontas; retorna a quantidade executada
+        """
+        n = 0
+        while True:
+            task = self.outbox.claim(ordered)
+            if task is None:
+                return n
+            self.run_task(task)
+            n += 1
+
+    def _loop(self, ordered):
+        while not self._stop.is_set():
+            if not self.run_pending(ordered):
+                self._wakeup.wait(POLL_INTERVAL)
+                self._wakeup.clear()
+
+    def start(self):
+        if self._threads:
+            return
+        self.outbox.recover()
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(
+                target=self._loop, args=(i == 0, ),
+                name='outbox-{}'.format(i))
+            for i in range(self.max_workers + 1)]
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+
+    def notify(self):
+        self._wakeup.set()
+
+    def wait(self, timeout=None):
+        """
+        Aguarda a execução das tarefas prontas (as que aguardam nova
+        tentativa ficam para depois)
+        """
+        start = time.time()
+        while self.outbox.ready():
+            if timeout is not None and time.time() - start > timeout:
+                return False
+            self.notify()
+            time.sleep(0.1)
+        return True
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+
+def main():
+    parser = argparse.ArgumentParser(description='XC outbox')
+    parser.add_argument('db_path', help='outbox database (OUTBOX_PATH)')
+    parser.add_argument('--status', choices=(PENDING, RUNNING, DONE, FAILED))
+    parser.add_argument('--retry', type=int, nargs='*', default=[],
+                        help='put failed tasks back in the queue')
+    args = parser.parse_args()
+
+    outbox = Outbox(args.db_path)
+    for task_id in args.retry:
+        outbox.retry(task_id)
+    for task in outbox.tasks(args.status):
+        print('{id}\t{kind}\t{status}\t{attempts}\t{package}\t{updated}\t'
+              '{error}'.format(**task))
+
+
+if __name__ == '__main__':
+    main()
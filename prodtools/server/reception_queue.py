@@ -0,0 +1,257 @@
+# coding=utf-8
+"""
+Fila de recepção de pacotes do XC (modo servidor)
+
+Os pacotes são convertidos por um conjunto de workers.
+Pacotes de periódicos diferentes são convertidos ao mesmo tempo;
+pacotes de um mesmo periódico são serializados (`IssueLocks`), pois a
+conversão de um número pode alterar as bases de outros números do mesmo
+periódico (aop / ex-aop).
+
+O estado de cada pacote é mantido em disco (um arquivo JSON por pacote),
+de modo que, se o processo for interrompido durante a conversão de um
+pacote, ele é reprocessado na próxima execução.
+"""
+import os
+import json
+import hashlib
+import time
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+
+logger = logging.getLogger()
+
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+MAX_ATTEMPTS = 3
+
+
+def is_running_process(pid):
+    """
+    Verifica se o processo existe, sem enviar sinal a ele
+    """
+    if not pid:
+        return False
+    if os.name == 'nt':
+        # no Windows, os.kill envia CTRL_C_EVENT (sinal 0) ou termina o
+        # processo (demais valores)
+        return _is_running_windows_process(pid)
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+def _is_running_windows_process(pid):
+    import ctypes
+    PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+    STILL_ACTIVE = 259
+    ERROR_ACCESS_DENIED = 5
+    kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    handle = kernel32.OpenProcess(
+        PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+    if not handle:
+        # processo de outro usuário
+        return ctypes.get_last_error() == ERROR_ACCESS_DENIED
+    try:
+        exit_code = ctypes.c_ulong()
+        if not kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code)):
+            return False
+        return exit_code.value == STILL_ACTIVE
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+class IssueLocks(object):
+    """
+    Registro de locks por chave (periódico)
+    """
+
+    def __init__(self):
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+
+def package_lock_key(pkg):
+    """
+    Identifica o periódico do pacote antes da consulta às bases
+    """
+    issue_data = pkg.issue_data
+    return (
+        issue_data.pkg_e_issn or issue_data.pkg_p_issn or
+        issue_data.pkg_journal_title or 'unknown_journal')
+
+
+class QueueState(object):
+    """
+    Estado dos pacotes da fila, gravado em `state_path`
+    """
+
+    def __init__(self, state_path):
+        self.state_path = state_path
+        self._lock = threading.Lock()
+        if not os.path.isdir(state_path):
+            os.makedirs(state_path)
+
+    def _filename(self, package_path):
+        name = hashlib.sha1(package_path.encode('utf-8')).hexdigest()
+        return os.path.join(self.state_path, name + '.json')
+
+    def read(self, package_path):
+        return self._read(self._filename(package_path))
+
+    def _read(self, filename):
+        try:
+            with open(filename, 'r', encoding='utf-8') as fp:
+                return json.load(fp)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def write(self, package_path, status, **kwargs):
+        with self._lock:
+            filename = self._filename(package_path)
+            data = self._read(filename) or {
+                'package_path': package_path, 'attempts': 0,
+                'queued': time.time()}
+            data.update(kwargs)
+            data['status'] = status
+            data['updated'] = datetime.now().isoformat()
+            if status == RUNNING:
+                data['attempts'] += 1
+                data['pid'] = os.getpid()
+            tmp = filename + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as fp:
+                json.dump(data, fp)
+            os.replace(tmp, filename)
+            return data
+
+    def remove(self, package_path):
+        filename = self._filename(package_path)
+        if os.path.isfile(filename):
+            os.unlink(filename)
+
+    def items(self):
+        for name in sorted(os.listdir(self.state_path)):
+            if name.endswith('.json'):
+                data = self._read(os.path.join(self.state_path, name))
+                if data:
+                    yield data
+
+    def recover(self):
+        """
+        Retorna os pacotes que ficaram pendentes em execuções anteriores:
+        na fila ou em execução por um processo que não existe mais
+        """
+        items = []
+        for data in self.items():
+            package_path = data['package_path']
+            if not os.path.isdir(package_path):
+                self.remove(package_path)
+                continue
+            status = data.get('status')
+            if status == RUNNING and is_running_process(data.get('pid', 0)):
+                continue
+            if status in (QUEUED, RUNNING):
+                if data.get('attempts', 0) >= MAX_ATTEMPTS:
+                    logger.error(
+                        "Reception queue: %s failed %i times",
+                        package_path, data['attempts'])
+                    self.write(package_path, FAILED)
+                    continue
+                logger.info("Reception queue: retry %s", package_path)
+                items.append(package_path)
+        return items
+
+
+class ReceptionQueue(object):
+    """
+    Executa `convert(package_path)` para os pacotes da fila
+    usando até `max_workers` workers, na ordem definida por `scheduler`
+    """
+
+    def __init__(self, state_path, max_workers=1, scheduler=None):
+        self.state = QueueState(state_path)
+        self.max_workers = max_workers or 1
+        self.scheduler = scheduler
+        self._executor = None
+
+    @property
+    def executor(self):
+        """
+        Os workers são mantidos entre execuções de `run`, de modo que os
+        dados carregados por cada worker continuam disponíveis (processo
+        residente)
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def pending(self):
+        """
+        Quantidade de pacotes na fila ou em execução
+        """
+        return len([
+            data for data in self.state.items()
+            if data.get('status') in (QUEUED, RUNNING)])
+
+    def add(self, package_path):
+        self.state.write(package_path, QUEUED)
+
+    def _run_item(self, convert, package_path):
+        data = self.state.write(package_path, RUNNING)
+        if self.scheduler is not None:
+            self.scheduler.started(
+                package_path, time.time() - data.get('queued', time.time()))
+        try:
+            convert(package_path)
+        except Exception:
+            logger.exception("Reception queue: %s failed", package_path)
+            self.state.write(package_path, FAILED)
+            return False
+        self.state.remove(package_path)
+        return True
+
+    def run(self, convert, package_paths):
+        """
+        Adiciona `package_paths` à fila e processa todos os pacotes pendentes
+        Retorna dict {package_path: True/False}
+        """
+        pending = self.state.recover()
+        for package_path in package_paths:
+            self.add(package_path)
+            if package_path not in pending:
+                pending.append(package_path)
+
+        if self.scheduler is not None:
+            queued_times = {}
+            for package_path in pending:
+                data = self.state.read(package_path) or {}
+                if data.get('queued'):
+                    queued_times[package_path] = data['queued']
+            pending = self.scheduler.order(pending, queued_times)
+
+        futures = {
+            package_path: self.executor.submit(
+                self._run_item, convert, package_path)
+            for package_path in pending
+        }
+        return {k: future.result() for k, future in futures.items()}
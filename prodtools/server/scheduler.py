@@ -0,0 +1,222 @@
+# coding=utf-8
+"""
+Ordem de conversão dos pacotes da fila de recepção (XC servidor)
+
+Cada pacote (já extraído) recebe:
+- uma classe de prioridade, obtida do início dos XML: errata/retratação,
+  ex-aop (article-id previous-pid), aop, press release (`pr`, como em
+  `xc_gerapadrao.sort_scilista`) e fascículo regular
+- uma estimativa de custo (quantidade de documentos, bytes e imagens)
+
+A ordem considera a prioridade (que melhora conforme o tempo de espera,
+`AGING_INTERVAL`), o revezamento entre periódicos e, por último, o custo,
+de modo que um pacote urgente ou pequeno não espere por um suplemento de
+centenas de artigos.
+"""
+import os
+import re
+import time
+import logging
+import threading
+
+
+logger = logging.getLogger()
+
+
+ERRATA = 'errata'
+EX_AOP = 'ex-aop'
+AOP = 'aop'
+PRESS_RELEASE = 'pr'
+REGULAR = 'regular'
+
+PRIORITIES = {
+    ERRATA: 0,
+    EX_AOP: 1,
+    AOP: 1,
+    PRESS_RELEASE: 2,
+    REGULAR: 3,
+}
+
+ERRATA_ARTICLE_TYPES = (
+    'correction', 'retraction', 'partial-retraction',
+    'expression-of-concern')
+IMAGE_EXTENSIONS = (
+    '.tif', '.tiff', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.eps')
+
+# custo (em "segundos") de cada documento, de cada imagem e de cada MB
+DOCUMENT_COST = 10
+IMAGE_COST = 2
+MB_COST = 1
+# a cada AGING_INTERVAL segundos de espera, a prioridade melhora um nível
+AGING_INTERVAL = 30 * 60
+
+HEAD_SIZE = 64 * 1024
+ARTICLE_TYPE = re.compile(r'<article\s[^>]*article-type="([^"]+)"')
+ISSN = re.compile(r'<issn[^>]*>\s*([^<\s]+)\s*</issn>')
+VOLUME = re.compile(r'<volume>\s*([^<]*?)\s*</volume>')
+ISSUE = re.compile(r'<issue>\s*([^<]*?)\s*</issue>')
+PREVIOUS_PID = re.compile(r'specific-use="previous-pid"')
+
+
+class PackageInfo(object):
+    """
+    Dados de um pacote extraído (`package_path`) usados para ordená-lo
+    """
+
+    def __init__(self, package_path):
+        self.package_path = package_path
+        self.documents = 0
+        self.images = 0
+        self.size = 0
+        self.journal = None
+        self.classes = set()
+        for name in os.listdir(package_path):
+            file_path = os.path.join(package_path, name)
+            if not os.path.isfile(file_path):
+                continue
+            self.size += os.path.getsize(file_path)
+            ext = os.path.splitext(name)[1].lower()
+            if ext == '.xml':
+                self.documents += 1
+                self._read_xml(file_path)
+            elif ext in IMAGE_EXTENSIONS:
+                self.images += 1
+
+    def _read_xml(self, file_path):
+        with open(file_path, 'rb') as fp:
+            head = fp.read(HEAD_SIZE).decode('utf-8', errors='ignore')
+        if self.journal is None:
+            match = ISSN.search(head)
+            if match:
+                self.journal = match.group(1)
+        match = ARTICLE_TYPE.search(head)
+        article_type = match.group(1) if match else None
+        volume = VOLUME.search(head)
+        issue = ISSUE.search(head)
+        volume = volume.group(1) if volume else ''
+        issue = issue.group(1) if issue else ''
+        if article_type in ERRATA_ARTICLE_TYPES:
+            self.classes.add(ERRATA)
+        elif PREVIOUS_PID.search(head):
+            self.classes.add(EX_AOP)
+        elif (not volume and not issue) or issue == 'ahead':
+            self.classes.add(AOP)
+        elif issue.endswith('pr') or article_type == 'in-brief':
+            self.classes.add(PRESS_RELEASE)
+        else:
+            self.classes.add(REGULAR)
+
+    @property
+    def priority_class(self):
+        """
+        Classe do pacote: a de maior prioridade entre seus documentos
+        """
+        if not self.classes:
+            return REGULAR
+        return min(self.classes, key=lambda c: PRIORITIES[c])
+
+    @property
+    def cost(self):
+        return (
+            self.documents * DOCUMENT_COST + self.images * IMAGE_COST +
+            self.size / (1024 * 1024) * MB_COST)
+
+    def as_dict(self):
+        return {
+            'class': self.priority_class,
+            'journal': self.journal,
+            'documents': self.documents,
+            'images': self.images,
+            'bytes': self.size,
+            'cost': round(self.cost, 1),
+        }
+
+
+class Scheduler(object):
+
+    def __init__(self, aging_interval=AGING_INTERVAL):
+        self.aging_interval = aging_interval
+        self._lock = threading.Lock()
+        self._waits = {}
+        self.waiting = []
+
+    def priority(self, priority_class, waited):
+        """
+        Prioridade efetiva (menor, mais urgente), considerando a espera
+        """
+        aging = int(waited // self.aging_interval) if self.aging_interval else 0
+        return max(PRIORITIES[priority_class] - aging, 0)
+
+    def order(self, package_paths, queued_times=None, now=None):
+        """
+        Retorna `package_paths` na ordem de conversão
+        queued_times: {package_path: time.time() da entrada na fila}
+        """
+        queued_times = queued_times or {}
+        now = now or time.time()
+        items = []
+        for package_path in package_paths:
+            waited = now - queued_times.get(package_path, now)
+            try:
+                info = PackageInfo(package_path).as_dict()
+            except OSError:
+                info = {'class': REGULAR, 'journal': None, 'cost': 0}
+            info.update({
+                'package': package_path,
+                'priority': self.priority(info['class'], waited),
+                'waited': round(waited, 1),
+            })
+            items.append(info)
+
+        # revezamento entre periódicos: o n-ésimo pacote (do menor para o
+        # maior custo) de um periódico numa mesma prioridade tem a vez n
+        turns = {}
+        for info in sorted(items, key=lambda i: (i['priority'], i['cost'])):
+            key = (info['priority'], info['journal'])
+            info['turn'] = turns.get(key, 0)
+            turns[key] = info['turn'] + 1
+
+        items.sort(key=lambda i: (
+            i['priority'], i['turn'], i['cost'], -i['waited']))
+        for position, info in enumerate(items):
+            info['position'] = position
+            logger.info(
+                "Queue: %i %s (%s, journal %s, cost %s, waited %is)",
+                position, info['package'], info['class'], info['journal'],
+                info['cost'], info['waited'])
+        with self._lock:
+            self.waiting = items
+        return [info['package'] for info in items]
+
+    def started(self, package_path, waited):
+        """
+        Registra o tempo de espera de um pacote que começou a ser convertido
+        """
+        with self._lock:
+            priority_class = REGULAR
+            for item in self.waiting:
+                if item['package'] == package_path:
+                    priority_class = item['class']
+            stats = self._waits.setdefault(
+                priority_class,
+                {'count': 0, 'total': 0.0, 'max': 0.0})
+            stats['count'] += 1
+            stats['total'] += waited
+            stats['max'] = max(stats['max'], waited)
+            self.waiting = [
+                item for item in self.waiting
+                if item['package'] != package_path]
+
+    def metrics(self):
+        with self._lock:
+            return {
+                'queue_wait': {
+                    name: {
+                        'count': stats['count'],
+                        'avg': round(stats['total'] / stats['count'], 1),
+                        'max': round(stats['max'], 1),
+                    }
+                    for name, stats in self._waits.items()
+                },
+                'waiting': list(self.waiting),
+            }
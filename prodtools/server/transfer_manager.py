@@ -0,0 +1,141 @@
+# coding=utf-8
+"""
+Transferência de arquivos para os servidores do sítio
+
+Cada par (servidor, pasta) é uma tarefa. As tarefas são executadas em
+paralelo (no máximo `max_workers` ao mesmo tempo), o status de saída e a
+quantidade de bytes transferidos são verificados e, em caso de falha, a
+tarefa é repetida após um intervalo crescente (`backoff`).
+Cada tentativa é registrada no journal (um JSON por linha).
+"""
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+
+logger = logging.getLogger()
+
+
+MAX_WORKERS = 4
+MAX_ATTEMPTS = 3
+BACKOFF = 5
+TIMEOUT = 3600
+
+
+class TransferError(Exception):
+    """
+    Uma ou mais tarefas falharam em todas as tentativas
+    """
+
+    def __init__(self, failures):
+        self.failures = failures
+        super().__init__(
+            "Transfer failed: " + "; ".join(
+                "{} {} (exit {})".format(t.server, t.dest, t.returncode)
+                for t in failures))
+
+
+class TransferTask(object):
+
+    def __init__(self, server, source, dest, files=None):
+        self.server = server
+        self.source = source
+        self.dest = dest
+        self.files = files
+        self.attempts = 0
+        self.returncode = None
+        self.transferred_bytes = 0
+        self.duration = 0
+
+    @property
+    def ok(self):
+        return self.returncode == 0
+
+    def as_dict(self):
+        return {
+            "server": str(self.server),
+            "source": self.source,
+            "dest": self.dest,
+            "attempts": self.attempts,
+            "returncode": self.returncode,
+            "bytes": self.transferred_bytes,
+            "duration": round(self.duration, 3),
+        }
+
+
+class TransferJournal(object):
+
+    def __init__(self, journal_path=None):
+        self.journal_path = journal_path
+        self._lock = threading.Lock()
+
+    def write(self, task, output=None):
+        if not self.journal_path:
+            return
+        data = task.as_dict()
+        data["date"] = datetime.now().isoformat()
+        if not task.ok and output:
+            data["output"] = output[-1000:]
+        dirname = os.path.dirname(self.journal_path)
+        with self._lock:
+            if dirname and not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            with open(self.journal_path, "a", encoding="utf-8") as fp:
+                fp.write(json.dumps(data) + "\n")
+
+
+class TransferManager(object):
+
+    def __init__(self, servers, max_workers=MAX_WORKERS,
+                 max_attempts=MAX_ATTEMPTS, backoff=BACKOFF,
+                 timeout=TIMEOUT, journal_path=None):
+        self.servers = servers
+        self.max_workers = max_workers or 1
+        self.max_attempts = max_attempts or 1
+        self.backoff = backoff
+        self.timeout = timeout
+        self.journal = TransferJournal(journal_path)
+
+    def _run_task(self, task):
+        while True:
+            task.attempts += 1
+            start = time.time()
+            result = task.server.sync(
+                task.source, task.dest, self.timeout, task.files)
+            task.duration += time.time() - start
+            task.returncode = result.returncode
+            task.transferred_bytes = result.transferred_bytes
+            self.journal.write(task, result.output)
+            if task.ok:
+                logger.info(
+                    "Transfer: %s %s: %i bytes",
+                    task.server, task.dest, task.transferred_bytes)
+                return task
+            logger.error(
+                "Transfer: %s %s failed (exit %s, attempt %i)",
+                task.server, task.dest, task.returncode, task.attempts)
+            if task.attempts >= self.max_attempts:
+                return task
+            time.sleep(self.backoff * 2 ** (task.attempts - 1))
+
+    def transfer(self, items):
+        """
+        Transfere cada (source, dest) ou (source, dest, files) de `items`
+        para todos os servidores
+        Retorna as tarefas; levanta TransferError se alguma falhou
+        """
+        tasks = [
+            TransferTask(server, *item)
+            for server in self.servers
+            for item in items
+        ]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            list(executor.map(self._run_task, tasks))
+        failures = [task for task in tasks if not task.ok]
+        if failures:
+            raise TransferError(failures)
+        return tasks
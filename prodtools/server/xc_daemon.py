@@ -0,0 +1,274 @@
+# coding=utf-8
+"""
+Modo residente do XC (servidor)
+
+Em vez de iniciar um processo para cada execução (cron), o processo fica
+ativo e verifica periodicamente `Configuration.download_path` e a fila de
+recepção. Os dados carregados para a conversão (lista de periódicos,
+bases title e issue, XSL, DTD, textos) são mantidos entre um pacote e
+outro e recarregados quando expiram (`XC_CACHE_TTL`) ou quando os
+arquivos de origem são modificados.
+
+O estado do processo pode ser consultado por HTTP em 127.0.0.1:
+- /health: situação do processo
+- /metrics: contadores de pacotes e tempos de execução
+"""
+import os
+import json
+import time
+import signal
+import logging
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+
+logger = logging.getLogger()
+
+
+POLL_INTERVAL = 30
+
+
+def folder_mtime(path):
+    """
+    Retorna a data de modificação mais recente da pasta e de seus
+    arquivos (primeiro nível), ou None se a pasta não existe
+    """
+    if not path or not os.path.isdir(path):
+        return None
+    mtimes = [os.path.getmtime(path)]
+    for item in os.listdir(path):
+        try:
+            mtimes.append(os.path.getmtime(os.path.join(path, item)))
+        except OSError:
+            pass
+    return max(mtimes)
+
+
+def has_files(path):
+    return bool(path and os.path.isdir(path) and os.listdir(path))
+
+
+class DaemonMetrics(object):
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.runs = 0
+        self.packages_done = 0
+        self.packages_failed = 0
+        self.errors = 0
+        self.last_run = None
+        self.last_run_duration = None
+        self.last_error = None
+
+    def add_run(self, result, duration):
+        with self._lock:
+            self.runs += 1
+            self.last_run = datetime.now().isoformat()
+            self.last_run_duration = round(duration, 3)
+            for success in (result or {}).values():
+                if success:
+                    self.packages_done += 1
+                else:
+                    self.packages_failed += 1
+
+    def add_error(self, message):
+        with self._lock:
+            self.errors += 1
+            self.last_error = message
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "uptime": round(time.time() - self.started, 3),
+                "runs": self.runs,
+                "packages_done": self.packages_done,
+                "packages_failed": self.packages_failed,
+                "errors": self.errors,
+                "last_run": self.last_run,
+                "last_run_duration": self.last_run_duration,
+                "last_error": self.last_error,
+            }
+
+
+class XCDaemon(object):
+    """
+    Executa `reception.receive_package()` sempre que houver pacotes em
+    `download_path` ou pendentes na fila de recepção e, se `gerapadrao`,
+    o GeraPadrão após cada conjunto de pacotes processado
+    """
+
+    def __init__(self, reception, poll_interval=POLL_INTERVAL,
+                 download=False, health_port=None, gerapadrao=False,
+                 force_gerapadrao=False):
+        self.reception = reception
+        # as ações do outbox continuam em segundo plano entre os ciclos
+        self.reception.wait_outbox = False
+        self.config = reception.config
+        self.poll_interval = poll_interval
+        self.download = download
+        self.gerapadrao = gerapadrao or force_gerapadrao
+        self.force_gerapadrao = force_gerapadrao
+        self.health_port = health_port
+        self.metrics = DaemonMetrics()
+        self._stop = threading.Event()
+        self._server = None
+        self._sources_mtime = None
+
+    @property
+    def status(self):
+        return "stopping" if self._stop.is_set() else "running"
+
+    def health(self):
+        data = {
+            "status": self.status,
+            "collection": self.reception.collection_acron,
+            "pid": os.getpid(),
+        }
+        data.update(self.metrics.as_dict())
+        return data
+
+    def queue_size(self):
+        return self.reception.queue.pending()
+
+    def stats(self):
+        data = self.metrics.as_dict()
+        data["queue_size"] = self.queue_size()
+        if self.reception.queue.scheduler is not None:
+            data.update(self.reception.queue.scheduler.metrics())
+        workers = self.reception.outbox_workers
+        data["outbox_ready"] = workers.outbox.ready() if workers else 0
+        data["intake"] = self.reception.intake_metrics
+        data["download_path_mtime"] = folder_mtime(self.config.download_path)
+        return data
+
+    def stop(self, *args):
+        logger.info("XC daemon: stop")
+        self._stop.set()
+
+    def has_work(self):
+        return (
+            has_files(self.config.download_path) or self.queue_size() > 0)
+
+    def sources_mtime(self):
+        """
+        Datas de modificação das bases title e issue
+        """
+        mtimes = []
+        for db in (self.config.title_db, self.config.issue_db):
+            mst = (db or '') + '.mst'
+            mtimes.append(
+                os.path.getmtime(mst) if os.path.isfile(mst) else None)
+        return mtimes
+
+    def refresh(self):
+        """
+        Descarta os dados expirados ou cujos arquivos de origem mudaram
+        """
+        sources_mtime = self.sources_mtime()
+        changed = (
+            self._sources_mtime is not None and
+            sources_mtime != self._sources_mtime)
+        self._sources_mtime = sources_mtime
+        ttl = 0 if changed else None
+        self.reception.proc.refresh(ttl)
+        for proc in self.reception.worker_processors():
+            proc.refresh(ttl)
+
+    def run_once(self):
+        """
+        Executa um ciclo: download (opcional) e conversão dos pacotes
+        Retorna True se algum pacote foi processado
+        """
+        if self.download:
+            try:
+                self.reception.download_packages()
+            except Exception as e:
+                self.metrics.add_error(str(e))
+        if not self.has_work():
+            return False
+        self.refresh()
+        start = time.time()
+        try:
+            result = self.reception.receive_package()
+        except Exception as e:
+            logger.exception("XC daemon: unable to receive packages")
+            self.metrics.add_error(str(e))
+            return False
+        self.metrics.add_run(result, time.time() - start)
+        if self.gerapadrao:
+            self.run_gerapadrao()
+        return True
+
+    def run_gerapadrao(self):
+        # a scilista é atualizada pelo outbox
+        workers = self.reception.outbox_workers
+        if workers is not None:
+            workers.wait()
+        try:
+            self.reception.gerapadrao(self.force_gerapadrao)
+        except Exception as e:
+            logger.exception("XC daemon: unable to run gerapadrao")
+            self.metrics.add_error(str(e))
+
+    def start_health_server(self):
+        if self.health_port is None:
+            return
+        self._server = HTTPServer(
+            ("127.0.0.1", self.health_port), health_handler(self))
+        thread = threading.Thread(
+            target=self._server.serve_forever, name="xc-daemon-health")
+        thread.daemon = True
+        thread.start()
+        logger.info(
+            "XC daemon: health at http://127.0.0.1:%i/health",
+            self._server.server_address[1])
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self.reception.queue.close()
+        if self.reception.outbox_workers is not None:
+            self.reception.outbox_workers.stop()
+
+    def run(self):
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self.stop)
+        self.start_health_server()
+        logger.info(
+            "XC daemon: watching %s (interval: %is)",
+            self.config.download_path, self.poll_interval)
+        try:
+            while not self._stop.is_set():
+                self.run_once()
+                self._stop.wait(self.poll_interval)
+        finally:
+            self.close()
+
+
+def health_handler(daemon):
+
+    class HealthHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path == "/health":
+                data = daemon.health()
+            elif self.path == "/metrics":
+                data = daemon.stats()
+            else:
+                self.send_error(404)
+                return
+            content = json.dumps(data).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, format, *args):
+            logger.debug("XC daemon: " + format, *args)
+
+    return HealthHandler
@@ -1,46 +1,246 @@
 # coding=utf-8
 import os
+import json
+import time
 import logging
+import threading
 
 from datetime import datetime
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from prodtools.db import serial
 from prodtools.utils import fs_utils
+from prodtools.utils import commands
 from prodtools.server import filestransfer
+from prodtools.server import reception_queue
 
 
 logger = logging.getLogger()
 
 
-class GeraPadraoStatusManager:
+HEARTBEAT_INTERVAL = 60
+# execuções com falha de um item da scilista antes de ser descartado
+MAX_ATTEMPTS = 3
+
+GERAPADRAO_SCRIPT = 'GeraPadrao.bat'
+
+RUNNING = 'running'
+FINISHED = 'FINISHED'
+
+
+def script_args(proc_path):
+    """
+    Executa o script diretamente (respeitando o shebang); sem shebang, pelo
+    shell, como o `os.system` usado anteriormente
+    """
+    try:
+        with open(os.path.join(proc_path, GERAPADRAO_SCRIPT), 'rb') as fp:
+            has_shebang = fp.read(2) == b'#!'
+    except (IOError, OSError):
+        has_shebang = True
+    if has_shebang:
+        return ['./' + GERAPADRAO_SCRIPT]
+    return ['sh', './' + GERAPADRAO_SCRIPT]
 
-    def __init__(self, permission_file):
+
+class GeraPadraoLock:
+    """
+    Impede execuções simultâneas do GeraPadrão de uma coleção.
+    Usa fcntl.flock em <arquivo de permissão>.lock, liberado pelo sistema se
+    o processo termina, de modo que uma execução interrompida não bloqueia a
+    coleção. O arquivo .lock contém o PID do processo e a data da última
+    atividade (heartbeat); o arquivo de permissão continua com o status
+    (`running` / `FINISHED`) consultado por scripts externos
+    """
+
+    def __init__(self, permission_file,
+                 heartbeat_interval=HEARTBEAT_INTERVAL):
         self.permission_file = permission_file
-        self._status = None
+        self.lock_file = permission_file + '.lock'
+        self.heartbeat_interval = heartbeat_interval
+        self._fp = None
+        self._stop = threading.Event()
+        self._heartbeat = None
 
-    @property
-    def status(self):
-        _status = None
+    def holder(self):
+        """
+        Dados do processo que detém (ou deteve) o lock
+        """
         try:
-            with open(self.permission_file, 'r') as fp:
-                _status = fp.read()
+            with open(self.lock_file, 'r') as fp:
+                return json.loads(fp.read())
         except (IOError, OSError, ValueError, TypeError):
-            _status = 'FINISHED'
-        return _status
+            return None
+
+    def _is_locked_without_fcntl(self):
+        data = self.holder()
+        return bool(
+            data and data.get('pid') and
+            reception_queue.is_running_process(data['pid']))
+
+    def acquire(self):
+        if fcntl is None and self._is_locked_without_fcntl():
+            return False
+        fp = open(self.lock_file, 'a+')
+        if fcntl is not None:
+            try:
+                fcntl.flock(fp.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                fp.close()
+                return False
+        self._fp = fp
+        self._started = datetime.now().isoformat()
+        self._write()
+        self._write_status(RUNNING)
+        self._stop.clear()
+        self._heartbeat = threading.Thread(target=self._beat)
+        self._heartbeat.daemon = True
+        self._heartbeat.start()
+        return True
 
-    @status.setter
-    def status(self, value):
+    def _write(self):
+        self._fp.seek(0)
+        self._fp.truncate()
+        self._fp.write(json.dumps({
+            'pid': os.getpid(),
+            'started': self._started,
+            'heartbeat': datetime.now().isoformat(),
+        }))
+        self._fp.flush()
+
+    def _write_status(self, status):
         with open(self.permission_file, 'w') as fp:
-            fp.write(value)
+            fp.write(status)
 
-    def block(self):
-        self.status = "running"
+    def _beat(self):
+        while not self._stop.wait(self.heartbeat_interval):
+            self._write()
 
-    def free(self):
-        self.status = "FINISHED"
+    def release(self):
+        if self._fp is None:
+            return
+        self._stop.set()
+        self._heartbeat.join()
+        self._write_status(FINISHED)
+        self._fp.seek(0)
+        self._fp.truncate()
+        if fcntl is not None:
+            fcntl.flock(self._fp.fileno(), fcntl.LOCK_UN)
+        self._fp.close()
+        self._fp = None
 
-    @property
-    def is_free(self):
-        return self.status == 'FINISHED' or self.status != 'running'
+
+class IssueChanges:
+    """
+    Registra, para cada item da scilista (acron issue), a situação da base
+    do fascículo na última execução bem sucedida do GeraPadrão, de modo
+    que itens repetidos ou sem alteração não sejam processados novamente,
+    e a quantidade de execuções com falha desde a última alteração
+    """
+
+    def __init__(self, state_file, serial_path, source_dbs=None):
+        self.state_file = state_file
+        self.serial_path = serial_path
+        self.source_dbs = source_dbs or []
+        try:
+            with open(state_file, 'r', encoding='utf-8') as fp:
+                self.state = json.load(fp)
+        except (IOError, OSError, ValueError, TypeError):
+            self.state = {}
+
+    def _stat(self, file_path):
+        try:
+            st = os.stat(file_path)
+        except (OSError, TypeError):
+            return None
+        return [st.st_size, st.st_mtime]
+
+    def sources_fingerprint(self):
+        """
+        Bases title e issue: se mudaram, todos os itens são processados
+        """
+        return [self._stat((db or '') + '.mst') for db in self.source_dbs]
+
+    def fingerprint(self, item):
+        parts = item.split()
+        if len(parts) != 2:
+            return None
+        issue = serial.IssuePathsInSerial(self.serial_path, *parts)
+        base = self._stat(issue.base_filename)
+        if base is None:
+            return None
+        ids = []
+        if os.path.isdir(issue.id_path):
+            ids = sorted(
+                [name] + self._stat(os.path.join(issue.id_path, name))
+                for name in os.listdir(issue.id_path))
+        return [base, ids]
+
+    def select(self, items, force=False):
+        """
+        Retorna (itens a processar, itens sem alteração, fingerprints)
+        force: processa todos os itens e reinicia a contagem de falhas
+        """
+        fingerprints = {item: self.fingerprint(item) for item in items}
+        if force:
+            failures = self.state.get('failures', {})
+            for item in items:
+                failures.pop(item, None)
+            return list(items), [], fingerprints
+        if self.state.get('sources') != self.sources_fingerprint():
+            return list(items), [], fingerprints
+        selected = []
+        skipped = []
+        for item in items:
+            fingerprint = fingerprints[item]
+            if (fingerprint is not None and
+                    self.state.get('issues', {}).get(item) == fingerprint):
+                skipped.append(item)
+            else:
+                selected.append(item)
+        return selected, skipped, fingerprints
+
+    def update(self, fingerprints):
+        self.state['sources'] = self.sources_fingerprint()
+        issues = self.state.setdefault('issues', {})
+        failures = self.state.setdefault('failures', {})
+        for item, fingerprint in fingerprints.items():
+            failures.pop(item, None)
+            if fingerprint is not None:
+                issues[item] = fingerprint
+        self.save()
+
+    def register_failure(self, fingerprints, max_attempts=MAX_ATTEMPTS):
+        """
+        Contabiliza a falha dos itens (reiniciada se o fascículo foi
+        alterado). Retorna (itens a processar novamente, itens descartados)
+        """
+        failures = self.state.setdefault('failures', {})
+        retry = []
+        given_up = []
+        for item, fingerprint in fingerprints.items():
+            failure = failures.get(item)
+            if failure is None or failure.get('fingerprint') != fingerprint:
+                failure = {'attempts': 0, 'fingerprint': fingerprint}
+            failure['attempts'] += 1
+            if failure['attempts'] < max_attempts:
+                failures[item] = failure
+                retry.append(item)
+            else:
+                failures.pop(item, None)
+                given_up.append(item)
+        self.save()
+        return sorted(retry), sorted(given_up)
+
+    def save(self):
+        tmp = self.state_file + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as fp:
+            json.dump(self.state, fp)
+        os.replace(tmp, self.state_file)
 
 
 class Scilista:
@@ -77,37 +277,66 @@ class GeraPadrao:
         self.collection_acron = collection_acron
         self.config = config
         self.mailer = mailer
-        self.status_manager = GeraPadraoStatusManager(
-            self.config.gerapadrao_permission_file)
+        self.lock = GeraPadraoLock(self.config.gerapadrao_permission_file)
         self.col_scilista = Scilista(self.config.collection_scilista)
+        self.issue_changes = IssueChanges(
+            self.config.gerapadrao_state_file,
+            self.config.serial_path,
+            [self.config.title_db, self.config.issue_db])
 
     @property
     def now(self):
         return datetime.now().isoformat()[11:11+5].replace(':', '')
 
-    @property
-    def command(self):
-        return 'cd {};./GeraPadrao.bat;echo FINISHED>{}'.format(
-                self.config.gerapadrao_proc_path,
-                self.config.gerapadrao_permission_file)
-
-    def run(self):
-        if self.status_manager.is_free:
-            self.status_manager.block()
-            scilista_content = self.col_scilista.consume_collection_scilista()
-            if scilista_content:
-                self.config.update_title_and_issue()
-                scilista_content = sort_scilista(scilista_content)
-                fs_utils.write_file(
-                    self.config.gerapadrao_scilista, scilista_content)
-                self._gerapadrao(scilista_content)
-                self._update_web_site(scilista_content)
-            else:
-                self.status_manager.free()
-        else:
+    def run(self, force=False):
+        """
+        force: processa também os itens sem alteração
+        """
+        if not self.lock.acquire():
             self.mail_gerapadrao_is_busy()
+            return
+        try:
+            scilista_content = self.col_scilista.consume_collection_scilista()
+            if not scilista_content:
+                return
+            items = [
+                item for item in sort_scilista(scilista_content).split('\n')
+                if item]
+            selected, skipped, fingerprints = self.issue_changes.select(
+                items, force)
+            if skipped:
+                logger.info(
+                    'gerapadrao %s: unchanged %s',
+                    self.collection_acron, ', '.join(skipped))
+            if not selected:
+                return
+            scilista_content = '\n'.join(selected) + '\n'
+            self.config.update_title_and_issue()
+            fs_utils.write_file(
+                self.config.gerapadrao_scilista, scilista_content)
+            returncode = self._gerapadrao(scilista_content)
+            if returncode != 0:
+                # os itens voltam para a scilista da coleção, até
+                # MAX_ATTEMPTS execuções com falha
+                retry, given_up = self.issue_changes.register_failure(
+                    {item: fingerprints[item] for item in selected})
+                if retry:
+                    fs_utils.write_file(
+                        self.config.collection_scilista,
+                        '\n'.join(retry) + '\n', mode='a')
+                self.mail_gerapadrao_failure(
+                    returncode, scilista_content, given_up)
+                return
+            self.issue_changes.update(
+                {item: fingerprints[item] for item in selected})
+            self._update_web_site(scilista_content)
+        finally:
+            self.lock.release()
 
     def _gerapadrao(self, scilista_content):
+        """
+        Executa o GeraPadrão e registra status de saída e duração
+        """
         if self.mailer is not None:
             self.mailer.send_message(
                 self.config.email_to,
@@ -116,12 +345,41 @@ class GeraPadrao:
                     'Gerapadrao {}'.format(self.now)),
                 self.config.email_text_gerapadrao + scilista_content)
 
-        command = self.command
         logger.info('inicio gerapadrao acron: %s', self.collection_acron)
-        logger.info(command)
         logger.info(scilista_content)
-        os.system(command)
-        logger.info('fim gerapadrao acron: %s', self.collection_acron)
+        start = time.time()
+        with open(self.config.gerapadrao_log_file, 'a') as log:
+            # o GeraPadrão executa mx, id2i etc: no timeout, todo o grupo
+            # de processos é encerrado
+            result = commands.run(
+                script_args(self.config.gerapadrao_proc_path),
+                timeout=commands.TIMEOUTS[GERAPADRAO_SCRIPT],
+                cwd=self.config.gerapadrao_proc_path, stdout=log,
+                process_group=True)
+        if result.stderr:
+            with open(self.config.gerapadrao_log_file, 'a') as log:
+                log.write(result.stderr)
+        returncode = result.returncode
+        duration = time.time() - start
+        logger.info(
+            'fim gerapadrao acron: %s (exit %i, %.1fs)',
+            self.collection_acron, returncode, duration)
+        self._register_run(scilista_content, returncode, duration)
+        return returncode
+
+    def _register_run(self, scilista_content, returncode, duration):
+        history_path = os.path.dirname(self.config.gerapadrao_history_file)
+        if history_path and not os.path.isdir(history_path):
+            os.makedirs(history_path)
+        with open(self.config.gerapadrao_history_file, 'a') as fp:
+            fp.write(json.dumps({
+                'collection': self.collection_acron,
+                'date': datetime.now().isoformat(),
+                'returncode': returncode,
+                'duration': round(duration, 1),
+                'items': [
+                    item for item in scilista_content.split('\n') if item],
+            }) + '\n')
 
     def _update_web_site(self, scilista_content):
         if self.config.is_enabled_transference:
@@ -136,10 +394,28 @@ class GeraPadrao:
                     'Gerapadrao ' + self.now + ' '),
                 self.config.email_text_website_update + scilista_content)
 
+    def mail_gerapadrao_failure(self, returncode, scilista_content,
+                                given_up=None):
+        if self.mailer:
+            text = 'Log: {}\n\n{}'.format(
+                self.config.gerapadrao_log_file, scilista_content)
+            if given_up:
+                text += (
+                    '\nRemoved from scilista after {} failures:\n{}\n'.format(
+                        MAX_ATTEMPTS, '\n'.join(given_up)))
+            self.mailer.send_message(
+                self.config.email_to_adm,
+                'gerapadrao failed (exit {})'.format(returncode), text)
+
     def mail_gerapadrao_is_busy(self):
         print('gerapadrao is running. Wait ...')
         if self.mailer:
             msg = []
+            holder = self.lock.holder()
+            if holder:
+                msg.append(
+                    'PID: {pid}\nStarted: {started}\n'
+                    'Heartbeat: {heartbeat}\n\n'.format(**holder))
             if os.path.isfile(self.config.gerapadrao_scilista):
                 msg.append(
                     'Running:\n' + fs_utils.read_file(
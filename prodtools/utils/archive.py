@@ -0,0 +1,211 @@
+# coding=utf-8
+import os
+import time
+import zlib
+import struct
+import logging
+from collections import deque
+from zipfile import ZipFile, ZIP_STORED, ZIP_DEFLATED
+from concurrent.futures import ThreadPoolExecutor
+
+
+logger = logging.getLogger()
+
+
+# pacotes para entrega (SciELO, PMC, exportação)
+DELIVERY = 'delivery'
+# zips temporários, usados apenas para passar arquivos a outra ferramenta
+TEMP = 'temp'
+
+MAX_WORKERS = 4
+COMPRESSION_LEVEL = 6
+# formatos que já são comprimidos não ganham nada com deflate
+COMPRESSED_EXTENSIONS = (
+    '.tif', '.tiff', '.jpg', '.jpeg', '.png', '.gif',
+    '.pdf', '.zip', '.gz', '.tgz', '.bz2', '.mp3', '.mp4',
+)
+
+
+class ArchiveError(IOError):
+    pass
+
+
+def compress_type(filename, policy=DELIVERY):
+    """
+    Retorna o método de compressão de `filename` conforme a política
+    """
+    if policy == TEMP:
+        return ZIP_STORED
+    if policy == DELIVERY:
+        if filename.lower().endswith(COMPRESSED_EXTENSIONS):
+            return ZIP_STORED
+        return ZIP_DEFLATED
+    raise ValueError('Unknown compression policy: {}'.format(policy))
+
+
+# membros comprimidos mantidos em memória, por worker, à espera da gravação
+PENDING_PER_WORKER = 2
+# acima destes limites o zip precisa de ZIP64 e é gravado pelo zipfile
+ZIP32_MAX_SIZE = 0x7FFFFFFF
+ZIP32_MAX_MEMBERS = 0xFFFF
+
+
+class _Member(object):
+
+    def __init__(self, arcname, compress_type, date_time, mode):
+        self.arcname = arcname
+        self.compress_type = compress_type
+        self.date_time = date_time
+        self.mode = mode
+        self.crc = 0
+        self.size = 0
+        self.compress_size = 0
+        self.data = b''
+        self.offset = 0
+
+    @property
+    def name(self):
+        return self.arcname.encode('utf-8')
+
+    @property
+    def flags(self):
+        # bit 11: nome em UTF-8
+        try:
+            self.arcname.encode('ascii')
+        except UnicodeEncodeError:
+            return 0x800
+        return 0
+
+    @property
+    def dos_time(self):
+        year, month, day, hour, minute, second = self.date_time
+        if year < 1980:
+            year, month, day, hour, minute, second = 1980, 1, 1, 0, 0, 0
+        return ((hour << 11) | (minute << 5) | (second // 2),
+                ((year - 1980) << 9) | (month << 5) | day)
+
+    def local_header(self):
+        dos_time, dos_date = self.dos_time
+        return struct.pack(
+            '<IHHHHHIIIHH', 0x04034b50, 20, self.flags, self.compress_type,
+            dos_time, dos_date, self.crc, self.compress_size, self.size,
+            len(self.name), 0) + self.name
+
+    def central_header(self):
+        dos_time, dos_date = self.dos_time
+        return struct.pack(
+            '<IHHHHHHIIIHHHHHII', 0x02014b50, (3 << 8) | 20, 20, self.flags,
+            self.compress_type, dos_time, dos_date, self.crc,
+            self.compress_size, self.size, len(self.name), 0, 0, 0, 0,
+            (self.mode & 0xFFFF) << 16, self.offset) + self.name
+
+
+def _read_member(file_path, arcname, compress_type):
+    """
+    Lê e, se for o caso, comprime um membro.
+    Executado em paralelo (zlib libera o GIL)
+    """
+    st = os.stat(file_path)
+    member = _Member(
+        arcname, compress_type, time.localtime(st.st_mtime)[:6], st.st_mode)
+    compressor = None
+    if compress_type == ZIP_DEFLATED:
+        compressor = zlib.compressobj(
+            COMPRESSION_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+    crc = 0
+    chunks = []
+    with open(file_path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(1024 * 1024), b''):
+            member.size += len(chunk)
+            crc = zlib.crc32(chunk, crc)
+            chunks.append(compressor.compress(chunk) if compressor else chunk)
+    if compressor:
+        chunks.append(compressor.flush())
+    member.data = b''.join(chunks)
+    member.compress_size = len(member.data)
+    member.crc = crc & 0xffffffff
+    return member
+
+
+def _needs_zip64(files):
+    if len(files) >= ZIP32_MAX_MEMBERS:
+        return True
+    return sum(os.path.getsize(f) for f, arcname in files) >= ZIP32_MAX_SIZE
+
+
+def _write_zip64(fileobj, files, policy):
+    with ZipFile(fileobj, 'w', allowZip64=True) as zipf:
+        for file_path, arcname in files:
+            zipf.write(file_path, arcname, compress_type(arcname, policy))
+
+
+def write_zip(fileobj, files, policy=DELIVERY, max_workers=None):
+    """
+    Grava em `fileobj` (arquivo ou stream) o zip de `files`,
+    lista de tuplas (caminho, nome no zip).
+    Os membros são lidos e comprimidos em paralelo e gravados na ordem de
+    `files`, com no máximo PENDING_PER_WORKER membros por worker em memória
+    """
+    files = list(files)
+    if _needs_zip64(files):
+        _write_zip64(fileobj, files, policy)
+        return
+    max_workers = max_workers or MAX_WORKERS
+    offset = 0
+    members = []
+    pending = deque()
+    files = iter(files)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            while len(pending) < max_workers * PENDING_PER_WORKER:
+                try:
+                    file_path, arcname = next(files)
+                except StopIteration:
+                    break
+                pending.append(executor.submit(
+                    _read_member, file_path, arcname,
+                    compress_type(arcname, policy)))
+            if not pending:
+                break
+            member = pending.popleft().result()
+            member.offset = offset
+            header = member.local_header()
+            fileobj.write(header)
+            fileobj.write(member.data)
+            offset += len(header) + member.compress_size
+            # somente o cabeçalho é mantido até o diretório central
+            member.data = b''
+            members.append(member)
+    central_dir = b''.join(member.central_header() for member in members)
+    fileobj.write(central_dir)
+    fileobj.write(struct.pack(
+        '<IHHHHIIH', 0x06054b50, 0, 0, len(members), len(members),
+        len(central_dir), offset, 0))
+
+
+def zip_files(zip_filename, files, policy=DELIVERY, max_workers=None):
+    """
+    Cria `zip_filename` com `files` (caminhos), usando o nome do arquivo
+    como nome do membro. Em caso de falha, remove o zip incompleto e
+    levanta ArchiveError
+    """
+    dest_path = os.path.dirname(zip_filename)
+    if dest_path and not os.path.isdir(dest_path):
+        os.makedirs(dest_path)
+    members = [(f, os.path.basename(f)) for f in sorted(set(files))]
+    try:
+        with open(zip_filename, 'wb') as fp:
+            write_zip(fp, members, policy, max_workers)
+    except Exception as e:
+        if os.path.isfile(zip_filename):
+            os.unlink(zip_filename)
+        logger.exception('Unable to create %s', zip_filename)
+        raise ArchiveError(
+            'Unable to create {}: {}'.format(zip_filename, e))
+    return zip_filename
+
+
+def folder_members(source_path):
+    return [(os.path.join(source_path, item), item)
+            for item in sorted(os.listdir(source_path))
+            if os.path.isfile(os.path.join(source_path, item))]
@@ -0,0 +1,239 @@
+# coding=utf-8
+"""
+Execução de programas externos (CISIS, inkscape, rsync etc)
+
+    result = commands.run(['mx', 'db', '+control', 'now'])
+    if not result.ok:
+        ...
+
+Os comandos são executados sem shell (lista de argumentos), com tempo
+máximo e quantidade máxima de processos simultâneos por programa. São
+registrados o status de saída, a saída de erro e, por programa, a
+quantidade de execuções, o tempo total, as falhas e os timeouts: no total
+do processo (`STATS`) e no pacote em processamento (trace ativo, ver
+`tracing`), que os grava no arquivo do trace.
+"""
+import os
+import time
+import signal
+import logging
+import threading
+import subprocess
+
+from prodtools.utils import tracing
+
+
+logger = logging.getLogger()
+
+# tempo máximo (segundos) de execução por programa
+TIMEOUTS = {
+    'mx': 600,
+    'id2i': 600,
+    'i2id': 600,
+    'crunchmf': 600,
+    'inkscape': 120,
+    'rsync': 3600,
+    'GeraPadrao.bat': 6 * 3600,
+}
+DEFAULT_TIMEOUT = 1800
+
+# processos simultâneos por programa
+MAX_PROCESSES = {
+    'inkscape': 4,
+    'rsync': 4,
+}
+DEFAULT_MAX_PROCESSES = 16
+
+
+def tool_name(args):
+    return os.path.basename(str(args[0]))
+
+
+class CommandResult(object):
+
+    def __init__(self, args, returncode, stdout='', stderr='', duration=0,
+                 timed_out=False):
+        self.args = args
+        self.returncode = returncode
+        self.stdout = stdout or ''
+        self.stderr = stderr or ''
+        self.duration = duration
+        self.timed_out = timed_out
+
+    @property
+    def ok(self):
+        return self.returncode == 0
+
+    @property
+    def output(self):
+        """
+        Saída padrão e de erro, como em `subprocess.getoutput`
+        """
+        output = self.stdout + self.stderr
+        if output.endswith('\n'):
+            output = output[:-1]
+        return output
+
+
+class ToolStats(object):
+
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.total_time = 0.0
+        self.last_error = None
+
+    def as_dict(self):
+        return {
+            'calls': self.calls,
+            'failures': self.failures,
+            'timeouts': self.timeouts,
+            'total_time': round(self.total_time, 3),
+            'last_error': self.last_error,
+        }
+
+
+class CommandStats(object):
+    """
+    Estatísticas das execuções, por programa
+    """
+
+    def __init__(self):
+        self.tools = {}
+        self._lock = threading.Lock()
+
+    def add(self, result):
+        with self._lock:
+            stats = self.tools.setdefault(tool_name(result.args), ToolStats())
+            stats.calls += 1
+            stats.total_time += result.duration
+            if result.timed_out:
+                stats.timeouts += 1
+            if not result.ok:
+                stats.failures += 1
+                stats.last_error = (
+                    result.stderr.strip()[-500:] or
+                    'exit {}'.format(result.returncode))
+
+    @property
+    def calls(self):
+        return sum(stats.calls for stats in self.tools.values())
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                name: stats.as_dict()
+                for name, stats in sorted(self.tools.items())}
+
+    def __str__(self):
+        with self._lock:
+            return ', '.join(
+                '{}: {} calls ({} failed, {:.2f}s)'.format(
+                    name, stats.calls, stats.failures, stats.total_time)
+                for name, stats in sorted(self.tools.items()))
+
+
+class CommandRunner(object):
+
+    def __init__(self, timeouts=None, max_processes=None):
+        self.timeouts = dict(TIMEOUTS, **(timeouts or {}))
+        self.max_processes = dict(MAX_PROCESSES, **(max_processes or {}))
+        self.stats = CommandStats()
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, name):
+        with self._lock:
+            if name not in self._semaphores:
+                self._semaphores[name] = threading.BoundedSemaphore(
+                    self.max_processes.get(name, DEFAULT_MAX_PROCESSES))
+            return self._semaphores[name]
+
+    def run(self, args, timeout=None, input=None, stdout=None, cwd=None,
+            encoding='utf-8', process_group=False):
+        """
+        Executa `args` e retorna CommandResult
+        stdout: arquivo (aberto) que recebe a saída padrão
+        process_group: executa em novo grupo de processos (sessão), que é
+        encerrado por inteiro no timeout (scripts que executam outros
+        programas)
+        """
+        args = [str(arg) for arg in args]
+        name = tool_name(args)
+        if timeout is None:
+            timeout = self.timeouts.get(name, DEFAULT_TIMEOUT)
+        with tracing.span(name, args=' '.join(args[1:])[:500]) as span:
+            with self._semaphore(name):
+                result = self._run(
+                    args, timeout, input, stdout, cwd, encoding,
+                    process_group)
+            span.set(returncode=result.returncode)
+        self.stats.add(result)
+        package_stats = tracing.stats('commands', CommandStats)
+        if package_stats is not None:
+            package_stats.add(result)
+        if result.timed_out:
+            logger.warning(
+                "Command %s: timeout (%ss)", ' '.join(args), timeout)
+        elif not result.ok:
+            # quem executa o comando avalia a falha; aqui só é registrada
+            logger.debug(
+                "Command %s: exit %s: %s", ' '.join(args),
+                result.returncode, result.stderr.strip()[-500:])
+        return result
+
+    def _run(self, args, timeout, input, stdout, cwd, encoding,
+             process_group=False):
+        start = time.time()
+        process_group = process_group and os.name != 'nt'
+        try:
+            process = subprocess.Popen(
+                args, cwd=cwd,
+                stdin=subprocess.PIPE if input is not None else None,
+                stdout=stdout or subprocess.PIPE, stderr=subprocess.PIPE,
+                start_new_session=process_group)
+        except OSError as e:
+            return CommandResult(
+                args, -1, stderr=str(e), duration=time.time() - start)
+        try:
+            out, err = process.communicate(input, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            kill(process, process_group)
+            process.communicate()
+            return CommandResult(
+                args, -1, stderr='timeout ({}s)'.format(timeout),
+                duration=time.time() - start, timed_out=True)
+        except BaseException:
+            kill(process, process_group)
+            process.wait()
+            raise
+        return CommandResult(
+            args, process.returncode,
+            decode(out, encoding), decode(err, encoding),
+            time.time() - start)
+
+
+def kill(process, process_group=False):
+    if process_group:
+        # também os processos iniciados pelo comando
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+            return
+        except OSError:
+            pass
+    process.kill()
+
+
+def decode(content, encoding):
+    if content is None:
+        return ''
+    return content.decode(encoding, errors='replace')
+
+
+RUNNER = CommandRunner()
+STATS = RUNNER.stats
+
+
+def run(args, **kwargs):
+    return RUNNER.run(args, **kwargs)
@@ -1,14 +1,20 @@
 # coding=utf-8
 
 import os
+import json
 import html
+import time
+import hashlib
 import logging
-
+import threading
+from copy import deepcopy
+from collections import OrderedDict
 from tempfile import mkdtemp, NamedTemporaryFile
 
 from prodtools.utils import fs_utils
 from prodtools.utils import encoding
-from prodtools.utils import system
+from prodtools.utils import commands
+from prodtools.utils import tracing
 
 
 logger = logging.getLogger()
@@ -188,9 +194,13 @@ class CISIS(object):
         if os.path.exists(cisis_path):
             self.cisis_path = cisis_path
 
-    def run_cmd(self, cmd_name, *args):
-        cmd = os.path.join(self.cisis_path, cmd_name) + " " + " ".join(args)
-        return system.run_command(cmd)
+    def run(self, cmd_name, *args, stdout=None):
+        return commands.run(
+            [os.path.join(self.cisis_path, cmd_name)] + list(args),
+            stdout=stdout)
+
+    def run_cmd(self, cmd_name, *args, stdout=None):
+        return self.run(cmd_name, *args, stdout=stdout).output
 
     @property
     def is_available(self):
@@ -204,10 +214,10 @@ class CISIS(object):
         self.run_cmd('id2i', id_filename, "create=" + mst_filename)
 
     def append(self, src, dest):
-        self.run_cmd("mx", src, "append={}".format(dest), "now -all")
+        self.run_cmd("mx", src, "append={}".format(dest), "now", "-all")
 
     def create(self, src, dest):
-        self.run_cmd("mx", src, "create={}".format(dest), 'now -all')
+        self.run_cmd("mx", src, "create={}".format(dest), "now", "-all")
 
     def append_id_to_master(self, id_filename, mst_filename, reset):
         if reset:
@@ -223,64 +233,215 @@ class CISIS(object):
         fs_utils.delete_file_or_folder(db_file_path + '.xrf')
 
     def i2id(self, mst_filename, id_filename):
-        self.run_cmd("i2id", mst_filename, ">", id_filename)
+        with open(id_filename, 'wb') as fp:
+            self.run_cmd("i2id", mst_filename, stdout=fp)
 
     def mst2iso(self, mst_filename, iso_filename):
         self.run_cmd(
-            "mx", mst_filename, "iso={}".format(iso_filename), 'now -all')
+            "mx", mst_filename, "iso={}".format(iso_filename), "now", "-all")
 
     def iso2mst(self, iso_filename, mst_filename):
         self.run_cmd(
             "mx", "iso={}".format(iso_filename),
-            "create={}".format(mst_filename), 'now -all')
+            "create={}".format(mst_filename), "now", "-all")
 
     def new(self, mst_filename):
         self.run_cmd(
-            "mx", 'null count=0', 'create={}'.format(mst_filename), 'now -all')
+            "mx", "null", "count=0", "create={}".format(mst_filename),
+            "now", "-all")
 
     def search(self, mst_filename, expression, result_filename):
         self.delete(result_filename)
         return self.run_cmd(
                     "mx", "btell=0", mst_filename,
-                    '"bool={}"'.format(expression), 'lw=999',
-                    'append={}'.format(result_filename), 'now -all')
+                    "bool={}".format(expression), "lw=999",
+                    "append={}".format(result_filename), "now", "-all")
 
     def generate_indexes(self, mst_filename, fst_filename, inverted_filename):
-        self.run_cmd(
-            "mx", mst_filename, 'fst=@{}'.format(fst_filename),
+        """
+        Gera o arquivo invertido; retorna CommandResult
+        """
+        return self.run(
+            "mx", mst_filename, "fst=@{}".format(fst_filename),
             "fullinv={}".format(inverted_filename))
 
+    def update_indexes(self, mst_filename, fst_filename, inverted_filename,
+                       from_mfn):
+        """
+        Acrescenta ao arquivo invertido os registros a partir de `from_mfn`;
+        retorna CommandResult
+        """
+        return self.run(
+            "mx", mst_filename, "fst=@{}".format(fst_filename),
+            "from={}".format(from_mfn),
+            "ifupd={}".format(inverted_filename), "now", "-all")
+
     def is_readable(self, mst_filename):
         if os.path.isfile(mst_filename + '.mst'):
-            result = self.run_cmd("mx", mst_filename, "+control now")
+            result = self.run_cmd("mx", mst_filename, "+control", "now")
             return "dbxopen" not in result or "nxtmfn" in result
         return False
 
 
+def db_stamp(mst_filename):
+    """
+    Identifica o estado atual da base (.mst e .xrf): muda a cada gravação
+    """
+    try:
+        stats = [os.stat(mst_filename + ext) for ext in ('.mst', '.xrf')]
+    except OSError:
+        return None
+    return tuple((st.st_ino, st.st_size, st.st_mtime_ns) for st in stats)
+
+
+# arquivo de postings do invertido, sempre gerado pelo fullinv
+INVERTED_FILE_EXT = '.ifp'
+
+
+def stamp_as_list(stamp):
+    # como gravado em JSON
+    return [list(item) for item in stamp or []]
+
+
+def file_digest(file_path):
+    content = fs_utils.read_file(file_path, 'iso-8859-1') or ''
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def index_update_mfns(previous, current):
+    """
+    MFN dos registros que faltam no arquivo invertido, ou None, se ele
+    precisa ser gerado por completo (sem estado anterior, FST diferente,
+    registros alterados ou excluídos)
+    """
+    if previous is None or previous.get('fst') != current['fst']:
+        return None
+    previous_records = previous.get('records', {})
+    new_mfns = []
+    for mfn, digest in current['records'].items():
+        registered = previous_records.get(mfn)
+        if registered is None:
+            new_mfns.append(int(mfn))
+        elif registered != digest:
+            return None
+    if len(previous_records) + len(new_mfns) != len(current['records']):
+        return None
+    if new_mfns and min(new_mfns) <= max(
+            [int(mfn) for mfn in previous_records] or [0]):
+        return None
+    return sorted(new_mfns)
+
+
+class IndexState(object):
+    """
+    Registros (hash por MFN) e FST da última atualização do invertido
+    """
+
+    def __init__(self, inverted_filename):
+        self.file_path = inverted_filename + '.ifstate'
+
+    def read(self):
+        try:
+            with open(self.file_path) as fp:
+                return json.load(fp)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def write(self, data):
+        with open(self.file_path, 'w') as fp:
+            json.dump(data, fp)
+
+    def delete(self):
+        fs_utils.delete_file_or_folder(self.file_path)
+
+
+class IndexStats(object):
+    """
+    Quantidade e tempo das atualizações de arquivos invertidos, por modo
+    """
+
+    def __init__(self):
+        self.items = {}
+        self._lock = threading.Lock()
+
+    def add(self, mode, duration):
+        with self._lock:
+            item = self.items.setdefault(mode, {'calls': 0, 'time': 0.0})
+            item['calls'] += 1
+            item['time'] += duration
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                mode: {'calls': item['calls'], 'time': round(item['time'], 3)}
+                for mode, item in self.items.items()}
+
+
 class UCISIS(object):
+    """
+    Executa as operações com o CISIS (1030 ou 1660) que lê cada base
+
+    Para evitar um processo a cada operação, são mantidos, enquanto a base
+    não for alterada, o CISIS que a lê (em vez de `mx +control` a cada
+    operação) e os registros lidos por `get_records` (sem expressão)
+    """
+
+    MAX_CACHED_DBS = 64
 
     def __init__(self, cisis1030, cisis1660):
         self.idfile = IDFile()
         self.cisis1030 = cisis1030
         self.cisis1660 = cisis1660
+        self._readers = {}
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
 
     @property
     def is_available(self):
         return self.cisis1660.is_available or self.cisis1030.is_available
 
+    def _remember(self, mst_filename, cisis):
+        """
+        Registra `cisis` como o que lê a base que acabou de gravar
+        """
+        key = os.path.abspath(mst_filename)
+        stamp = db_stamp(mst_filename)
+        with self._lock:
+            self._records.pop(key, None)
+            if stamp is None or cisis is None:
+                self._readers.pop(key, None)
+            else:
+                self._readers[key] = (stamp, cisis)
+
+    def _forget(self, mst_filename):
+        self._remember(mst_filename, None)
+
     def cisis(self, mst_filename):
-        if os.path.isfile(mst_filename + '.mst'):
-            if self.cisis1030.is_readable(mst_filename):
-                return self.cisis1030
-            elif self.cisis1660.is_readable(mst_filename):
-                return self.cisis1660
-        else:
+        if not os.path.isfile(mst_filename + '.mst'):
             return self.cisis1030
+        key = os.path.abspath(mst_filename)
+        stamp = db_stamp(mst_filename)
+        with self._lock:
+            known = self._readers.get(key)
+        if known is not None and known[0] == stamp:
+            return known[1]
+        reader = None
+        if self.cisis1030.is_readable(mst_filename):
+            reader = self.cisis1030
+        elif self.cisis1660.is_readable(mst_filename):
+            reader = self.cisis1660
+        if reader is not None and stamp is not None:
+            with self._lock:
+                self._readers[key] = (stamp, reader)
+        return reader
 
     def version(self, mst_filename):
-        if self.cisis1030.is_readable(mst_filename):
+        if not os.path.isfile(mst_filename + '.mst'):
+            return None
+        reader = self.cisis(mst_filename)
+        if reader is self.cisis1030:
             return '1030'
-        elif self.cisis1660.is_readable(mst_filename):
+        elif reader is self.cisis1660:
             return '1660'
 
     def convert1660to1030(self, mst_filename):
@@ -289,22 +450,31 @@ class UCISIS(object):
             temp_file.close()
             self.cisis1660.mst2iso(mst_filename, temp_file.name)
             self.cisis1030.iso2mst(temp_file.name, mst_filename)
+            self._remember(mst_filename, self.cisis1030)
             fs_utils.delete_file_or_folder(temp_file.name)
 
     def crunchmf(self, mst_filename, wmst_filename):
         self.cisis(mst_filename).crunchmf(mst_filename, wmst_filename)
+        self._forget(wmst_filename)
 
     def id2i(self, id_filename, mst_filename):
-        self.cisis(mst_filename).id2i(id_filename, mst_filename)
+        cisis = self.cisis(mst_filename)
+        cisis.id2i(id_filename, mst_filename)
+        self._remember(mst_filename, cisis)
 
     def append(self, src, dest):
         self.cisis(src).append(src, dest)
+        self._forget(dest)
 
     def create(self, src, dest):
-        self.cisis(src).create(src, dest)
+        cisis = self.cisis(src)
+        cisis.create(src, dest)
+        self._remember(dest, cisis)
 
     def append_id_to_master(self, id_filename, mst_filename, reset):
-        self.cisis(mst_filename).append_id_to_master(id_filename, mst_filename, reset)
+        cisis = self.cisis(mst_filename)
+        cisis.append_id_to_master(id_filename, mst_filename, reset)
+        self._remember(mst_filename, cisis)
 
     def i2id(self, mst_filename, id_filename):
         self.cisis(mst_filename).i2id(mst_filename, id_filename)
@@ -313,16 +483,97 @@ class UCISIS(object):
         self.cisis(mst_filename).mst2iso(mst_filename, iso_filename)
 
     def iso2mst(self, iso_filename, mst_filename):
-        self.cisis(mst_filename).iso2mst(iso_filename, mst_filename)
+        cisis = self.cisis(mst_filename)
+        cisis.iso2mst(iso_filename, mst_filename)
+        self._remember(mst_filename, cisis)
 
     def new(self, mst_filename):
         self.cisis1030.new(mst_filename)
+        self._remember(mst_filename, self.cisis1030)
 
     def search(self, mst_filename, expression, result_filename):
-        self.cisis(mst_filename).search(mst_filename, expression, result_filename)
+        cisis = self.cisis(mst_filename)
+        cisis.search(mst_filename, expression, result_filename)
+        self._remember(result_filename, cisis)
 
     def generate_indexes(self, mst_filename, fst_filename, inverted_filename):
-        self.cisis(mst_filename).generate_indexes(mst_filename, fst_filename, inverted_filename)
+        """
+        Atualiza o arquivo invertido somente com os registros novos, se os
+        demais não foram alterados ou excluídos e a FST é a mesma da última
+        atualização (<invertido>.ifstate); senão, o gera por completo.
+        Retorna o modo: 'full', 'incremental', 'unchanged' ou 'failed'
+        """
+        start = time.time()
+        with tracing.span('generate_indexes', db=mst_filename) as span:
+            cisis = self.cisis(mst_filename)
+            state = IndexState(inverted_filename)
+            previous = state.read()
+            current = {
+                'fst': file_digest(fst_filename),
+                'stamp': stamp_as_list(db_stamp(mst_filename)),
+            }
+            if (previous is not None and current['stamp'] and
+                    previous.get('stamp') == current['stamp']):
+                # base não foi alterada: dispensa o i2id
+                current['records'] = previous.get('records', {})
+            else:
+                current['records'] = self.record_digests(mst_filename)
+            new_mfns = index_update_mfns(previous, current)
+            if not os.path.isfile(inverted_filename + INVERTED_FILE_EXT):
+                new_mfns = None
+            result = None
+            state.delete()
+            if new_mfns is None:
+                mode = 'full'
+                result = cisis.generate_indexes(
+                    mst_filename, fst_filename, inverted_filename)
+            elif new_mfns:
+                mode = 'incremental'
+                result = cisis.update_indexes(
+                    mst_filename, fst_filename, inverted_filename,
+                    min(new_mfns))
+            else:
+                mode = 'unchanged'
+            if result is None or result.ok:
+                # a indexação pode gravar no .mst
+                current['stamp'] = stamp_as_list(db_stamp(mst_filename))
+                state.write(current)
+            else:
+                # sem estado, a próxima atualização gera o invertido completo
+                mode = 'failed'
+                logger.error(
+                    "Unable to generate indexes of %s: %s", mst_filename,
+                    result.stderr.strip()[-500:] or
+                    'exit {}'.format(result.returncode))
+            span.set(
+                mode=mode, records=len(current['records']),
+                new_records=len(new_mfns or []))
+        duration = time.time() - start
+        stats = tracing.stats('indexes', IndexStats)
+        if stats is not None:
+            stats.add(mode, duration)
+        logger.info(
+            "Indexes of %s: %s (%i records) in %.2fs", mst_filename, mode,
+            len(current['records']), duration)
+        return mode
+
+    def record_digests(self, mst_filename):
+        """
+        {mfn: hash do conteúdo} dos registros da base
+        """
+        digests = {}
+        if not os.path.isfile(mst_filename + '.mst'):
+            return digests
+        temp_dir = mkdtemp()
+        id_filename = os.path.join(temp_dir, 'records.id')
+        self.i2id(mst_filename, id_filename)
+        content = fs_utils.read_file(id_filename, 'iso-8859-1') or ''
+        for record in content.split('!ID ')[1:]:
+            mfn, record = record.split('\n', 1)
+            digests[str(int(mfn))] = hashlib.sha1(
+                record.encode('utf-8')).hexdigest()
+        fs_utils.delete_file_or_folder(temp_dir)
+        return digests
 
     def update_indexes(self, db_filename, fst_filename):
         if fst_filename is not None:
@@ -336,23 +587,58 @@ class UCISIS(object):
         self.append_id_to_master(id_filename, db_filename, False)
         self.update_indexes(db_filename, fst_filename)
 
+    def id_files_to_db(self, id_filenames, db_filename, fst_filename=None):
+        """
+        Cria a base com os registros dos arquivos ID, nesta ordem, com uma
+        única execução do id2i (em vez de id2i e mx append por arquivo)
+        """
+        temp_dir = mkdtemp()
+        id_filename = os.path.join(
+            temp_dir, os.path.basename(db_filename) + '.id')
+        mfn = 0
+        with open(id_filename, 'w', encoding='iso-8859-1') as fp:
+            for filename in id_filenames:
+                content = fs_utils.read_file(filename, 'iso-8859-1') or ''
+                for record in content.split('!ID ')[1:]:
+                    mfn += 1
+                    fp.write(self.idfile._format_id(mfn))
+                    fp.write(record[record.find('\n') + 1:])
+        self.id_file_to_db(id_filename, db_filename, fst_filename)
+        fs_utils.delete_file_or_folder(temp_dir)
+
     def get_records(self, db_filename, expr=None):
-        temp_dir = None
         if expr is None:
-            base = db_filename
-        else:
-            temp_dir = mkdtemp()
-            base = os.path.join(temp_dir, os.path.basename(db_filename))
-            self.search(db_filename, expr, base)
+            return self._get_all_records(db_filename)
+
+        temp_dir = mkdtemp()
+        base = os.path.join(temp_dir, os.path.basename(db_filename))
+        self.search(db_filename, expr, base)
+        r = self._read_records(base)
+        self._forget(base)
+        fs_utils.delete_file_or_folder(temp_dir)
+        return r
 
+    def _get_all_records(self, db_filename):
+        key = os.path.abspath(db_filename)
+        stamp = db_stamp(db_filename)
+        with self._lock:
+            cached = self._records.get(key)
+        if cached is not None and stamp is not None and cached[0] == stamp:
+            return deepcopy(cached[1])
+        r = self._read_records(db_filename)
+        if stamp is not None and stamp == db_stamp(db_filename):
+            with self._lock:
+                self._records[key] = (stamp, deepcopy(r))
+                while len(self._records) > self.MAX_CACHED_DBS:
+                    self._records.popitem(last=False)
+        return r
+
+    def _read_records(self, base):
         r = []
         id_filename = base + '.id'
         if os.path.isfile(base + '.mst'):
             self.i2id(base, id_filename)
             r = self.idfile.read(id_filename)
-
-        if temp_dir:
-            fs_utils.delete_file_or_folder(temp_dir)
         fs_utils.delete_file_or_folder(id_filename)
         return r
 
@@ -1,21 +1,29 @@
-import zipfile
 import os
 import re
-import shutil
 import logging
-import tempfile
 import threading
-from ftplib import FTP, all_errors
+from ftplib import FTP
 from datetime import datetime
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+from prodtools.utils import archive
 
 
 exp_logger = logging.getLogger(__name__)
 
+MAX_UPLOADS = 2
+MAX_ATTEMPTS = 2
+
+_uploads = None
+_uploads_lock = threading.Lock()
+
 
 class Exporter(object):
 
-    def __init__(self, data):
+    def __init__(self, data, callback=None):
         self._data = data
+        self.callback = callback
 
     @property
     def ftp_configuration(self):
@@ -61,6 +69,14 @@ class Exporter(object):
         return os.path.join(destination_dir, "%s_%s" % (data, file_name))
 
     def export(self, source_path, zip_filename):
+        """
+        Cria o zip de `source_path` diretamente no destino (pasta ou FTP).
+        Os envios são executados por no máximo `MAX_UPLOADS` threads
+        (compartilhadas por todos os Exporters); ao final, `callback`
+        recebe o resultado, também retornado por `export`.
+        `source_path` costuma ser temporário, portanto `export` aguarda o
+        término do envio
+        """
         destination_path = self.copy_configuration
         ftp_configuration = self.ftp_configuration
 
@@ -68,93 +84,123 @@ class Exporter(object):
             exp_logger.info("Exporter: Missing Configuration")
             return
 
-        zip_file_path = self.zip(source_path, zip_filename)
-
-        if zip_file_path:
-            dest_path = destination_path or os.path.dirname(zip_file_path)
-
+        if destination_path:
             final_file_path = self._preppend_time_to_destination_filename(
-                dest_path, zip_file_path
-            )
-            shutil.move(zip_file_path, final_file_path)
-
-            if not destination_path and ftp_configuration:
-                server, user, password, remote_path = ftp_configuration
-                self.export_by_ftp(final_file_path, server, user, password, remote_path)
-                return {
-                    "file": os.path.join(
-                        remote_path, os.path.basename(final_file_path)),
-                    "ftp": server, "user": user,
-                }
-            return {"file": final_file_path}
-
-    def zip(self, source_path, zip_filename):
-        try:
-            dest_path = tempfile.mkdtemp()
-        except IOError:
-            exp_logger.info("Exporter: Unable to create temp dir")
+                destination_path, zip_filename)
+            info = {"file": final_file_path}
+            upload = partial(self.export_by_copy, final_file_path)
         else:
-            zip_file_path = os.path.join(dest_path, zip_filename)
+            server, user, password, remote_path = ftp_configuration
+            remote_name = os.path.basename(
+                self._preppend_time_to_destination_filename("", zip_filename))
+            info = {
+                "file": os.path.join(remote_path or "", remote_name),
+                "ftp": server, "user": user,
+            }
+            upload = partial(
+                self.export_by_ftp, remote_name, server, user, password,
+                remote_path)
+        members = archive.folder_members(source_path)
+        info = uploads_executor().submit(
+            self._upload, upload, members, info).result()
+        if self.callback is not None:
+            self.callback(info)
+        return info
+
+    def _upload(self, upload, members, info):
+        exp_logger.info("Exporter: %s - start", info["file"])
+        for attempt in range(1, MAX_ATTEMPTS + 1):
             try:
-                with zipfile.ZipFile(zip_file_path, 'w') as zipf:
-                    exp_logger.info(
-                        "Create %s from %s" % (zip_file_path, source_path))
-                    for item in os.listdir(source_path):
-                        file_path = os.path.join(source_path, item)
-                        zipf.write(file_path, arcname=item)
-            except IOError:
+                info["size"] = upload(members)
+            except Exception as e:
                 exp_logger.info(
-                    "Exporter: Unable to create zip: %s" % zip_filename
-                )
+                    "Exporter: Unable to export %s (attempt %i): %s",
+                    info["file"], attempt, e)
+                info["status"] = "failed"
+                info["error"] = str(e)
             else:
-                return zip_file_path
+                exp_logger.info("Exporter: %s - end", info["file"])
+                info["status"] = "done"
+                info.pop("error", None)
+                break
+        return info
 
-    def export_by_ftp(self, local_file_path, server, user, password, remote_path):
-        background = AsyncFTP(local_file_path, server, user, password, remote_path)
-        background.start()
-
-
-class AsyncFTP(threading.Thread):
-    def __init__(self, local_file_path, server, user, password, remote_path, timeout=60):
-        threading.Thread.__init__(self)
-        self.local_file_path = local_file_path
-        self.server = server
-        self.user = user
-        self.password = password
-        self.remote_path = remote_path
-        self.timeout = timeout
-
-    def run(self):
-        exp_logger.info("FTP.START")
+    def export_by_copy(self, final_file_path, members):
+        """
+        Grava o zip com nome temporário e renomeia após conferir o tamanho
+        """
+        tmp = final_file_path + ".part"
         try:
-            ftp = FTP(self.server, self.user, self.password, self.timeout)
-        except all_errors as e:
-            exp_logger.info(e)
-            return
+            with open(tmp, "wb") as fp:
+                writer = CountingWriter(fp)
+                archive.write_zip(writer, members)
+            if os.path.getsize(tmp) != writer.size:
+                raise ExportError(
+                    "{}: size mismatch".format(final_file_path))
+            os.replace(tmp, final_file_path)
+        finally:
+            if os.path.isfile(tmp):
+                os.unlink(tmp)
+        return writer.size
+
+    def export_by_ftp(self, remote_name, server, user, password, remote_path,
+                      members, timeout=60):
+        """
+        Envia o zip para o FTP enquanto ele é criado (sem arquivo local),
+        com nome temporário, e renomeia após conferir o tamanho remoto
+        """
+        tmp = remote_name + ".part"
+        host, _, port = server.partition(":")
+        ftp = FTP(timeout=timeout)
         try:
-            if self.remote_path:
-                ftp.cwd(self.remote_path)
-            exp_logger.info("ftp " + self.local_file_path)
-            remote_name = os.path.basename(self.local_file_path)
-            with open(self.local_file_path, 'rb') as f:
-                try:
-                    exp_logger.info("FTP.STOR %s - start" % remote_name)
-                    ftp.storbinary('STOR {}'.format(remote_name), f)
-                    exp_logger.info("FTP.STOR %s - end" % remote_name)
-                except all_errors:
-                    exp_logger.info(
-                        'FTP: Unable to send %s to %s' %
-                        (self.local_file_path, remote_name), exc_info=True)
-        except all_errors as e:
-            exp_logger.info("all_errors as e")
-
-            exp_logger.info(e)
+            ftp.connect(host, int(port or 21))
+            ftp.login(user, password)
+            if remote_path:
+                ftp.cwd(remote_path)
+            ftp.voidcmd("TYPE I")
+            conn = ftp.transfercmd("STOR {}".format(tmp))
+            try:
+                with conn.makefile("wb") as stream:
+                    writer = CountingWriter(stream)
+                    archive.write_zip(writer, members)
+            finally:
+                conn.close()
+            ftp.voidresp()
+            remote_size = ftp.size(tmp)
+            if remote_size != writer.size:
+                ftp.delete(tmp)
+                raise ExportError("{}: remote size {} != {}".format(
+                    remote_name, remote_size, writer.size))
+            ftp.rename(tmp, remote_name)
         finally:
             ftp.close()
-            exp_logger.info("FTP.END")
-            try:
-                os.unlink(self.local_file_path)
-                shutil.rmtree(os.path.dirname(self.local_file_path))
-            except OSError:
-                exp_logger.info(
-                    "Exporter: Unable to delete temp: %s" % self.local_file_path)
+        return writer.size
+
+
+class ExportError(Exception):
+    pass
+
+
+class CountingWriter(object):
+    """
+    Stream de escrita que conta os bytes gravados
+    """
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+        return self.fileobj.write(data)
+
+    def flush(self):
+        self.fileobj.flush()
+
+
+def uploads_executor():
+    global _uploads
+    with _uploads_lock:
+        if _uploads is None:
+            _uploads = ThreadPoolExecutor(max_workers=MAX_UPLOADS)
+        return _uploads
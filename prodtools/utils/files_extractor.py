@@ -1,9 +1,11 @@
 # coding=utf-8
-## {{{ http://code.activestate.com/recipes/576714/ (r2)
 import os
+import shutil
 import tarfile
 import zipfile
 import logging
+import threading
+import zlib
 
 
 logger = logging.getLogger()
@@ -20,30 +22,219 @@ def is_compressed_file(path):
     return r
 
 
-def extract_file(path, to_directory='.'):
-    r = False
+def is_valid_archive(path):
+    """
+    Verifica se `path` é um arquivo compactado suportado e legível
+    """
+    if not is_compressed_file(path) or not os.path.isfile(path):
+        return False
+    if path.endswith('.zip'):
+        return zipfile.is_zipfile(path)
+    return tarfile.is_tarfile(path)
+
+
+class ExtractionResult(object):
+
+    def __init__(self):
+        self.extracted = []
+        self.skipped = []
+        self.unsafe = []
+
+
+def _zip_members(path):
+    with zipfile.ZipFile(path, 'r') as zipf:
+        for info in zipf.infolist():
+            if info.filename.endswith('/'):
+                yield info.filename, None, None, None
+                continue
+            with zipf.open(info) as fp:
+                yield info.filename, info.file_size, info.CRC, fp
+
+
+def _tar_members(path, mode):
+    with tarfile.open(path, mode) as tarf:
+        for member in tarf:
+            if member.isdir():
+                yield member.name, None, None, None
+            elif member.isfile():
+                yield member.name, member.size, None, tarf.extractfile(member)
+            else:
+                # links e arquivos especiais não são extraídos
+                logger.info('extract_file: ignored %s', member.name)
+
 
+def _members(path):
     if path.endswith('.zip'):
-        opener, mode = zipfile.ZipFile, 'r'
-    elif path.endswith('.tar.gz') or path.endswith('.tgz'):
-        opener, mode = tarfile.open, 'r:gz'
+        return _zip_members(path)
+    if path.endswith('.tar.gz') or path.endswith('.tgz'):
+        return _tar_members(path, 'r:gz')
+    if path.endswith('.tar.bz2') or path.endswith('.tbz'):
+        return _tar_members(path, 'r:bz2')
+    raise ValueError("Could not extract `%s` as no appropriate extractor is found" % path)
+
+
+def member_parts(name):
+    """
+    Retorna as partes do caminho de um membro ou None se o caminho
+    for inseguro (absoluto ou com '..')
+    """
+    name = name.replace('\\', '/')
+    if name.startswith('/') or (len(name) > 1 and name[1] == ':'):
+        return None
+    parts = [p for p in name.split('/') if p not in ('', '.')]
+    if '..' in parts:
+        return None
+    return parts
+
+
+class ArchiveSummary(object):
+    """
+    Conteúdo de um arquivo compactado, obtido sem extraí-lo
+    """
+
+    def __init__(self):
+        self.members = 0
+        self.size = 0
+        self.xml = 0
+        self.unsafe = []
+
+
+def _zip_infos(path):
+    # somente o diretório central do zip é lido
+    with zipfile.ZipFile(path, 'r') as zipf:
+        for info in zipf.infolist():
+            yield (info.filename, info.filename.endswith('/'), True,
+                   info.file_size)
+
+
+def _tar_infos(path, mode):
+    with tarfile.open(path, mode) as tarf:
+        for member in tarf:
+            yield (member.name, member.isdir(),
+                   member.isfile() or member.isdir(), member.size)
+
+
+def inspect_archive(path):
+    """
+    Retorna ArchiveSummary de `path` ou None se não for um arquivo
+    compactado válido. Membros com caminho inseguro, links e arquivos
+    especiais são listados em `unsafe`. São contados como XML os que
+    seriam extraídos com `flatten`
+    """
+    if not is_valid_archive(path):
+        return None
+    if path.endswith('.zip'):
+        infos = _zip_infos(path)
     elif path.endswith('.tar.bz2') or path.endswith('.tbz'):
-        opener, mode = tarfile.open, 'r:bz2'
+        infos = _tar_infos(path, 'r:bz2')
     else:
+        infos = _tar_infos(path, 'r:gz')
+    summary = ArchiveSummary()
+    try:
+        for name, is_dir, is_regular, size in infos:
+            summary.members += 1
+            parts = member_parts(name)
+            if parts is None or not is_regular:
+                summary.unsafe.append(name)
+                continue
+            if is_dir:
+                continue
+            summary.size += size
+            if len(parts) <= 2 and parts[-1].lower().endswith('.xml'):
+                summary.xml += 1
+    except (IOError, zipfile.BadZipFile, tarfile.TarError, EOFError,
+            zlib.error):
+        logger.error('inspect_archive: Invalid file ' + path)
+        return None
+    return summary
+
+
+def file_crc(file_path):
+    crc = 0
+    with open(file_path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(1024 * 1024), b''):
+            crc = zlib.crc32(chunk, crc)
+    return crc & 0xffffffff
+
+
+def is_unchanged(file_path, size, crc):
+    # sem CRC (membros de tar), o arquivo é sempre gravado
+    if crc is None:
+        return False
+    if not os.path.isfile(file_path) or os.path.getsize(file_path) != size:
+        return False
+    return file_crc(file_path) == crc
+
+
+def _write_member(fp, file_path):
+    """
+    Grava o membro diretamente no destino, com nome temporário
+    substituído atomicamente ao final
+    """
+    tmp = '{}.{}-{}.part'.format(
+        file_path, os.getpid(), threading.get_ident())
+    try:
+        with open(tmp, 'wb') as out:
+            shutil.copyfileobj(fp, out, 1024 * 1024)
+        os.replace(tmp, file_path)
+    finally:
+        if os.path.isfile(tmp):
+            os.unlink(tmp)
+
+
+def extract_members(path, to_directory, flatten=False):
+    """
+    Extrai os membros de `path` diretamente em `to_directory`,
+    sem alterar o diretório corrente do processo.
+    flatten: extrai em `to_directory` os arquivos da raiz e dos
+    subdiretórios do primeiro nível, descartando as pastas
+    """
+    result = ExtractionResult()
+    to_directory = os.path.realpath(to_directory)
+    for name, size, crc, fp in _members(path):
+        parts = member_parts(name)
+        if parts is None:
+            logger.error('extract_file: unsafe path %s in %s', name, path)
+            result.unsafe.append(name)
+            continue
+        if not parts:
+            continue
+        if fp is None:
+            if not flatten:
+                dir_path = os.path.join(to_directory, *parts)
+                if not os.path.isdir(dir_path):
+                    os.makedirs(dir_path)
+            continue
+        if flatten:
+            if len(parts) > 2:
+                continue
+            parts = parts[-1:]
+        file_path = os.path.join(to_directory, *parts)
+        if not os.path.realpath(file_path).startswith(to_directory + os.sep):
+            logger.error('extract_file: unsafe path %s in %s', name, path)
+            result.unsafe.append(name)
+            continue
+        if is_unchanged(file_path, size, crc):
+            result.skipped.append(name)
+            continue
+        dirname = os.path.dirname(file_path)
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        _write_member(fp, file_path)
+        result.extracted.append(name)
+    return result
+
+
+def extract_file(path, to_directory='.', flatten=False):
+    if not is_compressed_file(path):
         raise ValueError("Could not extract `%s` as no appropriate extractor is found" % path)
-    cwd = os.getcwd()
-    os.chdir(to_directory)
     try:
-        file = opener(path, mode)
-        try:
-            file.extractall()
-        finally:
-            file.close()
-        r = True
-    except IOError:
+        result = extract_members(path, to_directory, flatten)
+    except (IOError, zipfile.BadZipFile, tarfile.TarError, EOFError,
+            zlib.error):
         logger.error('extract_file: Invalid file ' + path)
-        r = False
-    finally:
-        os.chdir(cwd)
-        return r
-## end of http://code.activestate.com/recipes/576714/ }}}
+        return False
+    logger.info(
+        'extract_file: %s: %i extracted, %i skipped, %i unsafe',
+        path, len(result.extracted), len(result.skipped), len(result.unsafe))
+    return True
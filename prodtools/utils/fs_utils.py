@@ -2,10 +2,10 @@
 import sys
 import os
 import shutil
-import tempfile
-from zipfile import ZipFile
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
+from prodtools.utils import archive
 from prodtools.utils import files_extractor
 from prodtools.utils import encoding
 
@@ -100,25 +100,32 @@ def move_file(src, dest):
 
 
 def extract_package(compressed_file, dest_path):
-    temp_dir = tempfile.mkdtemp()
-    if files_extractor.extract_file(compressed_file, temp_dir):
-        if os.path.exists(dest_path):
-            delete_file_or_folder(dest_path)
-        os.makedirs(dest_path)
-        # eliminate folders
-        for item in os.listdir(temp_dir):
-            item_path = os_path_join(temp_dir, item)
-            if os.path.isfile(item_path):
-                shutil.move(item_path, dest_path)
-            elif os.path.isdir(item_path):
-                for f in os.listdir(item_path):
-                    file_path = os_path_join(item_path, f)
-                    if os.path.isfile(file_path):
-                        shutil.move(file_path, dest_path)
-                shutil.rmtree(item_path)
-        shutil.rmtree(temp_dir)
-        return True
-    return False
+    """
+    Extrai os arquivos de `compressed_file` diretamente em `dest_path`,
+    descartando as pastas
+    """
+    if not files_extractor.is_valid_archive(compressed_file):
+        return False
+    if os.path.exists(dest_path):
+        delete_file_or_folder(dest_path)
+    os.makedirs(dest_path)
+    return files_extractor.extract_file(
+        compressed_file, dest_path, flatten=True)
+
+
+def extract_packages(items, max_workers=4):
+    """
+    Extrai vários pacotes ao mesmo tempo
+    items: lista de tuplas (compressed_file, dest_path)
+    Retorna dict {compressed_file: True/False}
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            compressed_file: executor.submit(
+                extract_package, compressed_file, dest_path)
+            for compressed_file, dest_path in items
+        }
+        return {k: future.result() for k, future in futures.items()}
 
 
 def unzip(compressed_filename, destination_path):
@@ -138,24 +145,17 @@ def unzip(compressed_filename, destination_path):
     return r
 
 
-def zip(zip_filename, files):
-    dest_path = os.path.dirname(zip_filename)
-    if not os.path.isdir(dest_path):
-        os.makedirs(dest_path)
-    try:
-        zipf = ZipFile(zip_filename, 'w')
-        for item in list(set(files)):
-            zipf.write(item, arcname=os.path.basename(item))
-        zipf.close()
-    except:
-        pass
+def zip(zip_filename, files, policy=archive.DELIVERY):
+    """
+    Cria `zip_filename` com `files`.
+    Levanta archive.ArchiveError se não for possível criar o zip
+    """
+    return archive.zip_files(zip_filename, files, policy)
 
 
 def zip_report(report_filename):
     zip_path = report_filename.replace('.html', '.zip')
-    myZipFile = ZipFile(zip_path, "w")
-    myZipFile.write(report_filename, os.path.basename(report_filename), zipfile.ZIP_DEFLATED)
-    return zip_path
+    return archive.zip_files(zip_path, [report_filename])
 
 
 def last_modified_datetime(filename):
@@ -1,140 +1,310 @@
 # coding=utf-8
-from ftplib import FTP
+"""
+Download dos pacotes depositados no FTP
+
+A árvore de pastas é listada uma única vez (MLSD, quando disponível) e os
+arquivos são baixados por um pequeno conjunto de conexões. Cada arquivo é
+gravado com nome temporário (`.part`), que é retomado (REST) caso o
+download tenha sido interrompido, se o arquivo no FTP é o mesmo (caminho,
+tamanho e data, registrados em `.part.source`), e renomeado quando
+completo. O arquivo
+só é apagado do FTP depois que o tamanho do arquivo local é conferido.
+"""
 import os
+import json
+import ftplib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from prodtools.utils import encoding
 
 
+logger = logging.getLogger()
+
+
 actions = []
 
+PACKAGE_EXTENSIONS = ('.zip', '.tgz')
+PART_EXTENSION = '.part'
+# origem (caminho, tamanho e data no FTP) do arquivo .part
+SOURCE_EXTENSION = '.source'
+MAX_WORKERS = 4
+MAX_ATTEMPTS = 2
+
 
 def register_action(action):
     encoding.display_message(action)
     actions.append(action)
 
 
+def split_same_names(files):
+    """
+    Os arquivos são gravados pelo nome, sem as pastas do FTP.
+    Retorna (arquivos a baixar, arquivos com nome já selecionado), de modo
+    que dois downloads simultâneos não usem o mesmo arquivo local
+    """
+    selected = []
+    postponed = []
+    names = set()
+    for item in files:
+        name = item[0].split('/')[-1]
+        if name in names:
+            postponed.append(item)
+        else:
+            names.add(name)
+            selected.append(item)
+    return selected, postponed
+
+
+def read_source(file_path):
+    try:
+        with open(file_path) as fp:
+            return json.load(fp)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def write_source(file_path, source):
+    with open(file_path, 'w') as fp:
+        json.dump(source, fp)
+
+
+def ftp_join(*items):
+    path = '/'.join(item.strip('/') for item in items if item.strip('/'))
+    if items and items[0].startswith('/'):
+        path = '/' + path
+    return path
+
+
 class FTPService(object):
 
-    def __init__(self, server, user, pswd):
+    def __init__(self, server, user, pswd, max_workers=MAX_WORKERS):
         self.user = user
         self.pswd = pswd
-        self.ftp = FTP(server)
+        self.server = server
+        self.port = 21
+        if ':' in server:
+            self.server, port = server.split(':')
+            self.port = int(port)
+        self.max_workers = max_workers or 1
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
 
     @property
     def registered_actions(self):
         return '\n'.join(actions)
 
-    def download_files(self, local_path, path_in_ftp_server):
-        if not os.path.isdir(local_path):
-            os.makedirs(local_path)
-        os.chdir(local_path)
+    def connect(self):
+        ftp = ftplib.FTP()
+        ftp.connect(self.server, self.port)
+        register_action(ftp.login(self.user, self.pswd))
+        return ftp
 
-        r = self.ftp.login(self.user, self.pswd)
-        register_action(r)
-        downloaded_files = self.download_files_of_subdir(local_path, path_in_ftp_server, False)
+    @property
+    def ftp(self):
+        """
+        Conexão da thread atual
+        """
+        ftp = getattr(self._local, 'ftp', None)
+        if ftp is None:
+            ftp = self.connect()
+            self._local.ftp = ftp
+            with self._lock:
+                self._connections.append(ftp)
+        return ftp
 
-        r = self.ftp.close()
-        register_action('ftp finished')
+    def reconnect(self):
+        ftp = getattr(self._local, 'ftp', None)
+        self._local.ftp = None
+        if ftp is not None:
+            with self._lock:
+                self._connections.remove(ftp)
+            self._close(ftp)
+        return self.ftp
 
-        register_action(';\n'.join(downloaded_files))
-        return downloaded_files
+    def _close(self, ftp):
+        try:
+            ftp.quit()
+        except ftplib.all_errors:
+            ftp.close()
 
-    def download_files_of_subdir(self, local_path, path_in_ftp_server, delete_path_in_ftp_server=False):
-        levels = len(path_in_ftp_server.split('/'))
-        downloaded_files = []
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for ftp in connections:
+            self._close(ftp)
+        self._local = threading.local()
 
-        exist_ftp_folder = False
-        if '/' in path_in_ftp_server:
-            exist_ftp_folder = True
-        else:
-            if path_in_ftp_server in self.ftp.nlst():
-                exist_ftp_folder = True
+    def _list_dir(self, ftp, path):
+        """
+        Retorna [(nome, é pasta, tamanho, data de modificação)] usando MLSD
+        ou, se o servidor não suporta MLSD, NLST + SIZE (sem a data)
+        """
+        try:
+            return [
+                (name, facts.get('type') == 'dir',
+                 int(facts['size']) if 'size' in facts else None,
+                 facts.get('modify'))
+                for name, facts in ftp.mlsd(path, ['type', 'size', 'modify'])
+                if facts.get('type') in ('file', 'dir')
+            ]
+        except ftplib.error_perm:
+            pass
+        items = []
+        for name in ftp.nlst(path):
+            name = name.split('/')[-1]
+            if name in ('.', '..'):
+                continue
+            try:
+                ftp.voidcmd('TYPE I')
+                items.append(
+                    (name, False, ftp.size(ftp_join(path, name)), None))
+            except ftplib.error_perm:
+                items.append((name, True, None, None))
+        return items
 
-        if exist_ftp_folder:
-            # go to ftp directory
+    def list_files(self, path_in_ftp_server):
+        """
+        Retorna [(caminho no FTP, tamanho, data de modificação)] dos
+        arquivos da árvore
+        """
+        files = []
+        folders = [path_in_ftp_server]
+        while folders:
+            folder = folders.pop(0)
+            for name, is_dir, size, modify in self._list_dir(
+                    self.ftp, folder):
+                path = ftp_join(folder, name)
+                if is_dir:
+                    folders.append(path)
+                else:
+                    files.append((path, size, modify))
+        return files
+
+    def download_files(self, local_path, path_in_ftp_server):
+        if not os.path.isdir(local_path):
+            os.makedirs(local_path)
+        try:
             try:
-                register_action('try to go to ' + path_in_ftp_server)
-                r = self.ftp.cwd(path_in_ftp_server)
-                register_action(r)
-
-                # download files
-                files_or_folders = self.ftp.nlst()
-                register_action('Files/Folders to download:\n' + '\n'.join(files_or_folders) + '\n' + str(len(files_or_folders)) + ' files/folders')
-                for item in files_or_folders:
-                    if item.endswith('.zip') or item.endswith('.tgz'):
-                        # must be a file
-                        downloaded_file = self.download_and_delete_file(local_path, item)
-                        if len(downloaded_file) > 0:
-                            downloaded_files.append(downloaded_file)
-                    else:
-                        # supposed to be a folder
-                        downloaded_files += self.download_files_of_subdir(local_path, item, False)
-
-                # up level
-                for i in range(0, levels):
-                    r = self.ftp.cwd('..')
-                    register_action(r)
-
-                if delete_path_in_ftp_server:
-                    r = self.ftp.rmd(path_in_ftp_server)
-                register_action(r)
-            except:
-                register_action('not found: ' + path_in_ftp_server)
-        else:
-            register_action('not found: ' + path_in_ftp_server)
+                files = [
+                    item
+                    for item in self.list_files(path_in_ftp_server)
+                    if item[0].endswith(PACKAGE_EXTENSIONS)
+                ]
+            except ftplib.all_errors as e:
+                register_action(
+                    'not found: {} ({})'.format(path_in_ftp_server, e))
+                files = []
+            files, postponed = split_same_names(files)
+            register_action(
+                'Files to download:\n' +
+                '\n'.join(item[0] for item in files) +
+                '\n' + str(len(files)) + ' files')
+            if postponed:
+                # ficam no FTP para a próxima execução
+                register_action(
+                    'Postponed (same name as other file):\n' +
+                    '\n'.join(item[0] for item in postponed))
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                downloaded_files = [
+                    name
+                    for name in executor.map(
+                        lambda item: self.download_and_delete_file(
+                            local_path, *item),
+                        files)
+                    if name
+                ]
+        finally:
+            self.close()
+        register_action('ftp finished')
 
+        register_action(';\n'.join(downloaded_files))
         return downloaded_files
 
-    def download_and_delete_file(self, local_path, file):
-        downloaded_file = ''
-        r = self.ftp.retrbinary('RETR ' + file, open(file, 'wb').write)
-        register_action(r)
-        file_path = os.path.join(local_path, file)
-        if os.path.exists(file_path):
+    def modify(self, ftp, remote_path):
+        """
+        Data de modificação no FTP (MDTM), se o servidor informar
+        """
+        try:
+            return ftp.sendcmd('MDTM ' + remote_path).split()[-1]
+        except (ftplib.error_perm, IndexError):
+            return None
 
-            statinfo = os.stat(file_path)
-            register_action(str(statinfo.st_size))
+    def download_file(self, remote_path, local_file_path, size=None,
+                      modify=None):
+        """
+        Baixa `remote_path` em `local_file_path`, retomando o download
+        interrompido. O .part só é retomado se foi iniciado com o mesmo
+        arquivo do FTP (caminho, tamanho e data em <arquivo>.part.source).
+        Retorna True se o arquivo local está completo
+        """
+        part = local_file_path + PART_EXTENSION
+        source_file = part + SOURCE_EXTENSION
+        for attempt in range(MAX_ATTEMPTS):
+            ftp = self.ftp if attempt == 0 else self.reconnect()
+            try:
+                ftp.voidcmd('TYPE I')
+                if size is None:
+                    size = ftp.size(remote_path)
+                if modify is None:
+                    modify = self.modify(ftp, remote_path)
+                source = {
+                    'path': remote_path, 'size': size, 'modify': modify}
+                if read_source(source_file) != source:
+                    # .part de outro arquivo (ou sem origem registrada)
+                    if os.path.isfile(part):
+                        os.unlink(part)
+                    write_source(source_file, source)
+                offset = os.path.getsize(part) if os.path.isfile(part) else 0
+                if offset > size:
+                    offset = 0
+                if offset < size:
+                    with open(part, 'ab' if offset else 'wb') as fp:
+                        register_action(ftp.retrbinary(
+                            'RETR ' + remote_path, fp.write,
+                            rest=offset or None))
+                elif not os.path.isfile(part):
+                    open(part, 'wb').close()
+                break
+            except ftplib.all_errors as e:
+                register_action(
+                    'failure: {} ({})'.format(remote_path, e))
+        local_size = os.path.getsize(part) if os.path.isfile(part) else None
+        if local_size is None or local_size != size:
+            register_action('incomplete: {} {}/{}'.format(
+                remote_path, local_size, size))
+            return False
+        os.replace(part, local_file_path)
+        if os.path.isfile(source_file):
+            os.unlink(source_file)
+        register_action(str(local_size))
+        return True
 
-            downloaded_file = file
-            r = self.ftp.delete(file)
-            register_action(r)
-        return downloaded_file
+    def download_and_delete_file(self, local_path, remote_path, size=None,
+                                 modify=None):
+        name = remote_path.split('/')[-1]
+        if not self.download_file(
+                remote_path, os.path.join(local_path, name), size, modify):
+            return ''
+        try:
+            register_action(self.ftp.delete(remote_path))
+        except ftplib.all_errors as e:
+            register_action('unable to delete {} ({})'.format(remote_path, e))
+        return name
 
     def list_content(self, path_in_ftp_server):
-        r = self.ftp.login(self.user, self.pswd)
-        register_action(r)
-        files_list = self.list_content_of_files_of_subdir(path_in_ftp_server)
-
-        r = self.ftp.close()
+        try:
+            files_list = [
+                item[0] for item in self.list_files(path_in_ftp_server)]
+        finally:
+            self.close()
         register_action('ftp finished')
 
         encoding.display_message(';\n'.join(files_list))
         return files_list
 
-    def list_content_of_files_of_subdir(self, path_in_ftp_server):
-        levels = len(path_in_ftp_server.split('/'))
-        items_in_ftp = []
-        # go to ftp directory
-        register_action('go to ' + path_in_ftp_server)
-        r = self.ftp.cwd(path_in_ftp_server)
-        register_action(r)
-
-        # download files
-        files_or_folders = self.ftp.nlst()
-        register_action('Files/Folders in FTP:' + '\n'.join(files_or_folders) + '\n' + str(len(files_or_folders)) + ' files/folders')
-        for folder_or_file in files_or_folders:
-            if os.path.isdir(folder_or_file):
-                items_in_ftp += self.list_content_of_files_of_subdir(folder_or_file)
-            else:
-                items_in_ftp.append(folder_or_file)
-            # up level
-        for i in range(0, levels):
-            r = self.ftp.cwd('..')
-            register_action(r)
-
-        register_action(r)
-        return items_in_ftp
-
 
 def download_files(ftp_server, user, password, ftp_folder, destination_path):
     ftp = FTPService(ftp_server, user, password)
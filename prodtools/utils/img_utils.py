@@ -57,12 +57,12 @@ def tiff_image(img_filename):
 #                     hdimg_to_jpg(image_filename, jpg_filename)
 
 
-def svg2png(images_path):
-    return svg_conversion.svg2png(images_path)
+def svg2png(images_path, converter=None):
+    return svg_conversion.svg2png(images_path, converter=converter)
 
 
-def png2tiff(images_path):
-    return svg_conversion.png2tiff(images_path)
+def png2tiff(images_path, converter=None):
+    return svg_conversion.png2tiff(images_path, converter=converter)
 
 
 def validate_tiff_image_file(img_filename, dpi=300):
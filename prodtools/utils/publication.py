@@ -0,0 +1,162 @@
+# coding=utf-8
+"""
+Publicação de arquivos (pasta do pacote => serial, sítio local)
+evitando cópias desnecessárias:
+- não copia arquivos idênticos (mesmo tamanho e mesmo hash)
+- usa reflink (copy-on-write) ou copy_file_range quando disponíveis
+- usa hard link quando permitido e origem e destino estão no mesmo
+  sistema de arquivos
+O destino é sempre gravado com nome temporário e substituído
+atomicamente, portanto nunca é alterado "in place", o que preserva
+arquivos que compartilham o mesmo inode
+"""
+import os
+import re
+import shutil
+import hashlib
+import logging
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+logger = logging.getLogger()
+
+# linux/fs.h: #define FICLONE _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+HEAD_SIZE = 64 * 1024
+DOCTYPE_SYSTEM_URL = re.compile(
+    br'(<!DOCTYPE\s[^>\[]*["\'])([^"\'>]+)(["\']\s*[>\[])')
+
+SKIPPED = 'skipped'
+LINKED = 'linked'
+CLONED = 'cloned'
+COPIED = 'copied'
+
+
+def file_hash(file_path):
+    h = hashlib.sha1()
+    with open(file_path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def same_content(src, dest):
+    """
+    Verifica se `dest` já tem o mesmo conteúdo de `src`
+    """
+    if not os.path.isfile(dest):
+        return False
+    try:
+        if os.path.samefile(src, dest):
+            return True
+    except OSError:
+        return False
+    if os.path.getsize(src) != os.path.getsize(dest):
+        return False
+    return file_hash(src) == file_hash(dest)
+
+
+def _temp_name(dest):
+    return '{}.{}-{}.tmp'.format(dest, os.getpid(), threading.get_ident())
+
+
+def _clone(src, tmp):
+    """
+    Tenta reflink (FICLONE) e depois copy_file_range.
+    Retorna True se conseguiu
+    """
+    with open(src, 'rb') as fsrc, open(tmp, 'wb') as fdst:
+        if fcntl is not None:
+            try:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+                return True
+            except OSError:
+                pass
+        if hasattr(os, 'copy_file_range'):
+            size = os.fstat(fsrc.fileno()).st_size
+            copied = 0
+            try:
+                while copied < size:
+                    n = os.copy_file_range(
+                        fsrc.fileno(), fdst.fileno(), size - copied)
+                    if n == 0:
+                        break
+                    copied += n
+            except OSError:
+                fdst.seek(0)
+                fdst.truncate()
+                return False
+            return copied == size
+    return False
+
+
+def publish_file(src, dest, allow_link=False):
+    """
+    Publica `src` em `dest` (caminho completo do arquivo)
+    allow_link: permite hard link, desde que `src` não seja alterado
+    posteriormente
+    Retorna SKIPPED, LINKED, CLONED ou COPIED
+    """
+    dirname = os.path.dirname(dest)
+    if dirname and not os.path.isdir(dirname):
+        os.makedirs(dirname)
+    if same_content(src, dest):
+        return SKIPPED
+
+    tmp = _temp_name(dest)
+    try:
+        if allow_link:
+            try:
+                os.link(src, tmp)
+                os.replace(tmp, dest)
+                return LINKED
+            except OSError:
+                if os.path.isfile(tmp):
+                    os.unlink(tmp)
+        if _clone(src, tmp):
+            shutil.copystat(src, tmp)
+            os.replace(tmp, dest)
+            return CLONED
+        shutil.copy2(src, tmp)
+        os.replace(tmp, dest)
+        return COPIED
+    finally:
+        if os.path.isfile(tmp):
+            os.unlink(tmp)
+
+
+def publish_xml_with_local_dtd(src, dest):
+    """
+    Publica o XML substituindo a URL da DTD pelo nome do arquivo da DTD,
+    sem carregar a árvore do XML: somente o início do arquivo é editado,
+    o restante é copiado em blocos
+    """
+    with open(src, 'rb') as fp:
+        head = fp.read(HEAD_SIZE)
+        match = DOCTYPE_SYSTEM_URL.search(head)
+        if match is None or b'/' not in match.group(2):
+            return publish_file(src, dest)
+
+        dirname = os.path.dirname(dest)
+        if dirname and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        dtd_file_name = match.group(2).rstrip(b'/').split(b'/')[-1]
+        tmp = _temp_name(dest)
+        try:
+            with open(tmp, 'wb') as out:
+                out.write(head[:match.start(2)])
+                out.write(dtd_file_name)
+                out.write(head[match.end(2):])
+                shutil.copyfileobj(fp, out, 1024 * 1024)
+            if same_content(tmp, dest):
+                return SKIPPED
+            os.replace(tmp, dest)
+            return COPIED
+        finally:
+            if os.path.isfile(tmp):
+                os.unlink(tmp)
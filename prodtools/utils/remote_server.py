@@ -1,6 +1,34 @@
 # coding=utf-8
+import os
+import re
+import shutil
 
-from prodtools.utils import system
+from prodtools.utils import commands
+
+
+TRANSFERRED_SIZE = re.compile(r'Total transferred file size: ([\d,.]+)')
+
+
+class SyncResult(object):
+
+    def __init__(self, returncode, transferred_bytes=0, output=''):
+        self.returncode = returncode
+        self.transferred_bytes = transferred_bytes
+        self.output = output
+
+    @property
+    def ok(self):
+        return self.returncode == 0
+
+
+def get_server(server, user, _logger=None):
+    """
+    `server` pode ser um caminho local (iniciado por /), usado no lugar
+    de um servidor remoto (testes, montagens de rede)
+    """
+    if server.startswith('/'):
+        return LocalServer(server)
+    return RemoteServer(server, user, _logger)
 
 
 class RemoteServer(object):
@@ -13,37 +41,113 @@ class RemoteServer(object):
         if ':' in server:
             self.server, self.port = server.split(':')
 
-    def run_cmd(self, cmd):
-        if self.logger is not None:
-            self.logger.info(cmd)
-        try:
-            system.run_command(cmd)
-            if self.logger is not None:
-                self.logger.info('done')
-        except:
-            if self.logger is not None:
-                self.logger.error('failure')
+    def sync_args(self, source, dest, files=None):
+        """
+        rsync do conteúdo de `source` para `dest`; a pasta de destino é
+        criada na mesma conexão (--rsync-path)
+        files: somente estes arquivos (caminhos relativos a `source`)
+        """
+        args = ['rsync', '-CrK', '--stats',
+                '--rsync-path', 'mkdir -p "{}" && rsync'.format(dest)]
+        if self.port is not None:
+            args.extend(['-e', 'ssh -p {}'.format(self.port)])
+        if files is not None:
+            args.append('--files-from=-')
+        args.extend([
+            source.rstrip('/') + '/',
+            '{}@{}:{}'.format(self.user, self.server, dest)])
+        return args
 
-    @property
-    def rsync_port_param(self):
-        return '' if self.port is None else ' -e "ssh -p {}" '.format(self.port)
+    def sync(self, source, dest, timeout=None, files=None):
+        """
+        files: {caminho relativo: trechos alterados}; o rsync transfere
+        somente os trechos diferentes de cada arquivo (delta)
+        """
+        files_from = None
+        if files is not None:
+            files_from = '\n'.join(sorted(files)).encode('utf-8')
+        result = commands.run(
+            self.sync_args(source, dest, files),
+            input=files_from, timeout=timeout)
+        if result.timed_out:
+            return SyncResult(-1, output='timeout: {}'.format(result.stderr))
+        output = result.output
+        transferred = 0
+        match = TRANSFERRED_SIZE.search(output)
+        if match:
+            transferred = int(re.sub(r'[,.]', '', match.group(1)))
+        return SyncResult(result.returncode, transferred, output)
 
-    @property
-    def scp_port_param(self):
-        return '' if self.port is None else ' -P {} '.format(self.port)
+    def __str__(self):
+        return self.server
 
-    @property
-    def ssh_port_param(self):
-        return '' if self.port is None else ' -p {} '.format(self.port)
 
-    def run_remote_mkdirs(self, path):
-        cmd = 'ssh ' + self.user + '@' + self.server + self.ssh_port_param + ' "mkdir -p ' + path + '"'
-        self.run_cmd(cmd)
+class LocalServer(object):
+    """
+    Destino local com a mesma interface de `RemoteServer.sync`:
+    `dest` é relativo à pasta `root`
+    """
 
-    def run_rsync(self, source, dest):
-        cmd = 'nohup rsync ' + self.rsync_port_param + '-CrvK ' + source + '/* ' + self.user + '@' + self.server + ':' + dest + '&\n'
-        self.run_cmd(cmd)
+    def __init__(self, root):
+        self.root = root
+        self.server = root
+
+    def sync(self, source, dest, timeout=None, files=None):
+        if not os.path.isdir(source):
+            return SyncResult(23, output='{} not found'.format(source))
+        target = os.path.join(self.root, dest.lstrip('/'))
+        if files is not None:
+            return self._sync_files(source, target, files)
+        transferred = 0
+        try:
+            for path, dirs, files in os.walk(source):
+                dest_path = os.path.join(
+                    target, os.path.relpath(path, source))
+                if not os.path.isdir(dest_path):
+                    os.makedirs(dest_path)
+                for name in files:
+                    src = os.path.join(path, name)
+                    dst = os.path.join(dest_path, name)
+                    src_stat = os.stat(src)
+                    if os.path.isfile(dst):
+                        dst_stat = os.stat(dst)
+                        if (dst_stat.st_size == src_stat.st_size and
+                                dst_stat.st_mtime >= src_stat.st_mtime):
+                            continue
+                    shutil.copy2(src, dst)
+                    transferred += src_stat.st_size
+        except (IOError, OSError) as e:
+            return SyncResult(1, transferred, str(e))
+        return SyncResult(0, transferred)
+
+    def _sync_files(self, source, target, files):
+        """
+        Copia os arquivos novos e, nos existentes, grava somente os
+        trechos (offset, length) alterados
+        """
+        transferred = 0
+        try:
+            for relpath, ranges in sorted(files.items()):
+                src = os.path.join(source, relpath)
+                dst = os.path.join(target, relpath)
+                if ranges is None or not os.path.isfile(dst):
+                    dirname = os.path.dirname(dst)
+                    if not os.path.isdir(dirname):
+                        os.makedirs(dirname)
+                    shutil.copy2(src, dst)
+                    transferred += os.path.getsize(src)
+                    continue
+                with open(src, 'rb') as fsrc, open(dst, 'r+b') as fdst:
+                    for offset, length in ranges:
+                        fsrc.seek(offset)
+                        fdst.seek(offset)
+                        fdst.write(fsrc.read(length))
+                        transferred += length
+                    fdst.truncate(os.fstat(fsrc.fileno()).st_size)
+                shutil.copystat(src, dst)
+        except (IOError, OSError) as e:
+            return SyncResult(1, transferred, str(e))
+        return SyncResult(0, transferred)
 
-    def run_scp(self, source, dest):
-        cmd = 'nohup scp ' + self.scp_port_param + '-r ' + source + ' ' + self.user + '@' + self.server + ':' + dest + '&\n'
-        self.run_cmd(cmd)
+    def __str__(self):
+        return self.root
@@ -0,0 +1,102 @@
+# coding=utf-8
+"""
+Tempo de importação dos pontos de entrada (xc, xpm, xml_pubmed, xc_server)
+
+Cada módulo é importado em um novo processo (`python -X importtime`) e
+são apresentados o tempo total e os módulos mais lentos (tempo acumulado).
+
+    python -m prodtools.utils.startup_profile [--top N] [módulo ...]
+"""
+import sys
+import argparse
+import subprocess
+
+
+ENTRY_POINTS = (
+    'prodtools.xc',
+    'prodtools.xpm',
+    'prodtools.xml_pubmed',
+    'prodtools.xc_server',
+)
+TOP = 20
+
+
+class ImportTime(object):
+
+    def __init__(self, name, self_time, cumulative, level):
+        self.name = name
+        self.self_time = self_time
+        self.cumulative = cumulative
+        self.level = level
+
+
+def parse_importtime(output):
+    """
+    Retorna os itens (ImportTime) da saída de `python -X importtime`
+    Os tempos são em microssegundos
+    """
+    items = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        level = (len(name) - len(name.lstrip())) // 2
+        items.append(
+            ImportTime(
+                name.strip(), int(parts[0]), int(parts[1]), level))
+    return items
+
+
+def import_times(module_name, python=None):
+    """
+    Importa `module_name` em um novo processo e retorna os itens
+    (ImportTime) e o tempo total, em microssegundos
+    """
+    process = subprocess.run(
+        [python or sys.executable, '-X', 'importtime',
+         '-c', 'import ' + module_name],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True)
+    if process.returncode != 0:
+        raise ImportError(
+            'Unable to import {}: {}'.format(module_name, process.stderr))
+    items = parse_importtime(process.stderr)
+    total = 0
+    for item in items:
+        if item.name == module_name:
+            total = item.cumulative
+    return items, total
+
+
+def report(module_name, items, total, top=TOP):
+    lines = ['{}: {:.1f} ms'.format(module_name, total / 1000.0)]
+    slowest = sorted(items, key=lambda item: item.cumulative, reverse=True)
+    for item in slowest[:top]:
+        lines.append(
+            '  {:>9.1f} ms {:>9.1f} ms  {}{}'.format(
+                item.cumulative / 1000.0, item.self_time / 1000.0,
+                '  ' * item.level, item.name))
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Import time of prodtools entry points')
+    parser.add_argument(
+        'modules', nargs='*', default=list(ENTRY_POINTS),
+        help='modules to import (default: all entry points)')
+    parser.add_argument(
+        '--top', type=int, default=TOP,
+        help='number of slowest imports to display')
+    args = parser.parse_args()
+    for module_name in args.modules:
+        items, total = import_times(module_name)
+        print(report(module_name, items, total, args.top))
+        print('')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,77 +1,301 @@
 # coding = utf-8
 
 import os
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from time import time
+from concurrent.futures import ThreadPoolExecutor
+
 try:
     from PIL import Image
 except:
     Image = None
-from prodtools.utils import system
 from prodtools.utils import encoding
+from prodtools.utils import commands
+from prodtools.utils import tracing
 
 
-#inkscape PATH/teste.svg --export-background=COLOR --export-area-drawing --export-area-snap --export-dpi=300 --export-png=PATH/leave2.png
-def command():
+logger = logging.getLogger()
+
+INKSCAPE_PATH = 'inkscape'
+MAX_WORKERS = 4
+SVG2PNG_TIMEOUT = 120
+# tamanho máximo do cache; ao ultrapassá-lo, são removidos os arquivos
+# usados há mais tempo
+CACHE_MAX_SIZE = 500 * 1024 * 1024
+
+
+def default_cache_path():
+    """
+    Cache do usuário (não compartilhado com outros usuários)
     """
-    Executa se instalado
+    base = (
+        os.environ.get('LOCALAPPDATA') if os.name == 'nt' else
+        os.environ.get('XDG_CACHE_HOME'))
+    if not base:
+        base = os.path.join(os.path.expanduser('~'), '.cache')
+    if base == os.path.join('~', '.cache'):
+        # sem diretório do usuário
+        base = os.path.join(tempfile.gettempdir(), 'prodtools_cache')
+    return os.path.join(base, 'prodtools', 'img_cache')
+
+
+def is_private_dir(path):
+    """
+    Verifica se `path` pertence ao usuário e não pode ser lido ou gravado
+    por outros (no Windows, o diretório do usuário já é privado)
     """
-    INKSCAPE_PATH = 'inkscape'
-    commands_parts = [
+    if os.path.islink(path) or not os.path.isdir(path):
+        return False
+    if os.name == 'nt':
+        return True
+    st = os.stat(path)
+    return st.st_uid == os.getuid() and not st.st_mode & 0o077
+
+
+#inkscape PATH/teste.svg --export-background=COLOR --export-area-drawing --export-area-snap --export-dpi=300 --export-png=PATH/leave2.png
+def command_args(src, dest):
+    return [
         INKSCAPE_PATH,
-        '"{}"',
+        src,
         '--export-background=COLOR',
         '--export-area-drawing',
         '--export-area-snap',
         '--export-dpi=300',
-        '--export-png="{}"'
+        '--export-png={}'.format(dest),
     ]
-    return ' '.join(commands_parts)
 
 
-def svg2png(image_path, force=False):
-    svg_files = [svg for svg in os.listdir(image_path) if svg.endswith('.svg')]
+def is_inkscape_installed():
+    return shutil.which(INKSCAPE_PATH) is not None
 
-    if len(svg_files) == 0:
-        encoding.display_message('\n'.join(sorted(os.listdir(image_path))))
-        encoding.display_message('Nenhum arquivo .svg')
-        return
 
-    comm = command()
-    new_files = []
-    for svg_file in svg_files:
-        name, ext = os.path.splitext(svg_file)
-        src = os.path.join(image_path, svg_file)
-        dest = os.path.join(image_path, name + '.png')
+def file_hash(filename):
+    h = hashlib.sha1()
+    with open(filename, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(65536), b''):
+            h.update(chunk)
+    return h.hexdigest()
 
-        if force is True or not os.path.isfile(dest):
+
+class ConversionStats(object):
+
+    def __init__(self):
+        self.converted = 0
+        self.cached = 0
+        self.failed = 0
+        self.elapsed = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    @property
+    def throughput(self):
+        if self.elapsed > 0:
+            return (self.converted + self.cached) / self.elapsed
+        return 0.0
+
+    def __str__(self):
+        return (
+            '{} converted, {} from cache, {} failed in {:.2f}s '
+            '({:.2f} files/s)'.format(
+                self.converted, self.cached, self.failed,
+                self.elapsed, self.throughput))
+
+
+class ImageConverter(object):
+    """
+    Converte SVG => PNG (inkscape) e PNG => TIFF (PIL) em paralelo,
+    reaproveitando conversões anteriores pelo hash do conteúdo de origem
+    """
+
+    def __init__(self, max_workers=None, cache_path=None,
+                 svg2png_timeout=None, cache_max_size=None):
+        self.max_workers = max_workers or MAX_WORKERS
+        self.cache_path = cache_path or default_cache_path()
+        self.cache_max_size = cache_max_size or CACHE_MAX_SIZE
+        self.svg2png_timeout = svg2png_timeout or SVG2PNG_TIMEOUT
+        self.stats = ConversionStats()
+        self._cache_enabled = None
+
+    @property
+    def cache_enabled(self):
+        """
+        Cria o cache (modo 0700); se ele já existe, só é usado se for
+        privado do usuário
+        """
+        if self._cache_enabled is None:
             try:
-                encoding.display_message(src + ' => ' + dest)
-                system.run_command(comm.format(src, dest))
-                if os.path.isfile(dest):
-                    new_files.append((src, dest))
-                encoding.display_message(src + ' => ' + dest)
-            except:
-                encoding.display_message('Unable to run inkscape')
-    return new_files
-
-
-def png2tiff(image_path, force=False):
-    png_files = [png for png in os.listdir(image_path) if png.endswith('.png')]
-    if len(png_files) == 0:
-        encoding.display_message('\n'.join(sorted(os.listdir(image_path))))
-        encoding.display_message('Nenhum arquivo .png')
-        return
-    new_files = []
-    for png_file in png_files:
-        name, ext = os.path.splitext(png_file)
-        src = os.path.join(image_path, png_file)
-        dest = os.path.join(image_path, name + '.tif')
-        if force is True or not os.path.isfile(dest):
+                if not os.path.isdir(self.cache_path):
+                    os.makedirs(self.cache_path, 0o700)
+                self._cache_enabled = is_private_dir(self.cache_path)
+            except (IOError, OSError):
+                self._cache_enabled = False
+            if not self._cache_enabled:
+                logger.warning(
+                    'Image conversion cache disabled: %s is not a private '
+                    'directory', self.cache_path)
+        return self._cache_enabled
+
+    def _cached_filename(self, src, ext):
+        if not self.cache_enabled:
+            return None
+        try:
+            return os.path.join(self.cache_path, file_hash(src) + ext)
+        except (IOError, OSError):
+            return None
+
+    def _get_from_cache(self, cached, dest):
+        if cached and os.path.isfile(cached):
+            try:
+                shutil.copyfile(cached, dest)
+                # registra o uso, para a remoção dos menos usados
+                os.utime(cached)
+                return True
+            except (IOError, OSError):
+                return False
+        return False
+
+    def _add_to_cache(self, cached, dest):
+        if not cached:
+            return
+        try:
+            tmp = cached + '.{}.{}.tmp'.format(
+                os.getpid(), threading.get_ident())
+            shutil.copyfile(dest, tmp)
+            os.replace(tmp, cached)
+        except (IOError, OSError) as e:
+            logger.debug('Unable to cache %s: %s', dest, e)
+
+    def prune_cache(self):
+        """
+        Remove os arquivos usados há mais tempo até que o cache tenha no
+        máximo `cache_max_size` bytes
+        """
+        if not self.cache_enabled:
+            return
+        items = []
+        for name in os.listdir(self.cache_path):
+            file_path = os.path.join(self.cache_path, name)
             try:
-                encoding.display_message(src + ' => ' + dest)
-                Image.open(src).save(dest, "TIFF")
-                if os.path.isfile(dest):
-                    new_files.append((src, dest))
-                encoding.display_message(src + ' => ' + dest)
-            except IOError as e:
-                encoding.report_exception('svg_conversion.png2tiff()', e, ("cannot convert", src, dest))
-    return new_files
+                st = os.stat(file_path)
+            except OSError:
+                continue
+            items.append((st.st_mtime, st.st_size, file_path))
+        total = sum(size for mtime, size, file_path in items)
+        for mtime, size, file_path in sorted(items):
+            if total <= self.cache_max_size:
+                break
+            try:
+                os.unlink(file_path)
+            except OSError:
+                continue
+            total -= size
+
+    def _run_svg2png(self, src, dest):
+        result = commands.run(
+            command_args(src, dest), timeout=self.svg2png_timeout)
+        if result.timed_out:
+            encoding.display_message(
+                'Timeout ({}s): {}'.format(self.svg2png_timeout, src))
+            if os.path.isfile(dest):
+                os.unlink(dest)
+        elif not result.ok:
+            encoding.display_message(
+                'Unable to convert {}: {}'.format(
+                    src, result.stderr.strip()[-200:]))
+
+    def _run_png2tiff(self, src, dest):
+        try:
+            Image.open(src).save(dest, "TIFF")
+        except IOError as e:
+            encoding.report_exception(
+                'svg_conversion.png2tiff()', e, ("cannot convert", src, dest))
+
+    def _convert_item(self, convert, ext, src, dest):
+        encoding.display_message(src + ' => ' + dest)
+        cached = self._cached_filename(src, ext)
+        if self._get_from_cache(cached, dest):
+            self.stats.add('cached')
+            return src, dest
+        convert(src, dest)
+        if os.path.isfile(dest):
+            self._add_to_cache(cached, dest)
+            self.stats.add('converted')
+            return src, dest
+        self.stats.add('failed')
+
+    def _convert(self, convert, items, ext):
+        new_files = []
+        start = time()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                (src, executor.submit(
+                    tracing.bind(self._convert_item), convert, ext, src,
+                    dest))
+                for src, dest in items]
+            for src, future in futures:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    self.stats.add('failed')
+                    encoding.report_exception(
+                        'svg_conversion.ImageConverter', e, src)
+                    continue
+                if result:
+                    new_files.append(result)
+        self.prune_cache()
+        self.stats.elapsed += time() - start
+        logger.info('Image conversion: %s', self.stats)
+        return new_files
+
+    def svg2png(self, image_path, force=False):
+        svg_files = [svg for svg in os.listdir(image_path) if svg.endswith('.svg')]
+
+        if len(svg_files) == 0:
+            encoding.display_message('\n'.join(sorted(os.listdir(image_path))))
+            encoding.display_message('Nenhum arquivo .svg')
+            return
+
+        if not is_inkscape_installed():
+            encoding.display_message('Unable to run inkscape')
+            return []
+        items = selected_items(image_path, svg_files, '.png', force)
+        return self._convert(self._run_svg2png, items, '.png')
+
+    def png2tiff(self, image_path, force=False):
+        png_files = [png for png in os.listdir(image_path) if png.endswith('.png')]
+        if len(png_files) == 0:
+            encoding.display_message('\n'.join(sorted(os.listdir(image_path))))
+            encoding.display_message('Nenhum arquivo .png')
+            return
+
+        if Image is None:
+            encoding.display_message('Unable to convert png to tiff: missing PIL')
+            return []
+        items = selected_items(image_path, png_files, '.tif', force)
+        return self._convert(self._run_png2tiff, items, '.tif')
+
+
+def selected_items(image_path, files, new_ext, force=False):
+    items = []
+    for filename in files:
+        name, ext = os.path.splitext(filename)
+        src = os.path.join(image_path, filename)
+        dest = os.path.join(image_path, name + new_ext)
+        if force is True or not os.path.isfile(dest):
+            items.append((src, dest))
+    return items
+
+
+def svg2png(image_path, force=False, converter=None):
+    return (converter or ImageConverter()).svg2png(image_path, force)
+
+
+def png2tiff(image_path, force=False, converter=None):
+    return (converter or ImageConverter()).png2tiff(image_path, force)
@@ -0,0 +1,223 @@
+# coding=utf-8
+"""
+Rastreamento das etapas do processamento de um pacote (spans)
+
+    with tracing.Trace('convert_package', file_path, package=name):
+        with tracing.span('validate_document', document=xml_name):
+            ...
+
+    @tracing.traced()
+    def convert(self):
+        ...
+
+Ao sair de `Trace`, os spans registrados na thread são gravados em
+`file_path` no formato Chrome trace (JSON), que pode ser aberto em
+chrome://tracing ou https://ui.perfetto.dev, sem depender de coletor.
+Spans aninhados são identificados pelo intervalo de tempo na mesma thread.
+Sem `Trace` ativo, `span` e `traced` não registram nada.
+"""
+import os
+import json
+import time
+import logging
+import functools
+import threading
+from datetime import datetime
+
+
+logger = logging.getLogger()
+
+_local = threading.local()
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def current():
+    """
+    Trace ativo na thread
+    """
+    stack = _stack()
+    return stack[-1] if stack else None
+
+
+class Trace(object):
+    """
+    Registra os spans de um pacote e, ao final, os grava em `file_path`
+    """
+
+    def __init__(self, name, file_path=None, **attributes):
+        self.name = name
+        self.file_path = file_path
+        self.attributes = attributes
+        self.events = []
+        # estatísticas agregadas do pacote (ex.: comandos externos)
+        self.stats = {}
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._root = None
+
+    def timestamp(self):
+        # microssegundos desde o início do trace
+        return int((time.perf_counter() - self._start) * 1000000)
+
+    def add(self, name, start, end, attributes):
+        event = {
+            'name': name,
+            'cat': self.name,
+            'ph': 'X',
+            'ts': start,
+            'dur': end - start,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': attributes,
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def activate(self):
+        _stack().append(self)
+
+    def deactivate(self):
+        _stack().pop()
+
+    def __enter__(self):
+        self.activate()
+        self._root = Span(self.name, **self.attributes)
+        self._root.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self._root.__exit__(exc_type, exc_value, tb)
+        self.deactivate()
+        if self.file_path:
+            self.save()
+        return False
+
+    def as_dict(self):
+        with self._lock:
+            events = sorted(self.events, key=lambda e: (e['ts'], -e['dur']))
+            stats = dict(self.stats)
+        other_data = {
+            'name': self.name,
+            'date': datetime.now().isoformat(),
+        }
+        other_data.update(
+            {key: value.as_dict() for key, value in stats.items()})
+        return {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': other_data,
+        }
+
+    def get_stats(self, key, factory):
+        with self._lock:
+            if key not in self.stats:
+                self.stats[key] = factory()
+            return self.stats[key]
+
+    def save(self):
+        # o rastreamento nunca deve interromper o processamento
+        try:
+            dirname = os.path.dirname(self.file_path)
+            if dirname and not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            with open(self.file_path, 'w') as fp:
+                json.dump(self.as_dict(), fp, default=str)
+        except (IOError, OSError, TypeError, ValueError):
+            logger.exception("Unable to save trace %s", self.file_path)
+
+
+def span(name, **attributes):
+    """
+    Registra um intervalo (`with span(nome, atributo=valor)`) no trace ativo
+    Atributos podem ser acrescentados durante o span com `set`
+    """
+    return Span(name, **attributes)
+
+
+class Span(object):
+
+    def __init__(self, name, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self.trace = None
+        self.start = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        self.trace = current()
+        if self.trace is not None:
+            self.start = self.trace.timestamp()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        if self.trace is not None:
+            if exc_type is not None:
+                self.attributes['error'] = exc_type.__name__
+            self.trace.add(
+                self.name, self.start, self.trace.timestamp(),
+                self.attributes)
+        return False
+
+
+def traced(name=None, **attributes):
+    """
+    Decorador: executa a função dentro de um span
+    (o nome padrão é o nome qualificado da função)
+    """
+    def decorator(function):
+        span_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if current() is None:
+                return function(*args, **kwargs)
+            with Span(span_name, **dict(attributes)):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def stats(key, factory):
+    """
+    Estatísticas `key` do trace ativo, criadas por `factory` no primeiro
+    uso (o objeto deve ter `as_dict`); sem trace ativo, retorna None
+    """
+    trace = current()
+    if trace is None:
+        return None
+    return trace.get_stats(key, factory)
+
+
+def bind(function):
+    """
+    Retorna `function` associada ao trace ativo, para ser executada em
+    outra thread (ThreadPoolExecutor)
+    """
+    trace = current()
+    if trace is None:
+        return function
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        trace.activate()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            trace.deactivate()
+    return wrapper
+
+
+def trace_file_path(trace_path, package_name):
+    """
+    Arquivo do trace de um pacote em `trace_path`
+    """
+    return os.path.join(
+        trace_path, '{}_{}.trace.json'.format(
+            package_name, datetime.now().strftime('%Y%m%d_%H%M%S_%f')))
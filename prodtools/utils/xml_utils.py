@@ -1,7 +1,8 @@
 # coding=utf-8
 import os
 import html
-from io import StringIO
+import threading
+from io import StringIO, BytesIO
 
 from lxml import etree
 
@@ -262,14 +263,32 @@ def get_xml_object(file_path, xml_parser=None):
     return etree.parse(file_path, parser)
 
 
+_xslt_cache = threading.local()
+
+
+def get_xslt(xsl_file_path):
+    """
+    Retorna a XSL compilada, reaproveitando a compilação anterior enquanto
+    o arquivo não for modificado. O cache é por thread, pois os objetos
+    XSLT não devem ser compartilhados entre threads
+    """
+    cache = getattr(_xslt_cache, "items", None)
+    if cache is None:
+        cache = _xslt_cache.items = {}
+    mtime = os.path.getmtime(xsl_file_path)
+    cached = cache.get(xsl_file_path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, etree.XSLT(etree.parse(xsl_file_path)))
+        cache[xsl_file_path] = cached
+    return cached[1]
+
+
 def transform(xml_obj, xsl_file_path):
     """
     Aplica uma XSL dada pelo arquivo em uma árvore de XML
     O resutado é um `lxml.etree._XSLTResultTree`
     """
-    xslt_doc = etree.parse(xsl_file_path)
-    XSLT = etree.XSLT(xslt_doc)
-    return XSLT(xml_obj)
+    return get_xslt(xsl_file_path)(xml_obj)
 
 
 def validate(xml_obj, dtd_external_id=None, dtd_file_path=None):
@@ -320,17 +339,42 @@ def write(file_path, tree):
     """
     name, ext = os.path.splitext(file_path)
     if ext == ".xml":
-        tree.write(
-            file_path,
-            encoding="utf-8",
-            xml_declaration='<?xml version="1.0" encoding="utf-8"?>',
-            inclusive_ns_prefixes=list(namespaces.keys()),
-            pretty_print=True
-        )
+        _write_xml(file_path, tree)
         return
     tree.write(file_path, method="html", pretty_print=True)
 
 
+def _write_xml(file_or_path, tree):
+    tree.write(
+        file_or_path,
+        encoding="utf-8",
+        xml_declaration='<?xml version="1.0" encoding="utf-8"?>',
+        inclusive_ns_prefixes=list(namespaces.keys()),
+        pretty_print=True
+    )
+
+
+def xml_bytes(tree):
+    """
+    Retorna os bytes que `write` gravaria em um arquivo .xml,
+    sem gravá-lo
+    """
+    bio = BytesIO()
+    _write_xml(bio, tree)
+    return bio.getvalue()
+
+
+def parse_bytes(content, xml_parser=None):
+    """
+    Equivalente a `get_xml_object`, mas a partir de bytes em memória.
+    Os números de linha são os mesmos que os do arquivo gravado
+    """
+    parser = xml_parser
+    if parser is None:
+        parser = etree.XMLParser(remove_blank_text=True)
+    return etree.parse(BytesIO(content), parser)
+
+
 def insert_namespaces_in_root(root_elem_name, content):
     root_start = "<" + root_elem_name
     p_root = content.find(root_start)
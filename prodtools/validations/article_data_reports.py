@@ -11,6 +11,7 @@ from prodtools.reports import validation_status
 from prodtools.data import article_utils
 from prodtools.data import attributes
 from prodtools.data.article import PersonAuthor, CorpAuthor
+from . import validations as validations_module
 
 
 logger = logging.getLogger()
@@ -618,7 +619,7 @@ class ArticleValidationReport(object):
     def display_item(self, item):
         return html_reports.p_message(item, False)
 
-    def validations(self, display_all_message_types):
+    def validation_items(self, display_all_message_types):
         items, performance = self.article_validation.validations
         items = [item for item in items if item is not None]
         new_items = []
@@ -632,7 +633,27 @@ class ArticleValidationReport(object):
                 new_items.append((label, status, msg, xml))
             elif status != validation_status.STATUS_OK:
                 new_items.append((label, status, msg, xml))
-        items = new_items
+        return new_items
+
+    def result_items(self, display_all_message_types=False):
+        """
+        Resultados das validações (validations.result_item), incluindo os
+        das referências
+        """
+        items = [
+            validations_module.result_item(*item)
+            for item in self.validation_items(display_all_message_types)
+        ]
+        for ref, ref_result in self.article_validation.references:
+            for res in ref_result:
+                res = list(res) + [''] * (4 - len(res))
+                if display_all_message_types or res[1] != validation_status.STATUS_OK:
+                    items.append(validations_module.result_item(
+                        res[0], res[1], res[2], res[3], ref.id))
+        return items
+
+    def validations(self, display_all_message_types):
+        items = self.validation_items(display_all_message_types)
 
         r = validations_table(items)
 
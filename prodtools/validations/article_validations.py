@@ -5,6 +5,7 @@ import os
 from prodtools import _
 from prodtools.utils import fs_utils
 from prodtools.utils import encoding
+from prodtools.utils import tracing
 from prodtools.reports import html_reports
 from prodtools.reports import validation_status
 from prodtools.validations import sps_xml_validators
@@ -201,6 +202,10 @@ class XMLContentValidator(object):
 
         if article.tree is None:
             content = validation_status.STATUS_BLOCKING_ERROR + ': ' + _('Unable to get data from {item}. ').format(item=article.new_prefix)
+            items = [validations_module.result_item(
+                'xml', validation_status.STATUS_BLOCKING_ERROR,
+                _('Unable to get data from {item}. ').format(
+                    item=article.new_prefix))]
         else:
             content_validation = article_content_validations.ArticleContentValidation(self.pkgissuedata.journal, article, pkgfiles, (self.registered_issue_data.articles_db_manager is not None), False, self.doi_validator, self.config)
             article_display_report = article_data_reports.ArticleDisplayReport(content_validation)
@@ -234,8 +239,10 @@ class XMLContentValidator(object):
                 content.append(r)
                 content.append(article_display_report.files_and_href())
             content = ''.join(content)
+            items = article_validation_report.result_items()
         r = validations_module.ValidationsResult()
         r.message = content
+        r.items = items
         return r, article_display_report
 
 
@@ -257,9 +264,10 @@ class PackageValidator(object):
         results = {}
         for name in sorted(self.pkg.articles.keys()):
             encoding.display_message(_('Validate {name}').format(name=name))
-            results[name] = self.validate_package_item(
-                self.pkg.articles[name], self.pkg.files[name],
-                self.pkg.outputs[name])
+            with tracing.span('validate_document', document=name):
+                results[name] = self.validate_package_item(
+                    self.pkg.articles[name], self.pkg.files[name],
+                    self.pkg.outputs[name])
         return results
 
     def validate_package_item(self, article, pkgfiles, outputs):
@@ -271,12 +279,17 @@ class PackageValidator(object):
         artval = ArticleValidations()
         artval.journal_validations = self.xml_journal_data_validator.validate(article)
         artval.issue_validations = self.xml_issue_data_validator.validate(article)
-        artval.xml_structure_validations = xml_structure_validator.validate(pkgfiles.filename, outputs)
-        artval.xml_content_validations, artval.article_display_report = self.xml_content_validator.validate(article, outputs, pkgfiles)
+        with tracing.span('structure_validations'):
+            artval.xml_structure_validations = xml_structure_validator.validate(pkgfiles.filename, outputs)
+        with tracing.span('content_validations'):
+            artval.xml_content_validations, artval.article_display_report = self.xml_content_validator.validate(article, outputs, pkgfiles)
         if self.xml_content_validator.is_xml_generation:
             stats = artval.xml_content_validations.statistics_display(False)
             title = [_('Data Quality Control'), article.new_prefix]
             fs_utils.write_file(outputs.data_report_filename, html_reports.html(title, stats + artval.xml_content_validations.message))
+        validations_module.write_json(
+            outputs.validations_json_filename,
+            dict(artval.as_dict(), document=article.new_prefix))
         return artval
 
 
@@ -296,6 +309,22 @@ class ArticleValidations(object):
     def blocking_errors(self):
         return sum([item.blocking_errors for item in [self.xml_structure_validations, self.xml_content_validations]])
 
+    def as_dict(self):
+        """
+        Resultados estruturados das validações do documento
+        """
+        groups = (
+            ('journal', self.journal_validations),
+            ('issue', self.issue_validations),
+            ('structure', self.xml_structure_validations),
+            ('content', self.xml_content_validations),
+        )
+        return {
+            name: validations.as_dict()
+            for name, validations in groups
+            if validations is not None
+        }
+
     def hide_and_show_block(self, report_id, new_name):
         blocks = []
         block_parent_id = report_id + new_name
@@ -1,5 +1,6 @@
 # coding=utf-8
 from prodtools import _
+from prodtools.utils import tracing
 from prodtools.reports import html_reports
 from prodtools.reports import validation_status
 from . import article_data_reports
@@ -19,15 +20,19 @@ class PackageEvaluator(object):
         self.is_xml_generation = is_xml_generation
         self.is_db_generation = is_db_generation
 
-        self.merging_reports = DocsMergingReports(
-            pkg, registered_issue_data, is_db_generation)
+        with tracing.span('docs_merging'):
+            self.merging_reports = DocsMergingReports(
+                pkg, registered_issue_data, is_db_generation)
 
-        self.group_coherence_reports = GroupCoherenceReports(
-            self.merging_reports.docs_merger.merged_articles, is_db_generation)
+        with tracing.span('group_coherence'):
+            self.group_coherence_reports = GroupCoherenceReports(
+                self.merging_reports.docs_merger.merged_articles,
+                is_db_generation)
 
-        self.pkg_validations_reports = PkgArticlesValidationsReports(
-            pkg, registered_issue_data, is_db_generation,
-            is_xml_generation, config)
+        with tracing.span('articles_validations'):
+            self.pkg_validations_reports = PkgArticlesValidationsReports(
+                pkg, registered_issue_data, is_db_generation,
+                is_xml_generation, config)
 
         self.blocking_errors = sum(
             [self.validations.blocking_errors,
@@ -70,6 +75,7 @@ class PackageEvaluator(object):
             r += self.registered_issue_data.issue_error_msg or ''
         return r
 
+    @tracing.traced()
     def evaluate(self):
         return PackageEvaluationResult(
             group_validations_report=self.group_validations_report,
@@ -77,7 +83,11 @@ class PackageEvaluator(object):
             xml_file_paths=self.xml_file_paths,
             blocking_errors=self.blocking_errors,
             merging_result_reports=self.merging_reports.errors_reports,
-            docs_merger=self.merging_reports.docs_merger
+            docs_merger=self.merging_reports.docs_merger,
+            documents_validations={
+                name: validations.as_dict()
+                for name, validations in self.pkg_validations_reports.pkg_articles_validations.items()
+            },
         )
 
 
@@ -85,7 +95,8 @@ class PackageEvaluationResult(object):
 
     def __init__(self, group_validations_report, individual_validations_report,
                  xml_file_paths,
-                 blocking_errors, merging_result_reports, docs_merger
+                 blocking_errors, merging_result_reports, docs_merger,
+                 documents_validations=None
                  ):
         self.group_validations_report = group_validations_report
         self.individual_validations_report = individual_validations_report
@@ -98,6 +109,8 @@ class PackageEvaluationResult(object):
         self.registered_articles = docs_merger.registered_articles
         self.accepted_xml_files = [xml_file_paths[k]
                                    for k in self.accepted_articles.keys()]
+        # {xml_name: ArticleValidations.as_dict()}
+        self.documents_validations = documents_validations or {}
 
 
 class DocsMergingReports(object):
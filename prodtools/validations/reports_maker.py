@@ -1,11 +1,14 @@
 # coding=utf-8
 import os
+import re
 import shutil
+from io import StringIO
 from datetime import datetime
 
 from prodtools import _
 from prodtools.utils import utils
 from prodtools.utils import encoding
+from prodtools.utils import tracing
 from prodtools.reports import html_reports
 from prodtools.reports import validation_status
 from prodtools.db.serial import IssuePathsInSerial, IssuePathsInWebsite
@@ -141,33 +144,74 @@ class ReportsMaker(object):
             self.assets_in_report.report_path,
             self.stage + self.report_version + '.html')
 
+    @property
+    def report_json_location(self):
+        return os.path.splitext(self.report_location)[0] + '.json'
+
+    def results_as_dict(self):
+        """
+        Resultados das validações do pacote e de seus documentos
+        """
+        data = {
+            'stage': self.stage,
+            'package': self.pkg.package_folder.name,
+            'date': datetime.now().isoformat()[:19],
+            'summary': self.validations.summary,
+            'blocking_errors': self.pkg_eval_result.blocking_errors,
+            'documents': self.pkg_eval_result.documents_validations,
+        }
+        if self.conversion is not None:
+            data['conversion'] = self.conversion.xc_status
+        return data
+
     @property
     def report_link(self):
         return os.path.join(
             self.assets_in_report.report_link,
             os.path.basename(self.report_location))
 
+    @tracing.traced()
     def save_report(self, display=True):
-        html_reports.save(
-            self.report_location, self.report_title, self.content, self.stage)
+        components = self.report_components
+        has_math = any(
+            html_reports.has_math_content(c) for c in components.values())
+        with html_reports.open_report(
+                self.report_location, self.report_title, has_math,
+                self.path_replacements) as writer:
+            self.write_content(writer, components)
+        validations_module.write_json(
+            self.report_json_location, self.results_as_dict())
         if display is True:
             html_reports.display_report(self.report_location)
         msg = _('Saved report: {f}').format(f=self.report_location)
         encoding.display_message(msg)
 
     @property
-    def content(self):
-        tabbed_report = html_reports.TabbedReport(self.labels, self.tabs, self.report_components, self.tab)
-        content = tabbed_report.report_content
+    def path_replacements(self):
         origin = ['{IMG_PATH}', '{PDF_PATH}', '{XML_PATH}', '{RES_PATH}', '{REP_PATH}']
         replac = [self.assets_in_report.img_link,
                   self.assets_in_report.pdf_link,
                   self.assets_in_report.xml_link,
                   self.assets_in_report.result_path,
                   self.assets_in_report.report_path]
-        for o, r in zip(origin, replac):
-            content = content.replace(o, r or '')
-        return content + self.footnote
+        return list(zip(origin, replac))
+
+    def write_content(self, writer, components=None):
+        """
+        Grava as abas do relatório em `writer` (html_reports.HTMLWriter)
+        """
+        if components is None:
+            components = self.report_components
+        tabbed_report = html_reports.TabbedReport(self.labels, self.tabs, components, self.tab)
+        tabbed_report.write(writer)
+        writer.write(self.footnote)
+
+    @property
+    def content(self):
+        output = StringIO()
+        self.write_content(
+            html_reports.HTMLWriter(output, self.path_replacements))
+        return output.getvalue()
 
     @property
     def processing_result_location(self):
@@ -187,27 +231,33 @@ def error_msg_subtitle():
     return html_reports.tag('div', msg, 'subtitle')
 
 
+ERROR_LABELS = (
+    (validation_status.STATUS_BLOCKING_ERROR, 'B'),
+    (validation_status.STATUS_FATAL_ERROR, 'F'),
+    (validation_status.STATUS_ERROR, 'E'),
+    (validation_status.STATUS_WARNING, 'W'),
+)
+ERROR_LABELS_PATTERN = re.compile(
+    '|'.join(re.escape(error_type) for error_type, prefix in ERROR_LABELS))
+
+
 def label_errors(content):
+    """
+    Numera as ocorrências de cada tipo de erro (ex.: [ERROR] [E1]),
+    percorrendo `content` uma única vez
+    """
     if content is None:
-        content = ''
-    else:
-        content = label_errors_type(content, validation_status.STATUS_BLOCKING_ERROR, 'B')
-        content = label_errors_type(content, validation_status.STATUS_FATAL_ERROR, 'F')
-        content = label_errors_type(content, validation_status.STATUS_ERROR, 'E')
-        content = label_errors_type(content, validation_status.STATUS_WARNING, 'W')
-    return content
+        return ''
+    prefixes = dict(ERROR_LABELS)
+    counters = {}
 
+    def numbered(match):
+        error_type = match.group(0)
+        counters[error_type] = counters.get(error_type, 0) + 1
+        return '{} [{}{}]'.format(
+            error_type, prefixes[error_type], counters[error_type])
 
-def label_errors_type(content, error_type, prefix):
-    new = []
-    i = 0
-    content = content.replace(error_type, '~BREAK~' + error_type)
-    for part in content.split('~BREAK~'):
-        if part.startswith(error_type):
-            i += 1
-            part = part.replace(error_type, error_type + ' [' + prefix + str(i) + ']')
-        new.append(part)
-    return ''.join(new)
+    return ERROR_LABELS_PATTERN.sub(numbered, content)
 
 
 def articles_sorted_by_order(articles):
@@ -329,6 +379,9 @@ class CollectionAssetsInReport(object):
         if not os.path.isdir(self.serial_report_path):
             os.makedirs(self.serial_report_path)
         shutil.copy(report_file_path, self.serial_report_path)
+        json_file_path = os.path.splitext(report_file_path)[0] + '.json'
+        if os.path.isfile(json_file_path):
+            shutil.copy(json_file_path, self.serial_report_path)
 
         if self.web_url:
             # se há o site remoto, os xml não estão acessíveis mesmo
@@ -1,6 +1,7 @@
 # coding=utf-8
 import os
 import logging
+import importlib.util
 from datetime import datetime
 
 from prodtools import _
@@ -11,16 +12,36 @@ from prodtools.reports import validation_status
 from prodtools.processing import xml_versions
 
 
-IS_PACKTOOLS_INSTALLED = False
-try:
-    import packtools
-    from packtools import exceptions
-    from packtools.catalogs import XML_CATALOG
-    os.environ['XML_CATALOG_FILES'] = XML_CATALOG
-    IS_PACKTOOLS_INSTALLED = True
-except Exception as e:
-    print(e)
-    os.environ['XML_CATALOG_FILES'] = ''
+def packtools_catalog():
+    """
+    Catálogo XML do packtools, localizado sem importar o pacote
+    """
+    try:
+        spec = importlib.util.find_spec('packtools')
+    except (ImportError, ValueError):
+        spec = None
+    if spec is None or not spec.submodule_search_locations:
+        return None
+    return os.path.join(
+        list(spec.submodule_search_locations)[0],
+        'catalogs', 'scielo-publishing-schema.xml')
+
+
+XML_CATALOG = packtools_catalog()
+IS_PACKTOOLS_INSTALLED = XML_CATALOG is not None
+os.environ['XML_CATALOG_FILES'] = XML_CATALOG or ''
+
+# packtools é importado somente no primeiro uso (load_packtools)
+packtools = None
+exceptions = None
+
+
+def load_packtools():
+    global packtools, exceptions
+    if packtools is None:
+        import packtools
+        from packtools import exceptions
+    return packtools
 
 
 logger = logging.getLogger()
@@ -73,8 +94,26 @@ class PMCXMLValidator(object):
         f, e, w = self.validate_style(xml, style_report_filename)
         return (xml, valid, (f, e, w))
 
+    def validate_tree(self, xml_obj, xml_filename,
+                      dtd_report_filename, style_report_filename):
+        """
+        Igual a `validate`, mas recebe a árvore já carregada em memória
+        """
+        valid = self._validate_structure(
+            xml_obj, xml_filename, dtd_report_filename)
+        f, e, w = self.validate_style(xml_obj, style_report_filename)
+        return (xml_obj, valid, (f, e, w))
+
     def validate_structure(self, xml_filename, dtd_report_filename):
         xml_obj = xml_utils.get_xml_object(xml_filename)
+        valid = self._validate_structure(
+            xml_obj, xml_filename, dtd_report_filename)
+        return xml_obj, valid
+
+    def _validate_structure(self, xml_obj, xml_filename, dtd_report_filename):
+        status = None
+        content = ""
+        valid = False
         if not xml_obj:
             status = validation_status.STATUS_BLOCKING_ERROR
             content = "Unable to load {}".format(xml_filename)
@@ -89,7 +128,7 @@ class PMCXMLValidator(object):
                 fs_utils.write_file(dtd_report_filename, content)
         content = "" if not status else status + '\n' + content + '\n' * 10
         fs_utils.write_file(dtd_report_filename, content)
-        return xml_obj, valid
+        return valid
 
     def validate_style(self, xml_obj, report_filename):
         if os.path.isfile(report_filename):
@@ -116,7 +155,7 @@ class PackToolsXMLValidator(object):
         self.load_xml()
         self.sps_version = sps_version or xml_versions.get_latest_sps_version()
 
-        self.version = packtools.__version__
+        self.version = load_packtools().__version__
 
         self.xml_validator = None
         self.locations = xml_versions.dtd_locations()
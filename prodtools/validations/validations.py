@@ -1,6 +1,7 @@
 # coding=utf-8
 
 import os
+import json
 
 from prodtools import _
 from prodtools.utils import fs_utils
@@ -51,6 +52,8 @@ class ValidationsResult(object):
     def __init__(self):
         self._message = ''
         self.numbers = {}
+        # resultados estruturados (result_item), quando disponíveis
+        self.items = []
 
     @property
     def message(self):
@@ -93,6 +96,20 @@ class ValidationsResult(object):
     def warnings(self):
         return self.numbers.get(validation_status.STATUS_WARNING, 0)
 
+    @property
+    def summary(self):
+        """
+        Quantidade de mensagens por status (ex.: {'error': 2})
+        """
+        return {
+            validation_status.style(status): number
+            for status, number in self.numbers.items()
+            if number
+        }
+
+    def as_dict(self):
+        return {'summary': self.summary, 'items': self.items}
+
     def statistics_display(self, inline=True, html_format=True):
         tag_name = 'span'
         text = ' | '.join([k + ': ' + v for ign, k, v in self.statistics_label_and_number if v != '0'])
@@ -107,6 +124,31 @@ class ValidationsResult(object):
         return r
 
 
+def result_item(label, status, message, xml='', reference=None):
+    """
+    Resultado de uma validação, no formato usado no JSON dos relatórios
+    """
+    item = {
+        'rule': label,
+        'status': validation_status.style(status or '') or status,
+        'message': message,
+    }
+    if xml:
+        item['xml'] = xml
+    if reference is not None:
+        item['reference'] = reference
+    return item
+
+
+def write_json(filename, data):
+    """
+    Grava `data` em `filename` como JSON compacto
+    """
+    fs_utils.write_file(
+        filename,
+        json.dumps(data, ensure_ascii=False, separators=(',', ':')))
+
+
 class ValidationsFile(ValidationsResult):
 
     def __init__(self, filename):
@@ -3,44 +3,48 @@ import logging
 import logging.config
 import argparse
 import os
+import time
 import shutil
+import threading
 import traceback
 
 from tempfile import TemporaryDirectory
 from datetime import datetime
 
-from packtools.utils import SPPackage
 
-try:
-    from prodtools import form
-except ImportError as e:
-    print(e)
-    print("It is ok if running on a server without GUI")
 from prodtools import _
 from prodtools.data.package import PackageHasNoXMLFilesError
 from prodtools.utils import fs_utils
 from prodtools.utils import encoding
+from prodtools.utils import tracing
 from prodtools.processing import pkg_processors
 from prodtools.processing.sps_pkgmaker import PackageMaker
 from prodtools.server import mailer
 from prodtools.server import filestransfer
+from prodtools.server import transfer_manager
 from prodtools.server import xc_gerapadrao
+from prodtools.server import reception_queue
+from prodtools.server import outbox
+from prodtools.server import scheduler
+from prodtools.server import intake
 from prodtools.config import config
 from prodtools.utils import ftp_service
 from prodtools.utils.logging_config import LOGGING_CONFIG
 
 
-logging.config.dictConfig(LOGGING_CONFIG)
 logger = logging.getLogger()
 
 os_path_join = os.path.join
 
+SCILISTA_LOCK = threading.Lock()
+
 
 class ForbiddenOperationError(Exception):
     pass
 
 
 def main():
+    logging.config.dictConfig(LOGGING_CONFIG)
     parser = argparse.ArgumentParser(
         description='XML Converter for Desktop cli utility')
     parser.add_argument(
@@ -66,8 +70,52 @@ class Reception(object):
             config.get_configuration_filename(collection_acron))
         self.proc = pkg_processors.PkgProcessor(
             self.config, INTERATIVE=self.config.interative_mode, stage='xc')
+        self.proc.export_callback = self._export_finished
         self.mailer = mailer.Mailer(self.config)
         self.transfer = filestransfer.SciELOWebFilesTransfer(self.config)
+        self.issue_locks = reception_queue.IssueLocks()
+        self._local = threading.local()
+        self._processors = []
+        self._processors_lock = threading.Lock()
+        self._queue = None
+        self._outbox_workers = None
+        # aguarda as ações do outbox ao final de receive_package
+        self.wait_outbox = True
+        # métricas de entrada dos pacotes da última execução
+        self.intake_metrics = []
+
+    @property
+    def queue(self):
+        if self._queue is None:
+            self._queue = reception_queue.ReceptionQueue(
+                self.config.queue_state_path, self.config.xc_workers,
+                scheduler.Scheduler())
+        return self._queue
+
+    @property
+    def processor(self):
+        """
+        Cada worker da fila de recepção usa o seu próprio PkgProcessor
+        """
+        if threading.current_thread() is threading.main_thread():
+            return self.proc
+        proc = getattr(self._local, "proc", None)
+        if proc is None:
+            proc = pkg_processors.PkgProcessor(
+                self.config, INTERATIVE=self.config.interative_mode,
+                stage='xc')
+            proc.export_callback = self._export_finished
+            self._local.proc = proc
+            with self._processors_lock:
+                self._processors.append(proc)
+        return proc
+
+    def worker_processors(self):
+        """
+        PkgProcessor dos workers da fila de recepção
+        """
+        with self._processors_lock:
+            return list(self._processors)
 
     def download_packages(self):
         configuration = self.config
@@ -127,11 +175,19 @@ class Reception(object):
         if not self.collection_acron:
             raise ForbiddenOperationError(
                 "Not allowed to call _receive_package_for_server")
-        for package_path in self._queued_packages():
-            self.convert_package(package_path)
-            fs_utils.delete_file_or_folder(package_path)
+        result = self.queue.run(
+            self._convert_queued_package, self._queued_packages())
+        if self.wait_outbox and self.outbox_workers is not None:
+            self.outbox_workers.wait()
+        return result
+
+    def _convert_queued_package(self, package_path):
+        self.convert_package(package_path)
+        fs_utils.delete_file_or_folder(package_path)
 
     def display_form(self):
+        # tkinter não está disponível em servidores sem interface gráfica
+        from prodtools import form
         form.display_form(
             self.proc.stage == 'xc', None, self.call_convert_package)
 
@@ -139,7 +195,7 @@ class Reception(object):
         self.convert_package(package_path)
         return 'done', 'blue'
 
-    def _create_package_instance(self, source: str, output: str) -> SPPackage:
+    def _create_package_instance(self, source: str, output: str):
         """Cria instância da classe SPPackage para o pacote de entrada"""
 
         try:
@@ -154,6 +210,21 @@ class Reception(object):
         if package_path is None:
             return False
 
+        trace_file_path = None
+        if self.config.trace_path:
+            trace_file_path = tracing.trace_file_path(
+                self.config.trace_path,
+                os.path.splitext(os.path.basename(package_path))[0])
+        with tracing.Trace(
+                'convert_package', trace_file_path,
+                package=package_path) as trace:
+            result = self._convert_package(package_path)
+        logger.info(
+            "External commands of %s: %s", package_path,
+            trace.stats.get('commands') or '-')
+        return result
+
+    def _convert_package(self, package_path):
         encoding.display_message(package_path)
         xml_path = package_path
 
@@ -163,9 +234,13 @@ class Reception(object):
         result = scilista_items, xc_status, mail_info
 
         with TemporaryDirectory() as output_path:
+            lock = None
             try:
                 package = self._create_package_instance(source=xml_path, output=output_path)
-                scilista_items, xc_status, mail_info = self.proc.convert_package(package)
+                lock = self.issue_locks.get(
+                    reception_queue.package_lock_key(package))
+                lock.acquire()
+                scilista_items, xc_status, mail_info = self.processor.convert_package(package)
             except PackageHasNoXMLFilesError:
                 logger.exception(
                     "Invalid package '%s'. There is no XML file",
@@ -190,23 +265,84 @@ class Reception(object):
                 package_name = package.package_folder.name
                 acron, issue_id = scilista_items[0].split(" ")
 
-                if xc_status in ["accepted", "approved"]:
-                    self._update_scilista(package_name, scilista_items)
-                    self._update_website_files(package_name, acron, issue_id)
-
-                self._mail_results(package_name, mail_info)
-                self._update_report_files(package_name, acron, issue_id)
+                if self.outbox_workers is not None:
+                    self._add_outbox_tasks(
+                        package_name, acron, issue_id, xc_status,
+                        scilista_items, mail_info)
+                else:
+                    if xc_status in ["accepted", "approved"]:
+                        self._update_scilista(package_name, scilista_items)
+                        self._update_website_files(
+                            package_name, acron, issue_id)
+
+                    self._mail_results(package_name, mail_info)
+                    self._update_report_files(package_name, acron, issue_id)
+            finally:
+                if lock is not None:
+                    lock.release()
 
         encoding.display_message(_('finished'))
 
+    @property
+    def outbox_workers(self):
+        """
+        No modo servidor, as ações posteriores à conversão são executadas
+        em segundo plano (outbox)
+        """
+        if (self._outbox_workers is None and self.collection_acron and
+                self.config.outbox_path):
+            self._outbox_workers = outbox.OutboxWorkers(
+                outbox.Outbox(self.config.outbox_path),
+                {
+                    "scilista": lambda payload: self._append_scilista(
+                        payload["items"]),
+                    "website": lambda payload: self.transfer.transfer_website_files(
+                        payload["acron"], payload["issue_id"]),
+                    "mail": lambda payload: self._mail_results(
+                        payload["package"], payload["mail_info"]),
+                    "report": lambda payload: self.transfer.transfer_report_files(
+                        payload["acron"], payload["issue_id"]),
+                },
+                on_failure=self._outbox_task_failed)
+            self._outbox_workers.start()
+        return self._outbox_workers
+
+    def _add_outbox_tasks(self, package_name, acron, issue_id, xc_status,
+                          scilista_items, mail_info):
+        tasks = []
+        issue = {"acron": acron, "issue_id": issue_id}
+        if xc_status in ["accepted", "approved"]:
+            tasks.append(("scilista", {"items": scilista_items}))
+            tasks.append(("website", issue))
+        tasks.append(("mail", {"package": package_name, "mail_info": mail_info}))
+        tasks.append(("report", issue))
+        for kind, payload in tasks:
+            self.outbox_workers.outbox.add(kind, payload, package_name)
+        self.outbox_workers.notify()
+
+    def _outbox_task_failed(self, task):
+        subject = _("Unable to execute {} of {}").format(
+            task["kind"], task["package"])
+        self.mailer.mail_failure(
+            subject=subject,
+            text="{}\n{}".format(task["payload"], task["error"]),
+            package=task["package"],
+        )
+
+    def _append_scilista(self, scilista_items):
+        if self.config.collection_scilista:
+            content = '\n'.join(list(set(scilista_items))) + '\n'
+            with SCILISTA_LOCK:
+                fs_utils.append_file(
+                    self.config.collection_scilista,
+                    content)
+
     def _update_scilista(self, package_name, scilista_items):
         """Atualiza a scilista da coleção no path configurado"""
         if self.config.collection_scilista:
             try:
                 content = '\n'.join(list(set(scilista_items))) + '\n'
-                fs_utils.append_file(
-                    self.config.collection_scilista,
-                    content)
+                self._append_scilista(scilista_items)
             except Exception as e:
                 subject = _("Unable to update scilista {} with {}").format(
                     self.config.collection_scilista, content
@@ -245,7 +381,10 @@ class Reception(object):
                 self.mailer.mail_failure(
                     subject=subject, text=traceback.format_exc(), package=package_name
                 )
-                raise e
+                # falha da transferência (após as tentativas) não interrompe
+                # o envio do resultado e dos relatórios
+                if not isinstance(e, transfer_manager.TransferError):
+                    raise e
 
     def _update_report_files(self, package_name, acron, issue_id):
         if self.transfer:
@@ -259,7 +398,24 @@ class Reception(object):
                 self.mailer.mail_failure(
                     subject=subject, text=traceback.format_exc(), package=package_name
                 )
-                raise e
+                if not isinstance(e, transfer_manager.TransferError):
+                    raise e
+
+    def _export_finished(self, info):
+        """
+        Resultado do envio do pacote para o SPF (Exporter)
+        """
+        if info.get("status") == "done":
+            logger.info(
+                "Exported '%s' (%s bytes)", info.get("file"), info.get("size"))
+            return
+        logger.error(
+            "Could not export '%s': %s", info.get("file"), info.get("error"))
+        self.mailer.mail_failure(
+            subject="Could not export the package",
+            text="{}\n{}".format(info.get("ftp") or "", info.get("error")),
+            package=info.get("file"),
+        )
 
     def _queued_packages(self):
         pkg_paths, invalid_pkg_files = self._queue_packages()
@@ -297,38 +453,58 @@ class Reception(object):
                 invalid_pkg_files.append(pkg_name)
                 fs_utils.delete_file_or_folder(downloaded_pkg_file_path)
 
+        package_intake = intake.PackageIntake(
+            self.config.intake_max_members, self.config.intake_max_size)
+        metrics = {}
+        items = []
         for pkg_name in os.listdir(temp_path):
             tmp_pkg_path = os_path_join(temp_path, pkg_name)
-
-            queued_pkg_path = os_path_join(queue_path, pkg_name)
-            if not os.path.isdir(queued_pkg_path):
-                os.makedirs(queued_pkg_path)
+            metrics[tmp_pkg_path] = package_intake.inspect(tmp_pkg_path)
 
             if archive_path:
-                if not os.path.isdir(archive_path):
-                    os.makedirs(archive_path)
-                shutil.copy(tmp_pkg_path, archive_path)
-
-            extracted = fs_utils.extract_package(tmp_pkg_path, queued_pkg_path)
+                intake.archive_package(tmp_pkg_path, archive_path)
+            if not metrics[tmp_pkg_path]["accepted"]:
+                invalid_pkg_files.append(pkg_name)
+                continue
+            items.append(
+                (pkg_name, tmp_pkg_path, os_path_join(queue_path, pkg_name)))
+
+        start = time.time()
+        extraction = fs_utils.extract_packages(
+            [(tmp_pkg_path, queued_pkg_path)
+             for pkg_name, tmp_pkg_path, queued_pkg_path in items])
+        logger.info(
+            "Intake: %i packages extracted in %.3fs",
+            len(items), time.time() - start)
+
+        for pkg_name, tmp_pkg_path, queued_pkg_path in items:
+            extracted = extraction[tmp_pkg_path]
             if extracted:
+                files = os.listdir(queued_pkg_path)
+                metrics[tmp_pkg_path]["extracted_files"] = len(files)
                 xml_items = [item
-                             for item in os.listdir(queued_pkg_path)
+                             for item in files
                              if item.endswith(".xml")]
                 extracted = len(xml_items)
 
             if extracted:
                 pkg_paths.append(queued_pkg_path)
             else:
+                metrics[tmp_pkg_path].update(
+                    {"accepted": False, "reason": "extraction failed"})
                 invalid_pkg_files.append(pkg_name)
                 fs_utils.delete_file_or_folder(queued_pkg_path)
         fs_utils.delete_file_or_folder(temp_path)
 
+        self.intake_metrics = list(metrics.values())
+        for item in self.intake_metrics:
+            logger.info("Intake: %s", item)
         return (pkg_paths, invalid_pkg_files)
 
-    def gerapadrao(self):
+    def gerapadrao(self, force=False):
         _gerapadrao = xc_gerapadrao.GeraPadrao(
             self.collection_acron, self.config, self.mailer)
-        _gerapadrao.run()
+        _gerapadrao.run(force)
 
 
 if __name__ == "__main__":
@@ -4,14 +4,15 @@ import logging.config
 import argparse
 
 from prodtools import xc
+from prodtools.server import xc_daemon
 from prodtools.utils.logging_config import LOGGING_CONFIG
 
 
-logging.config.dictConfig(LOGGING_CONFIG)
 logger = logging.getLogger()
 
 
 def main():
+    logging.config.dictConfig(LOGGING_CONFIG)
     parser = argparse.ArgumentParser(
         description='XML Converter for Server cli utility')
     parser.add_argument(
@@ -21,6 +22,15 @@ def main():
                         help='download packages')
     parser.add_argument('--gerapadrao', action='store_true',
                         help='call gerapadrao')
+    parser.add_argument('--force-gerapadrao', action='store_true',
+                        help='gerapadrao: process also the unchanged issues')
+    parser.add_argument('--daemon', action='store_true',
+                        help='keep running and watch the download folder')
+    parser.add_argument('--interval', type=int,
+                        default=xc_daemon.POLL_INTERVAL,
+                        help='daemon: seconds between checks')
+    parser.add_argument('--health-port', type=int,
+                        help='daemon: local port of /health and /metrics')
     parser.add_argument('--loglevel', default='WARNING')
     args = parser.parse_args()
 
@@ -28,17 +38,24 @@ def main():
 
     collection_acron = args.collection_acron
     call_download = args.download
-    call_gerapadrao = args.gerapadrao
+    call_gerapadrao = args.gerapadrao or args.force_gerapadrao
 
     reception = xc.Reception(collection_acron)
 
+    if args.daemon:
+        daemon = xc_daemon.XCDaemon(
+            reception, args.interval, call_download, args.health_port,
+            args.gerapadrao, args.force_gerapadrao)
+        daemon.run()
+        return
+
     if call_download:
         reception.download_packages()
 
     reception.receive_package()
 
     if call_gerapadrao:
-        reception.gerapadrao()
+        reception.gerapadrao(args.force_gerapadrao)
 
 
 if __name__ == "__main__":
@@ -21,7 +21,6 @@ from prodtools.config import config as xc_config
 from prodtools.utils.logging_config import LOGGING_CONFIG
 
 
-logging.config.dictConfig(LOGGING_CONFIG)
 logger = logging.getLogger()
 
 global ucisis
@@ -387,7 +386,7 @@ class PubMedXMLMaker(object):
 
 
 def main():
-
+    logging.config.dictConfig(LOGGING_CONFIG)
     parser = argparse.ArgumentParser(description='XML PubMed cli utility')
     parser.add_argument(
         "issue_path", nargs="?", default='',
@@ -22,12 +22,11 @@ from prodtools.utils.xml_utils import (
 from prodtools.utils.logging_config import LOGGING_CONFIG
 
 
-dictConfig(LOGGING_CONFIG)
-
 logger = logging.getLogger()
 
 
 def main():
+    dictConfig(LOGGING_CONFIG)
     parser = argparse.ArgumentParser(
         description='XML Transformer for Markup cli utility')
     parser.add_argument(
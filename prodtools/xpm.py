@@ -6,20 +6,19 @@ import logging
 from logging.config import dictConfig
 
 from prodtools import _
-from prodtools import form
 from prodtools.config import config
 from prodtools.processing.sgmlxml import SGMLXML2SPSXML
 from prodtools.processing import pkg_processors
 from prodtools.processing.sps_pkgmaker import PackageMaker
+from prodtools.utils import tracing
 from prodtools.utils.logging_config import LOGGING_CONFIG
 
 
-dictConfig(LOGGING_CONFIG)
-
 logger = logging.getLogger()
 
 
 def display_form(stage):
+    from prodtools import form
     form.display_form(stage == 'xc', None, call_make_package_from_form)
 
 
@@ -37,7 +36,15 @@ def execute(INTERATIVE, xml_list, GENERATE_PMC, sgmxml=None, acron=None):
 
     configuration = config.Configuration()
     proc = pkg_processors.PkgProcessor(configuration, INTERATIVE, stage)
-    proc.make_package(pkg, stage == "xml" or GENERATE_PMC)
+    trace_file_path = None
+    if configuration.trace_path:
+        trace_file_path = tracing.trace_file_path(
+            configuration.trace_path,
+            os.path.basename(pkg.package_folder.path))
+    with tracing.Trace(
+            'make_package', trace_file_path,
+            package=pkg.package_folder.path, stage=stage):
+        proc.make_package(pkg, stage == "xml" or GENERATE_PMC)
     print('...'*3)
 
 
@@ -79,7 +86,7 @@ def evaluate_xml_path(xml_path):
 
 
 def main():
-
+    dictConfig(LOGGING_CONFIG)
     parser = argparse.ArgumentParser(
         description='XML Package Maker cli utility')
     parser.add_argument(
@@ -25,6 +25,7 @@ EXTRAS_REQUIRE = {
 
 
 TESTS_REQUIRE = [
+    'pyftpdlib',
 ]
 
 
@@ -87,6 +88,8 @@ setup(
             "scieloxc=prodtools.xc:main",
             "scieloxcserver=prodtools.xc_server:main",
             "xml_transform=prodtools.xml_transform:main",
+            "scielostartup=prodtools.utils.startup_profile:main",
+            "scielobenchmark=prodtools.benchmark.runner:main",
         ]
     }
 )
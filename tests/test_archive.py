@@ -0,0 +1,102 @@
+import os
+import io
+import shutil
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+from zipfile import ZipFile, ZIP_STORED, ZIP_DEFLATED
+
+from prodtools.utils import archive
+
+
+class TestCompressType(TestCase):
+
+    def test_delivery_policy_stores_images(self):
+        for name in ("a01.tif", "a01.JPG", "a01.png", "a01.pdf"):
+            with self.subTest(name=name):
+                self.assertEqual(
+                    archive.compress_type(name, archive.DELIVERY), ZIP_STORED)
+
+    def test_delivery_policy_deflates_xml_and_html(self):
+        for name in ("a01.xml", "a01.html"):
+            with self.subTest(name=name):
+                self.assertEqual(
+                    archive.compress_type(name, archive.DELIVERY),
+                    ZIP_DEFLATED)
+
+    def test_temp_policy_stores_everything(self):
+        self.assertEqual(
+            archive.compress_type("a01.xml", archive.TEMP), ZIP_STORED)
+
+    def test_unknown_policy_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            archive.compress_type("a01.xml", "unknown")
+
+
+class TestZipFiles(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.files = []
+        for name, content in (("a01.xml", b"<article/>" * 100),
+                              ("a01.tif", b"tif content"),
+                              ("a01.html", b"<html/>")):
+            file_path = os.path.join(self.path, name)
+            with open(file_path, "wb") as fp:
+                fp.write(content)
+            self.files.append(file_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_zip_files_creates_valid_zip_applying_policy(self):
+        zip_filename = os.path.join(self.path, "out", "pkg.zip")
+        archive.zip_files(zip_filename, self.files)
+        with ZipFile(zip_filename) as zipf:
+            self.assertIsNone(zipf.testzip())
+            self.assertEqual(
+                sorted(zipf.namelist()), ["a01.html", "a01.tif", "a01.xml"])
+            self.assertEqual(zipf.read("a01.xml"), b"<article/>" * 100)
+            self.assertEqual(
+                zipf.getinfo("a01.xml").compress_type, ZIP_DEFLATED)
+            self.assertEqual(
+                zipf.getinfo("a01.tif").compress_type, ZIP_STORED)
+
+    def test_zip_files_raises_error_and_removes_partial_zip(self):
+        zip_filename = os.path.join(self.path, "pkg.zip")
+        with self.assertRaises(archive.ArchiveError):
+            archive.zip_files(
+                zip_filename,
+                self.files + [os.path.join(self.path, "notfound.xml")])
+        self.assertFalse(os.path.isfile(zip_filename))
+
+    def test_write_zip_writes_into_stream(self):
+        stream = io.BytesIO()
+        archive.write_zip(stream, archive.folder_members(self.path))
+        with ZipFile(io.BytesIO(stream.getvalue())) as zipf:
+            self.assertIsNone(zipf.testzip())
+            self.assertEqual(zipf.read("a01.html"), b"<html/>")
+
+    def test_write_zip_keeps_order_and_names(self):
+        files = []
+        for i in range(20):
+            file_path = os.path.join(self.path, "fig{}.svg".format(i))
+            with open(file_path, "wb") as fp:
+                fp.write(b"<svg/>" * i)
+            files.append((file_path, "figura_ç{}.svg".format(i)))
+        stream = io.BytesIO()
+        archive.write_zip(stream, files, max_workers=2)
+        with ZipFile(io.BytesIO(stream.getvalue())) as zipf:
+            self.assertIsNone(zipf.testzip())
+            self.assertEqual(
+                zipf.namelist(), [arcname for f, arcname in files])
+            self.assertEqual(zipf.read("figura_ç3.svg"), b"<svg/>" * 3)
+
+    def test_write_zip_uses_zipfile_if_zip64_is_needed(self):
+        stream = io.BytesIO()
+        with patch.object(archive, "ZIP32_MAX_MEMBERS", 2):
+            archive.write_zip(stream, archive.folder_members(self.path))
+        with ZipFile(io.BytesIO(stream.getvalue())) as zipf:
+            self.assertIsNone(zipf.testzip())
+            self.assertEqual(
+                zipf.getinfo("a01.xml").compress_type, ZIP_DEFLATED)
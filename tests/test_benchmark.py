@@ -0,0 +1,130 @@
+# coding=utf-8
+import os
+import shutil
+import tempfile
+import subprocess
+from unittest import TestCase
+
+from lxml import etree
+
+from prodtools.benchmark import cisis
+from prodtools.benchmark import runner
+from prodtools.benchmark import sample
+from prodtools.utils.dbm import dbm_isis
+
+
+class TestSample(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.package = sample.SamplePackage(
+            sample.SampleJournal(), documents=2, references=4, figures=3,
+            aop=1)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_make_issn(self):
+        self.assertEqual(sample.make_issn(1234567), "1234-5679")
+        self.assertEqual(sample.make_issn(1234568), "1234-5687")
+
+    def test_write(self):
+        xml_files = self.package.write(self.path)
+        self.assertEqual(
+            [os.path.basename(f) for f in xml_files],
+            ["1234-5679-bench-10-1-e001.xml",
+             "1234-5679-bench-10-1-e002.xml"])
+        tree = etree.parse(xml_files[0])
+        self.assertEqual(len(tree.findall(".//ref")), 4)
+        self.assertEqual(len(tree.findall(".//fig")), 3 * 2)
+        self.assertEqual(
+            sorted(f for f in os.listdir(self.path)
+                   if not f.endswith(".xml"))[:3],
+            ["1234-5679-bench-10-1-e001-gf01.tif",
+             "1234-5679-bench-10-1-e001-gf02.png",
+             "1234-5679-bench-10-1-e001-gf03.svg"])
+
+    def test_aop_document_has_the_same_content(self):
+        xml_file = self.package.write(os.path.join(self.path, "a"))[0]
+        aop_file = self.package.write(
+            os.path.join(self.path, "b"), aop=True)[0]
+        self.assertEqual(
+            os.path.basename(aop_file), "1234-5679-bench-2019-ahead-e001.xml")
+        tree = etree.parse(xml_file)
+        aop_tree = etree.parse(aop_file)
+        self.assertEqual(
+            tree.findtext(".//article-id[@pub-id-type='doi']"),
+            aop_tree.findtext(".//article-id[@pub-id-type='doi']"))
+        self.assertEqual(
+            tree.findtext(".//article-title"),
+            aop_tree.findtext(".//article-title"))
+        self.assertIsNone(aop_tree.find(".//article-meta/volume"))
+
+    def test_write_is_deterministic(self):
+        first = self.package.write(os.path.join(self.path, "a"))
+        second = self.package.write(os.path.join(self.path, "b"))
+        for a, b in zip(first, second):
+            with open(a, "rb") as fa, open(b, "rb") as fb:
+                self.assertEqual(fa.read(), fb.read())
+
+
+class TestCISISStandIn(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        cisis_path = cisis.make_cisis_path(os.path.join(self.path, "cisis"))
+        cisis1030 = dbm_isis.CISIS(cisis_path)
+        self.db_isis = dbm_isis.UCISIS(cisis1030, cisis1030)
+        self.journal = sample.SampleJournal()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_issue_search(self):
+        db = os.path.join(self.path, "issue")
+        self.db_isis.create_id_file(
+            db + ".id",
+            [self.journal.issue_record(),
+             self.journal.issue_record(aop=True)])
+        self.db_isis.id_file_to_db(db + ".id", db, None)
+        self.db_isis.update_indexes(db, db)
+        records = self.db_isis.get_records(
+            db, "1234-5687v10n1 OR 1234-5679v10n1")
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["36"], "20201")
+        records = self.db_isis.get_records(db, "1234-56792019nahead")
+        self.assertEqual(records[0]["32"], "ahead")
+
+    def test_append(self):
+        db = os.path.join(self.path, "title")
+        self.db_isis.create_id_file(
+            db + ".id", [self.journal.title_record()])
+        self.db_isis.id_file_to_db(db + ".id", db, None)
+        id_file = os.path.join(self.path, "new.id")
+        self.db_isis.create_id_file(id_file, [self.journal.title_record()])
+        self.db_isis.append_id_file_to_db(id_file, db, None)
+        self.assertEqual(len(self.db_isis.get_records(db)), 2)
+
+
+class TestSubprocessCounter(TestCase):
+
+    def test_counts_commands(self):
+        counter = runner.SubprocessCounter()
+        counter.install()
+        try:
+            subprocess.call(["true"])
+            subprocess.call("true", shell=True)
+            subprocess.call(["/bin/echo"], stdout=subprocess.DEVNULL)
+        finally:
+            counter.uninstall()
+        subprocess.call(["true"])
+        self.assertEqual(counter.commands, {"true": 2, "echo": 1})
+        self.assertEqual(counter.total, 3)
+
+    def test_measure_records_error(self):
+        def fail():
+            raise ValueError("x")
+        result, stage = runner.measure("fail", fail)
+        self.assertIsNone(result)
+        self.assertEqual(stage.error, "ValueError: x")
+        self.assertIsNotNone(stage.wall)
@@ -0,0 +1,93 @@
+# coding=utf-8
+import os
+import sys
+import time
+import shutil
+import tempfile
+from unittest import TestCase
+
+from prodtools.utils import commands
+from prodtools.utils import tracing
+
+
+def python_args(code):
+    return [sys.executable, "-c", code]
+
+
+class TestCommandRunner(TestCase):
+
+    def setUp(self):
+        self.runner = commands.CommandRunner()
+
+    def test_run_returns_output_and_exit_status(self):
+        result = self.runner.run(
+            python_args("import sys; print('a b'); sys.exit(0)"))
+        self.assertTrue(result.ok)
+        self.assertEqual(result.output, "a b")
+
+    def test_run_does_not_use_shell(self):
+        result = self.runner.run(python_args("print(1)") + ["> x", "$HOME"])
+        self.assertTrue(result.ok)
+        self.assertEqual(result.output, "1")
+
+    def test_run_captures_failure(self):
+        result = self.runner.run(python_args(
+            "import sys; sys.stderr.write('invalid db'); sys.exit(3)"))
+        self.assertFalse(result.ok)
+        self.assertEqual(result.returncode, 3)
+        self.assertEqual(result.stderr, "invalid db")
+        name = os.path.basename(sys.executable)
+        stats = self.runner.stats.as_dict()[name]
+        self.assertEqual(stats["failures"], 1)
+        self.assertEqual(stats["last_error"], "invalid db")
+
+    def test_run_enforces_timeout(self):
+        name = os.path.basename(sys.executable)
+        runner = commands.CommandRunner(timeouts={name: 0.2})
+        result = runner.run(python_args("import time; time.sleep(5)"))
+        self.assertTrue(result.timed_out)
+        self.assertFalse(result.ok)
+        self.assertEqual(runner.stats.as_dict()[name]["timeouts"], 1)
+
+    def test_timeout_kills_process_group(self):
+        path = tempfile.mkdtemp()
+        try:
+            marker = os.path.join(path, "marker")
+            runner = commands.CommandRunner(timeouts={"sh": 0.3})
+            result = runner.run(
+                ["sh", "-c", "(sleep 1; touch {}) & sleep 5".format(marker)],
+                process_group=True)
+            self.assertTrue(result.timed_out)
+            time.sleep(1.5)
+            self.assertFalse(os.path.isfile(marker))
+        finally:
+            shutil.rmtree(path)
+
+    def test_run_reports_missing_program(self):
+        result = self.runner.run(["/nonexistent/mx", "what"])
+        self.assertEqual(result.returncode, -1)
+        self.assertEqual(self.runner.stats.as_dict()["mx"]["calls"], 1)
+
+    def test_run_writes_stdout_to_file(self):
+        path = tempfile.mkdtemp()
+        try:
+            file_path = os.path.join(path, "out.id")
+            with open(file_path, "wb") as fp:
+                result = self.runner.run(python_args("print('!ID 1')"),
+                                         stdout=fp)
+            self.assertEqual(result.stdout, "")
+            with open(file_path) as fp:
+                self.assertEqual(fp.read(), "!ID 1\n")
+        finally:
+            shutil.rmtree(path)
+
+    def test_package_stats_are_kept_in_the_trace(self):
+        self.runner.run(python_args("print(1)"))
+        with tracing.Trace("convert_package") as trace:
+            self.runner.run(python_args("print(1)"))
+            self.runner.run(python_args("print(2)"))
+        name = os.path.basename(sys.executable)
+        self.assertEqual(trace.stats["commands"].as_dict()[name]["calls"], 2)
+        self.assertEqual(self.runner.stats.as_dict()[name]["calls"], 3)
+        self.assertEqual(
+            [e["name"] for e in trace.events].count(name), 2)
@@ -2,10 +2,17 @@
 
 from unittest import TestCase, skipIf
 from unittest.mock import patch, mock_open
+import os
 import sys
+import shutil
+import tempfile
 
 from prodtools.utils.dbm.dbm_isis import IDFile
+from prodtools.utils.dbm import dbm_isis
 from prodtools.utils import fs_utils
+from prodtools.utils import tracing
+from prodtools.utils import commands
+from prodtools.benchmark import cisis
 
 
 python_version = sys.version_info.major
@@ -237,3 +244,125 @@ class TestIDFile(TestCase):
         records = self.idfile.read(file_path)
         print(records)
         self.assertEqual(records, expected)
+
+
+class TestUCISIS(TestCase):
+    """
+    Usa o CISIS substituto do benchmark (prodtools.benchmark.cisis)
+    """
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        cisis_path = cisis.make_cisis_path(os.path.join(self.path, "cisis"))
+        self.ucisis = dbm_isis.UCISIS(
+            dbm_isis.CISIS(cisis_path), dbm_isis.CISIS(cisis_path))
+        self.db = os.path.join(self.path, "base", "v1n1")
+        os.makedirs(os.path.dirname(self.db))
+        self.id_filenames = []
+        for name, records in (("i", [{"706": "i"}]),
+                              ("00001", [{"706": "o"}, {"706": "h"}]),
+                              ("00002", [{"706": "o"}, {"706": "h"}])):
+            id_filename = os.path.join(self.path, "id", name + ".id")
+            self.ucisis.create_id_file(id_filename, records)
+            self.id_filenames.append(id_filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def commands(self, trace):
+        stats = trace.stats.get("commands")
+        return stats.as_dict() if stats else {}
+
+    def test_id_files_to_db_runs_id2i_once(self):
+        with tracing.Trace("test") as trace:
+            self.ucisis.id_files_to_db(self.id_filenames, self.db)
+        self.assertEqual(
+            {name: item["calls"] for name, item in
+             self.commands(trace).items()},
+            {"id2i": 1})
+        records = self.ucisis.get_records(self.db)
+        self.assertEqual(
+            [r["706"] for r in records], ["i", "o", "h", "o", "h"])
+
+    def test_reader_and_records_are_kept_while_db_is_unchanged(self):
+        self.ucisis.id_files_to_db(self.id_filenames[:2], self.db)
+        with tracing.Trace("test") as trace:
+            first = self.ucisis.get_records(self.db)
+            first[0]["706"] = "changed"
+            second = self.ucisis.get_records(self.db)
+            self.assertEqual(self.ucisis.version(self.db), "1030")
+        # somente a primeira leitura; o CISIS que lê a base já é conhecido
+        self.assertEqual(
+            {name: item["calls"] for name, item in
+             self.commands(trace).items()},
+            {"i2id": 1})
+        self.assertEqual([r["706"] for r in second], ["i", "o", "h"])
+
+    def test_records_are_read_again_after_db_changes(self):
+        self.ucisis.id_files_to_db(self.id_filenames[:2], self.db)
+        self.ucisis.get_records(self.db)
+        self.ucisis.append_id_file_to_db(self.id_filenames[2], self.db)
+        with tracing.Trace("test") as trace:
+            records = self.ucisis.get_records(self.db)
+        self.assertEqual(len(records), 5)
+        self.assertEqual(self.commands(trace)["i2id"]["calls"], 1)
+        self.assertNotIn("mx", self.commands(trace))
+
+    def test_indexes_are_updated_only_with_new_records(self):
+        fst_filename = os.path.join(self.path, "base.fst")
+        fs_utils.write_file(fst_filename, "706 0 v706")
+        self.ucisis.id_files_to_db(self.id_filenames[:2], self.db, fst_filename)
+        self.ucisis.append_id_file_to_db(self.id_filenames[2], self.db)
+        new_id_filename = os.path.join(self.path, "id", "new.id")
+        self.ucisis.create_id_file(new_id_filename, [{"706": "n"}])
+        self.ucisis.append_id_file_to_db(new_id_filename, self.db)
+        with tracing.Trace("test") as trace:
+            mode = self.ucisis.generate_indexes(
+                self.db, fst_filename, self.db)
+            again = self.ucisis.generate_indexes(
+                self.db, fst_filename, self.db)
+        self.assertEqual((mode, again), ("incremental", "unchanged"))
+        self.assertEqual(
+            {name: item["calls"] for name, item in
+             trace.stats["indexes"].as_dict().items()},
+            {"incremental": 1, "unchanged": 1})
+        self.assertEqual(
+            [r["706"] for r in self.ucisis.get_records(self.db, "N")], ["n"])
+        self.assertEqual(len(self.ucisis.get_records(self.db, "O")), 2)
+
+    def test_indexes_are_generated_again_after_changes(self):
+        fst_filename = os.path.join(self.path, "base.fst")
+        fs_utils.write_file(fst_filename, "706 0 v706")
+        self.ucisis.id_files_to_db(self.id_filenames[:2], self.db, fst_filename)
+        fs_utils.write_file(fst_filename, "706 0 v706/")
+        self.assertEqual(
+            self.ucisis.generate_indexes(self.db, fst_filename, self.db),
+            "full")
+        # registro alterado
+        self.ucisis.id_files_to_db(
+            [self.id_filenames[0], self.id_filenames[0]], self.db)
+        self.assertEqual(
+            self.ucisis.generate_indexes(self.db, fst_filename, self.db),
+            "full")
+        self.assertEqual(self.ucisis.get_records(self.db, "O"), [])
+
+    def test_indexes_are_generated_again_after_failure(self):
+        fst_filename = os.path.join(self.path, "base.fst")
+        fs_utils.write_file(fst_filename, "706 0 v706")
+        self.ucisis.id_files_to_db(self.id_filenames[:2], self.db)
+        failure = commands.CommandResult(["mx"], -1, timed_out=True)
+        with patch.object(dbm_isis.CISIS, "generate_indexes",
+                          return_value=failure):
+            self.assertEqual(
+                self.ucisis.generate_indexes(self.db, fst_filename, self.db),
+                "failed")
+        self.assertFalse(os.path.isfile(self.db + ".ifstate"))
+        self.assertEqual(
+            self.ucisis.generate_indexes(self.db, fst_filename, self.db),
+            "full")
+        # invertido removido
+        os.remove(self.db + ".ifp")
+        self.assertEqual(
+            self.ucisis.generate_indexes(self.db, fst_filename, self.db),
+            "full")
+        self.assertEqual(len(self.ucisis.get_records(self.db, "O")), 1)
@@ -1,10 +1,18 @@
 import unittest
-from unittest.mock import patch, Mock, ANY
+from unittest.mock import patch
 
 import tempfile
+import threading
 import os
 import shutil
+import zipfile
 
+try:
+    from pyftpdlib.authorizers import DummyAuthorizer
+    from pyftpdlib.handlers import FTPHandler
+    from pyftpdlib.servers import ThreadedFTPServer
+except ImportError:
+    ThreadedFTPServer = None
 
 from prodtools.utils.exporter import Exporter
 
@@ -13,27 +21,74 @@ class TestExporter(unittest.TestCase):
 
     def setUp(self):
         self.files_path = tempfile.mkdtemp()
+        self.dest_path = tempfile.mkdtemp()
         for item in "abc":
             with open(os.path.join(self.files_path, item), "w") as fp:
                 fp.write(item)
+        self.results = []
+        self.finished = threading.Event()
 
-    @patch('prodtools.utils.exporter.AsyncFTP')
-    def test_export(self, MockAsyncFTP):
-        data = dict(
-            (
-                ("server", "server"),
-                ("password", "password"),
-                ("remote_path", "remote_path"),
-                ("user", "user"),
-            )
-        )
+    def callback(self, info):
+        self.results.append(info)
+        self.finished.set()
 
-        exporter = Exporter(data)
+    def assert_zip(self, zip_path):
+        with zipfile.ZipFile(zip_path) as zf:
+            self.assertEqual(zf.namelist(), ["a", "b", "c"])
+            self.assertEqual(zf.read("b"), b"b")
+
+    def test_export_to_destination_path(self):
+        exporter = Exporter(
+            {"destination_path": self.dest_path}, self.callback)
+        info = exporter.export(self.files_path, "xxx.zip")
+        self.assertTrue(self.finished.wait(10))
+        self.assertTrue(info["file"].endswith("_xxx.zip"))
+        self.assertEqual(self.results[0]["status"], "done")
+        self.assertEqual(os.listdir(self.dest_path), [
+            os.path.basename(info["file"])])
+        self.assertEqual(
+            self.results[0]["size"], os.path.getsize(info["file"]))
+        self.assert_zip(info["file"])
+
+    @patch("prodtools.utils.exporter.archive.write_zip",
+           side_effect=IOError("disk full"))
+    def test_export_reports_failure(self, mock_write_zip):
+        exporter = Exporter(
+            {"destination_path": self.dest_path}, self.callback)
         exporter.export(self.files_path, "xxx.zip")
+        self.assertTrue(self.finished.wait(10))
+        self.assertEqual(self.results[0]["status"], "failed")
+        self.assertEqual(self.results[0]["error"], "disk full")
+        self.assertEqual(os.listdir(self.dest_path), [])
 
-        MockAsyncFTP.assert_called_once_with(
-            ANY, "server", "user", "password", "remote_path"
-        )
+    @unittest.skipIf(ThreadedFTPServer is None, "pyftpdlib is not installed")
+    def test_export_by_ftp(self):
+        os.makedirs(os.path.join(self.dest_path, "remote_path"))
+        authorizer = DummyAuthorizer()
+        authorizer.add_user("user", "password", self.dest_path, perm="elradfmw")
+        handler = type("Handler", (FTPHandler,), {"authorizer": authorizer})
+        server = ThreadedFTPServer(("127.0.0.1", 0), handler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            data = {
+                "server": "127.0.0.1:{}".format(server.address[1]),
+                "password": "password",
+                "remote_path": "remote_path",
+                "user": "user",
+            }
+            exporter = Exporter(data, self.callback)
+            info = exporter.export(self.files_path, "xxx.zip")
+            self.assertTrue(self.finished.wait(10))
+        finally:
+            server.close_all()
+            thread.join()
+        self.assertEqual(info["user"], "user")
+        self.assertEqual(self.results[0]["status"], "done")
+        remote = os.path.join(self.dest_path, "remote_path")
+        self.assertEqual(
+            os.listdir(remote), [os.path.basename(info["file"])])
+        self.assert_zip(os.path.join(remote, os.path.basename(info["file"])))
 
     @patch('prodtools.utils.exporter.exp_logger')
     def test_export_raises_configuration_error(self, mk_logger):
@@ -50,3 +105,4 @@ class TestExporter(unittest.TestCase):
 
     def tearDown(self):
         shutil.rmtree(self.files_path)
+        shutil.rmtree(self.dest_path)
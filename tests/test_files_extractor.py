@@ -0,0 +1,166 @@
+import os
+import shutil
+import tarfile
+import tempfile
+import zipfile
+from unittest import TestCase
+
+from prodtools.utils import files_extractor
+from prodtools.utils import fs_utils
+
+
+class TestExtractFile(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.dest_path = os.path.join(self.path, "dest")
+        self.zip_path = os.path.join(self.path, "pkg.zip")
+        with zipfile.ZipFile(self.zip_path, "w") as zipf:
+            zipf.writestr("a01.xml", "<article/>")
+            zipf.writestr("folder/a01.pdf", "pdf")
+            zipf.writestr("folder/sub/a02.xml", "<article/>")
+            zipf.writestr("../evil.xml", "<evil/>")
+            zipf.writestr("/abs.xml", "<evil/>")
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_extract_file_keeps_folders(self):
+        self.assertTrue(
+            files_extractor.extract_file(self.zip_path, self.dest_path))
+        self.assertTrue(
+            os.path.isfile(os.path.join(self.dest_path, "a01.xml")))
+        self.assertTrue(
+            os.path.isfile(os.path.join(self.dest_path, "folder", "a01.pdf")))
+        self.assertTrue(
+            os.path.isfile(
+                os.path.join(self.dest_path, "folder", "sub", "a02.xml")))
+
+    def test_extract_members_rejects_unsafe_paths(self):
+        os.makedirs(self.dest_path)
+        result = files_extractor.extract_members(
+            self.zip_path, self.dest_path)
+        self.assertEqual(result.unsafe, ["../evil.xml", "/abs.xml"])
+        self.assertFalse(os.path.isfile(os.path.join(self.path, "evil.xml")))
+
+    def test_extract_members_skips_unchanged_files(self):
+        os.makedirs(self.dest_path)
+        files_extractor.extract_members(self.zip_path, self.dest_path)
+        result = files_extractor.extract_members(
+            self.zip_path, self.dest_path)
+        self.assertEqual(result.extracted, [])
+        self.assertEqual(len(result.skipped), 3)
+
+    def test_extract_file_does_not_change_cwd(self):
+        cwd = os.getcwd()
+        files_extractor.extract_file(self.zip_path, self.dest_path)
+        self.assertEqual(os.getcwd(), cwd)
+
+    def test_extract_file_returns_false_for_invalid_file(self):
+        invalid = os.path.join(self.path, "invalid.zip")
+        with open(invalid, "w") as fp:
+            fp.write("invalid")
+        self.assertFalse(files_extractor.extract_file(invalid, self.dest_path))
+
+    def test_extract_file_extracts_tgz(self):
+        tgz_path = os.path.join(self.path, "pkg.tgz")
+        xml = os.path.join(self.path, "a03.xml")
+        with open(xml, "w") as fp:
+            fp.write("<article/>")
+        with tarfile.open(tgz_path, "w:gz") as tarf:
+            tarf.add(xml, arcname="pkg/a03.xml")
+        self.assertTrue(
+            files_extractor.extract_file(tgz_path, self.dest_path))
+        self.assertTrue(
+            os.path.isfile(os.path.join(self.dest_path, "pkg", "a03.xml")))
+
+    def test_extract_members_overwrites_tar_member_of_same_size(self):
+        tgz_path = os.path.join(self.path, "pkg.tgz")
+        xml = os.path.join(self.path, "a03.xml")
+        with open(xml, "w") as fp:
+            fp.write("<article/>")
+        with tarfile.open(tgz_path, "w:gz") as tarf:
+            tarf.add(xml, arcname="a03.xml")
+        os.makedirs(self.dest_path)
+        with open(os.path.join(self.dest_path, "a03.xml"), "w") as fp:
+            fp.write("<previous>")
+        result = files_extractor.extract_members(tgz_path, self.dest_path)
+        self.assertEqual(result.extracted, ["a03.xml"])
+        with open(os.path.join(self.dest_path, "a03.xml")) as fp:
+            self.assertEqual(fp.read(), "<article/>")
+
+
+class TestExtractPackage(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.packages = []
+        for name in ("pkg1", "pkg2"):
+            zip_path = os.path.join(self.path, name + ".zip")
+            with zipfile.ZipFile(zip_path, "w") as zipf:
+                zipf.writestr(name + ".xml", "<article/>")
+                zipf.writestr("folder/" + name + ".pdf", "pdf")
+                zipf.writestr("folder/sub/ignored.xml", "<article/>")
+            self.packages.append(
+                (zip_path, os.path.join(self.path, "queue", name)))
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_extract_package_eliminates_folders(self):
+        zip_path, dest_path = self.packages[0]
+        self.assertTrue(fs_utils.extract_package(zip_path, dest_path))
+        self.assertEqual(
+            sorted(os.listdir(dest_path)), ["pkg1.pdf", "pkg1.xml"])
+
+    def test_extract_packages_extracts_several_packages(self):
+        result = fs_utils.extract_packages(self.packages)
+        self.assertEqual(list(result.values()), [True, True])
+        for zip_path, dest_path in self.packages:
+            self.assertEqual(len(os.listdir(dest_path)), 2)
+
+    def test_extract_package_returns_false_for_not_compressed_file(self):
+        txt = os.path.join(self.path, "pkg.txt")
+        with open(txt, "w") as fp:
+            fp.write("x")
+        self.assertFalse(
+            fs_utils.extract_package(txt, os.path.join(self.path, "x")))
+
+
+class TestInspectArchive(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_inspect_archive_reads_zip_contents(self):
+        zip_path = os.path.join(self.path, "pkg.zip")
+        with zipfile.ZipFile(zip_path, "w") as zipf:
+            zipf.writestr("a01.xml", "<article/>")
+            zipf.writestr("folder/a01.pdf", "pdf")
+            zipf.writestr("folder/sub/ignored.xml", "<article/>")
+            zipf.writestr("../evil.xml", "<article/>")
+        summary = files_extractor.inspect_archive(zip_path)
+        self.assertEqual(summary.members, 4)
+        self.assertEqual(summary.xml, 1)
+        self.assertEqual(summary.size, 23)
+        self.assertEqual(summary.unsafe, ["../evil.xml"])
+
+    def test_inspect_archive_lists_tar_links_as_unsafe(self):
+        tgz_path = os.path.join(self.path, "pkg.tgz")
+        with tarfile.open(tgz_path, "w:gz") as tarf:
+            link = tarfile.TarInfo("a01.xml")
+            link.type = tarfile.SYMTYPE
+            link.linkname = "/etc/passwd"
+            tarf.addfile(link)
+        summary = files_extractor.inspect_archive(tgz_path)
+        self.assertEqual(summary.unsafe, ["a01.xml"])
+        self.assertEqual(summary.xml, 0)
+
+    def test_inspect_archive_returns_none_for_invalid_file(self):
+        zip_path = os.path.join(self.path, "pkg.zip")
+        with open(zip_path, "w") as fp:
+            fp.write("not a zip")
+        self.assertIsNone(files_extractor.inspect_archive(zip_path))
@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+import threading
+from unittest import TestCase, skipIf
+
+try:
+    from pyftpdlib.authorizers import DummyAuthorizer
+    from pyftpdlib.handlers import FTPHandler
+    from pyftpdlib.servers import ThreadedFTPServer
+except ImportError:
+    ThreadedFTPServer = None
+
+from prodtools.utils import ftp_service
+
+
+@skipIf(ThreadedFTPServer is None, "pyftpdlib is not installed")
+class TestFTPService(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.ftp_root = os.path.join(self.path, "ftp")
+        self.local_path = os.path.join(self.path, "download")
+        os.makedirs(os.path.join(self.ftp_root, "scl", "abc"))
+        self.content = b"0123456789" * 1000
+        for name in ("scl/pkg1.zip", "scl/abc/pkg2.tgz", "scl/abc/x.txt"):
+            with open(os.path.join(self.ftp_root, name), "wb") as fp:
+                fp.write(self.content)
+
+        authorizer = DummyAuthorizer()
+        authorizer.add_user("user", "pswd", self.ftp_root, perm="elradfmw")
+        handler = type("Handler", (FTPHandler,), {"authorizer": authorizer})
+        self.server = ThreadedFTPServer(("127.0.0.1", 0), handler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.address = "127.0.0.1:{}".format(self.server.address[1])
+
+    def tearDown(self):
+        self.server.close_all()
+        self.thread.join()
+        shutil.rmtree(self.path)
+
+    def test_download_files_downloads_and_deletes_packages(self):
+        ftp = ftp_service.FTPService(self.address, "user", "pswd", 2)
+        files = ftp.download_files(self.local_path, "scl")
+        self.assertEqual(sorted(files), ["pkg1.zip", "pkg2.tgz"])
+        self.assertEqual(sorted(os.listdir(self.local_path)), sorted(files))
+        with open(os.path.join(self.local_path, "pkg2.tgz"), "rb") as fp:
+            self.assertEqual(fp.read(), self.content)
+        self.assertFalse(
+            os.path.isfile(os.path.join(self.ftp_root, "scl", "pkg1.zip")))
+        self.assertTrue(
+            os.path.isfile(os.path.join(self.ftp_root, "scl", "abc", "x.txt")))
+
+    def write_part(self, content, source):
+        os.makedirs(self.local_path)
+        part = os.path.join(self.local_path, "pkg1.zip.part")
+        with open(part, "wb") as fp:
+            fp.write(content)
+        ftp_service.write_source(part + ".source", source)
+        return part
+
+    def remote_source(self, path):
+        ftp = ftp_service.FTPService(self.address, "user", "pswd")
+        try:
+            for remote_path, size, modify in ftp.list_files("scl"):
+                if remote_path == path:
+                    return {"path": path, "size": size, "modify": modify}
+        finally:
+            ftp.close()
+
+    def test_download_files_resumes_partial_file(self):
+        # o início do arquivo vem do .part: o download é retomado
+        part = self.write_part(
+            b"y" * 4000, self.remote_source("scl/pkg1.zip"))
+        ftp = ftp_service.FTPService(self.address, "user", "pswd")
+        ftp.download_files(self.local_path, "scl")
+        self.assertFalse(os.path.isfile(part))
+        self.assertFalse(os.path.isfile(part + ".source"))
+        with open(os.path.join(self.local_path, "pkg1.zip"), "rb") as fp:
+            self.assertEqual(fp.read(), b"y" * 4000 + self.content[4000:])
+
+    def test_download_files_discards_partial_file_of_other_source(self):
+        source = self.remote_source("scl/pkg1.zip")
+        source["modify"] = "20000101000000"
+        self.write_part(b"x" * 4000, source)
+        ftp = ftp_service.FTPService(self.address, "user", "pswd")
+        ftp.download_files(self.local_path, "scl")
+        with open(os.path.join(self.local_path, "pkg1.zip"), "rb") as fp:
+            self.assertEqual(fp.read(), self.content)
+
+    def test_download_file_keeps_remote_file_if_sizes_differ(self):
+        os.makedirs(self.local_path)
+        ftp = ftp_service.FTPService(self.address, "user", "pswd")
+        try:
+            name = ftp.download_and_delete_file(
+                self.local_path, "scl/pkg1.zip", len(self.content) + 1)
+        finally:
+            ftp.close()
+        self.assertEqual(name, "")
+        self.assertTrue(
+            os.path.isfile(os.path.join(self.ftp_root, "scl", "pkg1.zip")))
+        self.assertFalse(
+            os.path.isfile(os.path.join(self.local_path, "pkg1.zip")))
+
+    def test_download_files_of_missing_folder(self):
+        ftp = ftp_service.FTPService(self.address, "user", "pswd")
+        self.assertEqual(ftp.download_files(self.local_path, "missing"), [])
+
+    def test_download_files_postpones_files_with_same_name(self):
+        with open(os.path.join(self.ftp_root, "scl", "abc", "pkg1.zip"),
+                  "wb") as fp:
+            fp.write(b"other")
+        ftp = ftp_service.FTPService(self.address, "user", "pswd", 2)
+        files = ftp.download_files(self.local_path, "scl")
+        self.assertEqual(sorted(files), ["pkg1.zip", "pkg2.tgz"])
+        with open(os.path.join(self.local_path, "pkg1.zip"), "rb") as fp:
+            self.assertEqual(fp.read(), self.content)
+        self.assertTrue(os.path.isfile(
+            os.path.join(self.ftp_root, "scl", "abc", "pkg1.zip")))
+
+
+class TestSplitSameNames(TestCase):
+
+    def test_split_same_names(self):
+        selected, postponed = ftp_service.split_same_names(
+            [("scl/a/pkg.zip", 1), ("scl/b/pkg.zip", 2), ("scl/c.zip", 3)])
+        self.assertEqual(selected, [("scl/a/pkg.zip", 1), ("scl/c.zip", 3)])
+        self.assertEqual(postponed, [("scl/b/pkg.zip", 2)])
@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import TestCase
+
+from prodtools.reports import html_reports
+
+
+class TestHTMLWriter(TestCase):
+
+    def test_write_applies_replacements_to_each_part(self):
+        output = StringIO()
+        writer = html_reports.HTMLWriter(
+            output, [("{IMG_PATH}", "/img"), ("{PDF_PATH}", None)])
+        writer.write('<img src="{IMG_PATH}/a.jpg"/>', None, "{PDF_PATH}x")
+        self.assertEqual(output.getvalue(), '<img src="/img/a.jpg"/>x')
+
+    def test_tabbed_report_write_is_equal_to_report_content(self):
+        report = html_reports.TabbedReport(
+            {"a": "A", "b": "B"}, ["a", "b", "c"],
+            {"a": "<p>a</p>", "b": "<p>b</p>"}, "a")
+        output = StringIO()
+        report.write(html_reports.HTMLWriter(output))
+        self.assertEqual(output.getvalue(), report.report_content)
+        self.assertIn('<div id="tab-content-b" class="not-selected-tab-content">'
+                      '<p>b</p></div>', output.getvalue())
+
+
+class TestOpenReport(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_open_report_writes_the_same_html_as_html(self):
+        body = "<p>report</p><mml:math/>"
+        filename = os.path.join(self.path, "reports", "xc.html")
+        with html_reports.open_report(filename, "Title", True) as writer:
+            writer.write("<p>report</p>", "<mml:math/>")
+        with open(filename, encoding="utf-8") as fp:
+            content = fp.read()
+        expected = html_reports.html("Title", body)
+        # a data/hora do relatório pode mudar entre as duas chamadas
+        self.assertEqual(len(content), len(expected))
+        self.assertEqual(content[-500:], expected[-500:])
+        self.assertFalse(os.path.isfile(filename + ".tmp"))
+
+    def test_open_report_removes_temporary_file_on_error(self):
+        filename = os.path.join(self.path, "xc.html")
+        with self.assertRaises(ValueError):
+            with html_reports.open_report(filename, "Title") as writer:
+                writer.write("<p>partial</p>")
+                raise ValueError("error")
+        self.assertEqual(os.listdir(self.path), [])
+
+
+class TestSheet(TestCase):
+
+    def test_sheet_build_creates_one_row_for_each_item(self):
+        result = html_reports.sheet_build(
+            ["label", "status"],
+            [{"label": "a", "status": "[OK]"},
+             {"label": "b", "status": "[ERROR]"}])
+        self.assertEqual(result.count("<tr"), 3)
+        self.assertIn('<tr class="error">', result)
@@ -0,0 +1,63 @@
+import os
+import shutil
+import tempfile
+import zipfile
+from unittest import TestCase
+
+from prodtools.server import intake
+
+
+class TestPackageIntake(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def create_zip(self, name, files):
+        zip_path = os.path.join(self.path, name)
+        with zipfile.ZipFile(zip_path, "w") as zipf:
+            for file_name, content in files.items():
+                zipf.writestr(file_name, content)
+        return zip_path
+
+    def test_inspect_accepts_package_with_xml(self):
+        zip_path = self.create_zip(
+            "pkg.zip", {"a01.xml": "<article/>", "a01.pdf": "pdf"})
+        metrics = intake.PackageIntake().inspect(zip_path)
+        self.assertTrue(metrics["accepted"])
+        self.assertIsNone(metrics["reason"])
+        self.assertEqual(metrics["members"], 2)
+        self.assertEqual(metrics["xml"], 1)
+
+    def test_inspect_rejects_package_without_xml(self):
+        zip_path = self.create_zip("pkg.zip", {"a01.pdf": "pdf"})
+        metrics = intake.PackageIntake().inspect(zip_path)
+        self.assertFalse(metrics["accepted"])
+        self.assertEqual(metrics["reason"], "no XML files")
+
+    def test_inspect_rejects_package_which_exceeds_limits(self):
+        zip_path = self.create_zip(
+            "pkg.zip", {"a01.xml": "<article/>", "a01.pdf": "x" * 100})
+        metrics = intake.PackageIntake(max_members=1).inspect(zip_path)
+        self.assertTrue(metrics["reason"].startswith("too many files"))
+        metrics = intake.PackageIntake(max_size=100).inspect(zip_path)
+        self.assertTrue(metrics["reason"].startswith("too large"))
+
+    def test_inspect_rejects_invalid_archive(self):
+        zip_path = os.path.join(self.path, "pkg.zip")
+        with open(zip_path, "w") as fp:
+            fp.write("not a zip")
+        metrics = intake.PackageIntake().inspect(zip_path)
+        self.assertEqual(metrics["reason"], "invalid archive")
+
+    def test_archive_package_creates_hard_link(self):
+        zip_path = self.create_zip("pkg.zip", {"a01.xml": "<article/>"})
+        archive_path = os.path.join(self.path, "archive")
+        os.makedirs(archive_path)
+        archived = intake.archive_package(zip_path, archive_path)
+        self.assertTrue(os.path.samefile(zip_path, archived))
+        # arquivar novamente substitui o arquivo anterior
+        archived = intake.archive_package(zip_path, archive_path)
+        self.assertTrue(os.path.samefile(zip_path, archived))
@@ -52,11 +52,15 @@ class TestKernelDocumentAddArticleIdToReceivedDocuments(unittest.TestCase):
             except IOError:
                 pass
 
-    def _return_scielo_pid_v3_if_aop_pid_match(self, pid):
-        """Representa a busca pelo PID v3 a partir do PID v2"""
-        if pid == "AOPPID":
-            return "pid-v3-registrado-anteriormente-para-documento-aop"
-        return "brzWFrVFdpYMXdpvq7dDJBQ"
+    def _return_scielo_pid_v3_if_aop_pid_match(self, v2_list):
+        """Representa a busca pelos PIDs v3 a partir dos PIDs v2"""
+        found = {}
+        for pid in v2_list:
+            if pid == "AOPPID":
+                found[pid] = "pid-v3-registrado-anteriormente-para-documento-aop"
+            elif pid:
+                found[pid] = "brzWFrVFdpYMXdpvq7dDJBQ"
+        return found
 
     def test_add_article_id_to_received_documents(self):
         registered = {}
@@ -75,7 +79,7 @@ class TestKernelDocumentAddArticleIdToReceivedDocuments(unittest.TestCase):
         year_and_order = "20173"
 
         mock_pid_manager = Mock()
-        mock_pid_manager.get_pid_v3.return_value = None
+        mock_pid_manager.get_many_pid_v3.return_value = {}
 
         kernel_document.scielo_id_gen.generate_scielo_pid = Mock(return_value="xxxxxx")
         kernel_document.add_article_id_to_received_documents(
@@ -104,7 +108,7 @@ class TestKernelDocumentAddArticleIdToReceivedDocuments(unittest.TestCase):
             article.registered_aop_pid = "AOPPID"
 
         mock_pid_manager = Mock()
-        mock_pid_manager.get_pid_v3 = self._return_scielo_pid_v3_if_aop_pid_match
+        mock_pid_manager.get_many_pid_v3 = self._return_scielo_pid_v3_if_aop_pid_match
 
         kernel_document.add_article_id_to_received_documents(
             pid_manager=mock_pid_manager,
@@ -116,10 +120,10 @@ class TestKernelDocumentAddArticleIdToReceivedDocuments(unittest.TestCase):
             update_article_with_aop_status=_update_article_with_aop_pid,
         )
 
-        mock_pid_manager.register.assert_called_with(
+        mock_pid_manager.register_many.assert_called_with([(
             "S9876-34562017000312345",
             "pid-v3-registrado-anteriormente-para-documento-aop",
-        )
+        )])
 
     def test_pid_manager_should_try_to_register_pids_even_it_already_exists_in_xml(
         self,
@@ -137,7 +141,7 @@ class TestKernelDocumentAddArticleIdToReceivedDocuments(unittest.TestCase):
             update_article_with_aop_status=lambda _: _,
         )
 
-        self.assertTrue(mock_pid_manager.register.called)
+        self.assertTrue(mock_pid_manager.register_many.called)
 
     def test_add_pids_to_etree_should_return_none_if_etree_is_not_valid(self):
         self.assertIsNone(kernel_document.add_article_id_to_etree(None, []))
@@ -213,6 +217,45 @@ class TestKernelDocumentAddArticleIdToReceivedDocuments(unittest.TestCase):
         self.assertTrue(mk.called)
 
 
+    def test_add_article_id_updates_loaded_tree_and_writes_file_once(self):
+        from prodtools.data.article import Article as PackageArticle
+
+        with open("file1.xml", "wb") as fp:
+            fp.write(
+                b'<article><front><article-meta>'
+                b'<article-id pub-id-type="other">12345</article-id>'
+                b'</article-meta></front></article>')
+        tree = etree.parse("file1.xml")
+        article = PackageArticle(tree, "file1")
+        pid_manager = Mock()
+        pid_manager.get_many_pid_v3.return_value = {}
+        with patch(
+                "prodtools.data.kernel_document.xml_utils.get_xml_object"
+                ) as mk_parse:
+            kernel_document.add_article_id_to_received_documents(
+                pid_manager=pid_manager,
+                issn_id="9876-3456",
+                year_and_order="20173",
+                received_docs={"file1": article},
+                documents_in_isis={},
+                file_paths={"file1": "file1.xml"},
+                update_article_with_aop_status=lambda _: _,
+            )
+        self.assertFalse(mk_parse.called)
+        self.assertEqual(
+            article.get_scielo_pid("v2"), "S9876-34562017000312345")
+        self.assertIn("S9876-34562017000312345", article.xml)
+        with open("file1.xml") as fp:
+            self.assertIn("S9876-34562017000312345", fp.read())
+
+    def test_add_article_id_to_tree_does_not_modify_tree_with_same_ids(self):
+        tree = etree.parse("file1.xml")
+        items = [("S9876-34562017000312345", "scielo-v2")]
+        self.assertTrue(kernel_document.add_article_id_to_tree(tree, items))
+        self.assertFalse(kernel_document.add_article_id_to_tree(tree, items))
+        self.assertEqual(len(tree.findall(".//article-id")), 1)
+
+
 class TestKernelDocument(unittest.TestCase):
     """docstring for TestKernelDocument"""
 
@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from prodtools.server import outbox
+
+
+class TestOutbox(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.outbox = outbox.Outbox(os.path.join(self.path, "outbox.db"))
+        self.executed = []
+        self.failures = []
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def workers(self, handlers, **kwargs):
+        return outbox.OutboxWorkers(
+            self.outbox, handlers, on_failure=self.failures.append, **kwargs)
+
+    def test_run_pending_executes_tasks(self):
+        self.outbox.add("mail", {"package": "pkg1"}, "pkg1")
+        self.outbox.add("report", {"acron": "abc"}, "pkg1")
+        workers = self.workers({
+            "mail": self.executed.append, "report": self.executed.append})
+        self.assertEqual(workers.run_pending(), 2)
+        self.assertEqual(
+            self.executed, [{"package": "pkg1"}, {"acron": "abc"}])
+        self.assertEqual(
+            [t["status"] for t in self.outbox.tasks()], ["done", "done"])
+
+    def test_failed_task_is_retried_later(self):
+        def handler(payload):
+            raise IOError("smtp error")
+        self.outbox.add("mail", {}, "pkg1")
+        workers = self.workers({"mail": handler}, backoff=60)
+        workers.run_pending()
+        task = self.outbox.tasks()[0]
+        self.assertEqual(task["status"], "pending")
+        self.assertEqual(task["error"], "smtp error")
+        self.assertEqual(workers.run_pending(), 0)
+        self.assertEqual(self.failures, [])
+
+    def test_task_fails_after_max_attempts(self):
+        def handler(payload):
+            raise IOError("smtp error")
+        self.outbox.add("mail", {}, "pkg1")
+        workers = self.workers({"mail": handler}, backoff=0, max_attempts=2)
+        workers.run_pending()
+        self.assertEqual(self.outbox.tasks()[0]["status"], "failed")
+        self.assertEqual(self.failures[0]["package"], "pkg1")
+        self.outbox.retry(self.failures[0]["id"])
+        self.assertEqual(self.outbox.tasks()[0]["status"], "pending")
+
+    def test_ordered_tasks_wait_for_the_previous_one(self):
+        calls = []
+
+        def handler(payload):
+            calls.append(payload["items"])
+            if len(calls) == 1:
+                raise IOError("scilista is locked")
+        self.outbox.add("scilista", {"items": ["abc v1n1"]})
+        self.outbox.add("scilista", {"items": ["abc v1n2"]})
+        workers = self.workers({"scilista": handler}, backoff=60)
+        self.assertEqual(workers.run_pending(ordered=True), 1)
+        self.assertEqual(workers.run_pending(ordered=True), 0)
+        self.assertEqual(workers.run_pending(), 0)
+        self.assertEqual(calls, [["abc v1n1"]])
+
+    def test_background_workers(self):
+        workers = self.workers({
+            "scilista": self.executed.append, "mail": self.executed.append})
+        workers.start()
+        try:
+            for i in range(5):
+                self.outbox.add("scilista", {"items": [str(i)]})
+            self.outbox.add("mail", {"package": "pkg1"})
+            workers.notify()
+            self.assertTrue(workers.wait(10))
+        finally:
+            workers.stop()
+        self.assertEqual(
+            [item for item in self.executed if "items" in item],
+            [{"items": [str(i)]} for i in range(5)])
+        self.assertEqual(len(self.executed), 6)
+
+    def test_recover_returns_interrupted_tasks_to_the_queue(self):
+        self.outbox.add("mail", {})
+        self.outbox.claim()
+        self.outbox.recover()
+        self.assertEqual(self.outbox.tasks()[0]["status"], "pending")
+
+    def test_recover_keeps_tasks_of_other_running_process(self):
+        self.outbox.add("mail", {})
+        self.outbox.add("mail", {})
+        for pid in (os.getppid(), 0):
+            task = self.outbox.claim()
+            with self.outbox.transaction() as conn:
+                conn.execute(
+                    "UPDATE tasks SET pid = ? WHERE id = ?", (pid, task["id"]))
+        self.outbox.recover()
+        self.assertEqual(
+            [task["status"] for task in self.outbox.tasks()],
+            ["running", "pending"])
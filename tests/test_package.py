@@ -0,0 +1,34 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from prodtools.data import package
+from prodtools.utils import archive
+
+
+class TestSPPackageZip(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.pkg_path = os.path.join(self.path, "pkg")
+        os.makedirs(self.pkg_path)
+        with open(os.path.join(self.pkg_path, "a01.xml"), "w") as fp:
+            fp.write("<article/>")
+        self.pkg = package.SPPackage(
+            self.pkg_path, os.path.join(self.path, "output"), ["a01"])
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_zip_creates_package_zip(self):
+        self.assertTrue(self.pkg.zip())
+        self.assertTrue(os.path.isfile(self.pkg_path + ".zip"))
+
+    @patch("prodtools.data.package.encoding.display_message")
+    def test_zip_reports_failure_without_raising(self, mock_display):
+        with patch("prodtools.utils.fs_utils.archive.zip_files",
+                   side_effect=archive.ArchiveError("disk full")):
+            self.assertFalse(self.pkg.zip())
+        self.assertIn("disk full", mock_display.call_args[0][0])
@@ -13,7 +13,10 @@ class TestPIDVersionsManager(unittest.TestCase):
         self.manager.register("pid-2", "pid-3")
 
     def tearDown(self):
-        os.remove(self.temporary_db)
+        self.manager.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.isfile(self.temporary_db + suffix):
+                os.remove(self.temporary_db + suffix)
 
     def test_should_raise_exception_when_could_not_open_database_file(self):
         with self.assertRaises(sqlite3.OperationalError):
@@ -35,3 +38,26 @@ class TestPIDVersionsManager(unittest.TestCase):
 
     def test_check_if_pids_already_registered_in_database(self):
         self.assertTrue(self.manager.pids_already_registered("pid-2", "pid-3"))
+
+    def test_get_many_pid_v3_returns_registered_pids(self):
+        self.manager.register("pid-2b", "pid-3b")
+        self.assertEqual(
+            self.manager.get_many_pid_v3(["pid-2", "pid-2b", "unknown", None]),
+            {"pid-2": "pid-3", "pid-2b": "pid-3b"})
+
+    def test_register_many_ignores_registered_pairs(self):
+        result = self.manager.register_many(
+            [("pid-2", "pid-3"), ("new-2", "new-3"), ("new-2b", "new-3b")])
+        self.assertEqual(result, 2)
+        self.assertEqual(self.manager.get_pid_v3("new-2b"), "new-3b")
+        self.assertEqual(self.manager.db.metrics["transactions"], 1)
+
+    def test_database_uses_wal_journal_mode(self):
+        self.assertEqual(
+            self.manager.db.fetch("PRAGMA journal_mode", ())[0][0], "wal")
+
+    def test_search_by_pid_v2_uses_index(self):
+        plan = self.manager.db.fetch(
+            "EXPLAIN QUERY PLAN SELECT v3 FROM pid_versions WHERE v2 = ?",
+            ("pid-2",))
+        self.assertIn("USING", " ".join(str(row[-1]) for row in plan))
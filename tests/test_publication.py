@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from prodtools.utils import publication
+
+
+XML = (
+    '<?xml version="1.0" encoding="utf-8"?>\n'
+    '<!DOCTYPE article PUBLIC "-//NLM//DTD JATS (Z39.96) Journal Publishing '
+    'DTD v1.1 20151215//EN" '
+    '"https://jats.nlm.nih.gov/publishing/1.1/JATS-journalpublishing1.dtd">\n'
+    '<article>\n  <front/>\n</article>\n'
+)
+
+
+class TestPublishFile(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.src = os.path.join(self.path, "a01.pdf")
+        with open(self.src, "wb") as fp:
+            fp.write(b"pdf content")
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_publish_file_creates_destination(self):
+        dest = os.path.join(self.path, "web", "a01.pdf")
+        result = publication.publish_file(self.src, dest)
+        self.assertIn(result, (publication.CLONED, publication.COPIED))
+        with open(dest, "rb") as fp:
+            self.assertEqual(fp.read(), b"pdf content")
+
+    def test_publish_file_skips_identical_file(self):
+        dest = os.path.join(self.path, "web", "a01.pdf")
+        publication.publish_file(self.src, dest)
+        self.assertEqual(
+            publication.publish_file(self.src, dest), publication.SKIPPED)
+
+    def test_publish_file_replaces_different_file(self):
+        dest = os.path.join(self.path, "a02.pdf")
+        with open(dest, "wb") as fp:
+            fp.write(b"old content")
+        publication.publish_file(self.src, dest)
+        with open(dest, "rb") as fp:
+            self.assertEqual(fp.read(), b"pdf content")
+
+    def test_publish_file_links_if_allowed(self):
+        dest = os.path.join(self.path, "web", "a01.pdf")
+        result = publication.publish_file(self.src, dest, allow_link=True)
+        self.assertEqual(result, publication.LINKED)
+        self.assertTrue(os.path.samefile(self.src, dest))
+
+    def test_publish_file_does_not_change_linked_file_in_place(self):
+        dest = os.path.join(self.path, "web", "a01.pdf")
+        publication.publish_file(self.src, dest, allow_link=True)
+        other = os.path.join(self.path, "other.pdf")
+        with open(other, "wb") as fp:
+            fp.write(b"new content")
+        publication.publish_file(other, dest)
+        with open(self.src, "rb") as fp:
+            self.assertEqual(fp.read(), b"pdf content")
+
+
+class TestPublishXMLWithLocalDTD(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.src = os.path.join(self.path, "a01.xml")
+        with open(self.src, "w") as fp:
+            fp.write(XML)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_publish_xml_with_local_dtd_replaces_dtd_url_by_file_name(self):
+        dest = os.path.join(self.path, "web", "a01.xml")
+        publication.publish_xml_with_local_dtd(self.src, dest)
+        with open(dest) as fp:
+            self.assertEqual(
+                fp.read(),
+                XML.replace(
+                    "https://jats.nlm.nih.gov/publishing/1.1/", ""))
+
+    def test_publish_xml_with_local_dtd_skips_identical_file(self):
+        dest = os.path.join(self.path, "web", "a01.xml")
+        publication.publish_xml_with_local_dtd(self.src, dest)
+        self.assertEqual(
+            publication.publish_xml_with_local_dtd(self.src, dest),
+            publication.SKIPPED)
+
+    def test_publish_xml_without_doctype_is_copied(self):
+        with open(self.src, "w") as fp:
+            fp.write("<article/>")
+        dest = os.path.join(self.path, "web", "a01.xml")
+        publication.publish_xml_with_local_dtd(self.src, dest)
+        with open(dest) as fp:
+            self.assertEqual(fp.read(), "<article/>")
@@ -0,0 +1,122 @@
+import os
+import shutil
+import tempfile
+import threading
+from unittest import TestCase
+from unittest.mock import patch
+
+from prodtools.server import reception_queue
+
+
+class TestReceptionQueue(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.state_path = os.path.join(self.path, ".state")
+        self.packages = []
+        for name in ("pkg1", "pkg2", "pkg3"):
+            package_path = os.path.join(self.path, name)
+            os.makedirs(package_path)
+            self.packages.append(package_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_run_converts_all_packages_and_clears_state(self):
+        converted = []
+        queue = reception_queue.ReceptionQueue(self.state_path, 2)
+        result = queue.run(converted.append, self.packages)
+        self.assertEqual(sorted(converted), self.packages)
+        self.assertEqual(list(result.values()), [True, True, True])
+        self.assertEqual(list(queue.state.items()), [])
+
+    def test_run_converts_packages_in_scheduler_order(self):
+        class ReverseScheduler(object):
+            started_packages = []
+
+            def order(self, package_paths, queued_times):
+                return sorted(package_paths, reverse=True)
+
+            def started(self, package_path, waited):
+                self.started_packages.append(package_path)
+
+        converted = []
+        queue = reception_queue.ReceptionQueue(
+            self.state_path, 1, ReverseScheduler())
+        queue.run(converted.append, self.packages)
+        self.assertEqual(converted, self.packages[::-1])
+        self.assertEqual(queue.scheduler.started_packages, converted)
+
+    def test_run_registers_failed_package(self):
+        def convert(package_path):
+            if package_path.endswith("pkg2"):
+                raise ValueError("conversion error")
+
+        queue = reception_queue.ReceptionQueue(self.state_path, 2)
+        result = queue.run(convert, self.packages)
+        self.assertFalse(result[self.packages[1]])
+        self.assertEqual(
+            queue.state.read(self.packages[1])["status"],
+            reception_queue.FAILED)
+
+    @patch("prodtools.server.reception_queue.is_running_process",
+           return_value=False)
+    def test_run_retries_package_of_crashed_worker(self, mock_running):
+        state = reception_queue.QueueState(self.state_path)
+        state.write(self.packages[0], reception_queue.RUNNING)
+
+        converted = []
+        queue = reception_queue.ReceptionQueue(self.state_path, 1)
+        queue.run(converted.append, [])
+        self.assertEqual(converted, [self.packages[0]])
+
+    @patch("prodtools.server.reception_queue.is_running_process",
+           return_value=False)
+    def test_recover_gives_up_after_max_attempts(self, mock_running):
+        state = reception_queue.QueueState(self.state_path)
+        for i in range(reception_queue.MAX_ATTEMPTS):
+            state.write(self.packages[0], reception_queue.RUNNING)
+        self.assertEqual(state.recover(), [])
+        self.assertEqual(
+            state.read(self.packages[0])["status"], reception_queue.FAILED)
+
+    def test_recover_ignores_package_which_no_longer_exists(self):
+        state = reception_queue.QueueState(self.state_path)
+        state.write(self.packages[0], reception_queue.QUEUED)
+        shutil.rmtree(self.packages[0])
+        self.assertEqual(state.recover(), [])
+        self.assertIsNone(state.read(self.packages[0]))
+
+
+class TestIssueLocks(TestCase):
+
+    def test_get_returns_the_same_lock_for_the_same_key(self):
+        locks = reception_queue.IssueLocks()
+        self.assertIs(locks.get("1234-5678"), locks.get("1234-5678"))
+        self.assertIsNot(locks.get("1234-5678"), locks.get("0000-0000"))
+
+    def test_packages_of_same_journal_are_serialized(self):
+        locks = reception_queue.IssueLocks()
+        running = []
+        overlaps = []
+
+        def convert(package_path):
+            with locks.get("1234-5678"):
+                running.append(package_path)
+                if len(running) > 1:
+                    overlaps.append(package_path)
+                threading.Event().wait(0.01)
+                running.remove(package_path)
+
+        path = tempfile.mkdtemp()
+        try:
+            packages = []
+            for name in ("a", "b", "c"):
+                os.makedirs(os.path.join(path, name))
+                packages.append(os.path.join(path, name))
+            queue = reception_queue.ReceptionQueue(
+                os.path.join(path, ".state"), 3)
+            queue.run(convert, packages)
+        finally:
+            shutil.rmtree(path)
+        self.assertEqual(overlaps, [])
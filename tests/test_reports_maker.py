@@ -7,6 +7,7 @@ from prodtools.validations.reports_maker import (
     AssetsInReport,
     BasicAssetsInReport,
     CollectionAssetsInReport,
+    label_errors,
 )
 
 
@@ -393,3 +394,19 @@ class TestCollectionAssetsInReportValidateSaveReport(TestCase):
         self.data.save_report(str(report_path))
         path_result = pathlib.Path(self.data.report_path) / "doc.xml"
         self.assertEqual(path_result.read_text(), xml_text)
+
+
+class TestLabelErrors(TestCase):
+
+    def test_label_errors_numbers_each_error_type(self):
+        content = (
+            "<p>[ERROR] a</p><p>[FATAL ERROR] b</p><p>[ERROR] c</p>"
+            "<p>[WARNING] d</p><p>[BLOCKING ERROR] e</p><p>[OK] f</p>")
+        self.assertEqual(
+            label_errors(content),
+            "<p>[ERROR] [E1] a</p><p>[FATAL ERROR] [F1] b</p>"
+            "<p>[ERROR] [E2] c</p><p>[WARNING] [W1] d</p>"
+            "<p>[BLOCKING ERROR] [B1] e</p><p>[OK] f</p>")
+
+    def test_label_errors_returns_empty_str_for_none(self):
+        self.assertEqual(label_errors(None), "")
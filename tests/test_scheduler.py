@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from prodtools.server import scheduler
+
+
+XML = (
+    '<?xml version="1.0" encoding="utf-8"?>\n'
+    '<article article-type="{article_type}">\n'
+    '<front><journal-meta><issn pub-type="epub">{issn}</issn>'
+    '</journal-meta><article-meta>{ids}{volume}{issue}'
+    '</article-meta></front></article>\n'
+)
+
+
+class TestScheduler(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def make_package(self, name, documents=1, issn="1234-5678",
+                     article_type="research-article", volume="10",
+                     issue="2", previous_pid=False, images=0):
+        package_path = os.path.join(self.path, name)
+        os.makedirs(package_path)
+        for i in range(documents):
+            with open(os.path.join(package_path, "a%02i.xml" % i), "w") as fp:
+                fp.write(XML.format(
+                    article_type=article_type, issn=issn,
+                    ids=(
+                        '<article-id specific-use="previous-pid">'
+                        'S1234-56782019005000001</article-id>'
+                        if previous_pid else ''),
+                    volume="<volume>%s</volume>" % volume if volume else "",
+                    issue="<issue>%s</issue>" % issue if issue else ""))
+        for i in range(images):
+            with open(os.path.join(package_path, "a%02i.jpg" % i), "wb") as fp:
+                fp.write(b"jpg")
+        return package_path
+
+    def test_package_info(self):
+        info = scheduler.PackageInfo(
+            self.make_package("pkg", documents=3, images=2))
+        self.assertEqual(info.documents, 3)
+        self.assertEqual(info.images, 2)
+        self.assertEqual(info.journal, "1234-5678")
+        self.assertEqual(info.priority_class, scheduler.REGULAR)
+
+    def test_priority_classes(self):
+        cases = (
+            ({"article_type": "correction"}, scheduler.ERRATA),
+            ({"previous_pid": True}, scheduler.EX_AOP),
+            ({"volume": None, "issue": None}, scheduler.AOP),
+            ({"issue": "2 pr"}, scheduler.PRESS_RELEASE),
+            ({}, scheduler.REGULAR),
+        )
+        for i, (kwargs, expected) in enumerate(cases):
+            with self.subTest(expected=expected):
+                info = scheduler.PackageInfo(
+                    self.make_package("pkg%i" % i, **kwargs))
+                self.assertEqual(info.priority_class, expected)
+
+    def test_order_puts_urgent_and_small_packages_first(self):
+        supplement = self.make_package("supplement", documents=30)
+        regular = self.make_package("regular", documents=2, issn="0000-0000")
+        errata = self.make_package("errata", article_type="correction")
+        ordered = scheduler.Scheduler().order([supplement, regular, errata])
+        self.assertEqual(ordered, [errata, regular, supplement])
+
+    def test_order_alternates_journals(self):
+        a1 = self.make_package("a1", documents=1, issn="1111-1111")
+        a2 = self.make_package("a2", documents=2, issn="1111-1111")
+        b1 = self.make_package("b1", documents=5, issn="2222-2222")
+        ordered = scheduler.Scheduler().order([a1, a2, b1])
+        self.assertEqual(ordered, [a1, b1, a2])
+
+    def test_aging_raises_priority_of_waiting_package(self):
+        supplement = self.make_package("supplement", documents=30)
+        pr = self.make_package("pr", issue="2 pr", issn="0000-0000")
+        _scheduler = scheduler.Scheduler(aging_interval=60)
+        ordered = _scheduler.order(
+            [supplement, pr], {supplement: 1000 - 120}, now=1000)
+        self.assertEqual(ordered, [supplement, pr])
+
+    def test_metrics(self):
+        pkg = self.make_package("pkg")
+        _scheduler = scheduler.Scheduler()
+        _scheduler.order([pkg])
+        self.assertEqual(_scheduler.metrics()["waiting"][0]["package"], pkg)
+        _scheduler.started(pkg, 12)
+        metrics = _scheduler.metrics()
+        self.assertEqual(metrics["waiting"], [])
+        self.assertEqual(
+            metrics["queue_wait"][scheduler.REGULAR],
+            {"count": 1, "avg": 12, "max": 12})
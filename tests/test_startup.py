@@ -0,0 +1,70 @@
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+from unittest import TestCase
+
+from prodtools.utils import startup_profile
+
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+# orçamento (em segundos) para importar cada ponto de entrada; generoso
+# para não falhar em máquinas lentas, mas detecta importações pesadas
+# no início (packtools, tkinter, leitura de arquivos etc)
+IMPORT_TIME_BUDGET = 1.5
+
+
+def run_import(module_name, cwd):
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import {}\n"
+        "print(time.perf_counter() - start)\n"
+        "print(' '.join(sorted(sys.modules)))\n"
+    ).format(module_name)
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT_PATH
+    output = subprocess.check_output(
+        [sys.executable, "-c", code], cwd=cwd, env=env,
+        universal_newlines=True)
+    duration, modules = output.strip().splitlines()[-2:]
+    return float(duration), modules.split()
+
+
+class TestStartup(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.cwd = os.path.join(self.path, "bin")
+        os.makedirs(self.cwd)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_entry_points_are_imported_within_budget(self):
+        for module_name in startup_profile.ENTRY_POINTS:
+            with self.subTest(module_name=module_name):
+                duration, modules = run_import(module_name, self.cwd)
+                self.assertLess(duration, IMPORT_TIME_BUDGET)
+                self.assertNotIn("packtools", modules)
+
+    def test_import_has_no_side_effects(self):
+        run_import("prodtools.xc_server", self.cwd)
+        self.assertEqual(os.listdir(self.path), ["bin"])
+        self.assertEqual(os.listdir(self.cwd), [])
+
+
+class TestParseImportTime(TestCase):
+
+    def test_parse_importtime(self):
+        output = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   prodtools.config\n"
+            "import time:       300 |        420 | prodtools\n"
+        )
+        items = startup_profile.parse_importtime(output)
+        self.assertEqual(
+            [(i.name, i.self_time, i.cumulative, i.level) for i in items],
+            [("prodtools.config", 120, 120, 1), ("prodtools", 300, 420, 0)])
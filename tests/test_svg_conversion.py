@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from PIL import Image
+
+from prodtools.utils import svg_conversion
+
+
+class TestImageConverter(TestCase):
+
+    def setUp(self):
+        self.image_path = tempfile.mkdtemp()
+        self.cache_path = tempfile.mkdtemp()
+        Image.new("RGB", (10, 10)).save(
+            os.path.join(self.image_path, "a01.png"), "PNG")
+        Image.new("RGB", (20, 10)).save(
+            os.path.join(self.image_path, "a02.png"), "PNG")
+
+    def tearDown(self):
+        shutil.rmtree(self.image_path)
+        shutil.rmtree(self.cache_path)
+
+    def test_png2tiff_converts_all_png_files(self):
+        converter = svg_conversion.ImageConverter(cache_path=self.cache_path)
+        result = converter.png2tiff(self.image_path)
+        self.assertEqual(
+            sorted(os.path.basename(dest) for src, dest in result),
+            ["a01.tif", "a02.tif"])
+        self.assertEqual(converter.stats.converted, 2)
+        self.assertEqual(converter.stats.cached, 0)
+
+    def test_png2tiff_reuses_cached_conversion(self):
+        svg_conversion.ImageConverter(
+            cache_path=self.cache_path).png2tiff(self.image_path)
+        converter = svg_conversion.ImageConverter(cache_path=self.cache_path)
+        result = converter.png2tiff(self.image_path, force=True)
+        self.assertEqual(len(result), 2)
+        self.assertEqual(converter.stats.converted, 0)
+        self.assertEqual(converter.stats.cached, 2)
+
+    def test_png2tiff_skips_existing_tiff(self):
+        converter = svg_conversion.ImageConverter(cache_path=self.cache_path)
+        converter.png2tiff(self.image_path)
+        self.assertEqual(converter.png2tiff(self.image_path), [])
+
+    @patch("prodtools.utils.svg_conversion.is_inkscape_installed",
+           return_value=False)
+    def test_svg2png_returns_empty_list_if_inkscape_is_not_installed(
+            self, mock_installed):
+        with open(os.path.join(self.image_path, "a03.svg"), "w") as fp:
+            fp.write("<svg/>")
+        converter = svg_conversion.ImageConverter(cache_path=self.cache_path)
+        self.assertEqual(converter.svg2png(self.image_path), [])
+
+    def test_cache_is_not_used_if_other_users_can_write_it(self):
+        os.chmod(self.cache_path, 0o777)
+        converter = svg_conversion.ImageConverter(cache_path=self.cache_path)
+        converter.png2tiff(self.image_path)
+        self.assertFalse(converter.cache_enabled)
+        self.assertEqual(os.listdir(self.cache_path), [])
+
+    def test_new_cache_is_private(self):
+        cache_path = os.path.join(self.cache_path, "img_cache")
+        converter = svg_conversion.ImageConverter(cache_path=cache_path)
+        converter.png2tiff(self.image_path)
+        self.assertEqual(len(os.listdir(cache_path)), 2)
+        self.assertEqual(os.stat(cache_path).st_mode & 0o777, 0o700)
+
+    def test_cache_is_pruned_to_max_size(self):
+        converter = svg_conversion.ImageConverter(
+            cache_path=self.cache_path, cache_max_size=1)
+        converter.png2tiff(self.image_path)
+        self.assertEqual(os.listdir(self.cache_path), [])
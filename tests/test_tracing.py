@@ -0,0 +1,89 @@
+# coding=utf-8
+import os
+import json
+import shutil
+import tempfile
+from unittest import TestCase
+from concurrent.futures import ThreadPoolExecutor
+
+from prodtools.utils import tracing
+
+
+class Converter(object):
+
+    @tracing.traced()
+    def convert(self, name):
+        with tracing.span("convert_document", document=name) as span:
+            span.set(status="converted")
+        return name
+
+
+class TestTracing(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.path, "traces", "pkg.trace.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def read_events(self):
+        with open(self.file_path) as fp:
+            return json.load(fp)["traceEvents"]
+
+    def test_span_without_trace_does_nothing(self):
+        self.assertIsNone(tracing.current())
+        self.assertEqual(Converter().convert("a01"), "a01")
+        self.assertIsNone(tracing.current())
+
+    def test_trace_saves_nested_spans(self):
+        with tracing.Trace("convert_package", self.file_path, package="pkg"):
+            Converter().convert("a01")
+        self.assertIsNone(tracing.current())
+        events = self.read_events()
+        self.assertEqual(
+            [e["name"] for e in events],
+            ["convert_package", "Converter.convert", "convert_document"])
+        root, method, document = events
+        self.assertEqual(root["args"], {"package": "pkg"})
+        self.assertEqual(
+            document["args"], {"document": "a01", "status": "converted"})
+        for parent, child in ((root, method), (method, document)):
+            self.assertLessEqual(parent["ts"], child["ts"])
+            self.assertGreaterEqual(
+                parent["ts"] + parent["dur"], child["ts"] + child["dur"])
+        self.assertTrue(all(e["ph"] == "X" for e in events))
+
+    def test_span_records_error(self):
+        with self.assertRaises(ValueError):
+            with tracing.Trace("convert_package", self.file_path):
+                with tracing.span("evaluate_package"):
+                    raise ValueError("invalid")
+        events = self.read_events()
+        self.assertEqual(
+            [e["args"].get("error") for e in events],
+            ["ValueError", "ValueError"])
+
+    def test_bind_records_spans_of_other_threads(self):
+        with tracing.Trace("make_package", self.file_path) as trace:
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                convert = tracing.bind(Converter().convert)
+                results = list(executor.map(convert, ["a01", "a02", "a03"]))
+            self.assertIs(tracing.current(), trace)
+        self.assertEqual(results, ["a01", "a02", "a03"])
+        events = self.read_events()
+        self.assertEqual(
+            sorted(e["args"]["document"] for e in events
+                   if e["name"] == "convert_document"),
+            ["a01", "a02", "a03"])
+
+    def test_trace_without_file_path_is_not_saved(self):
+        with tracing.Trace("convert_package") as trace:
+            Converter().convert("a01")
+        self.assertEqual(len(trace.events), 3)
+        self.assertEqual(os.listdir(self.path), [])
+
+    def test_trace_file_path(self):
+        file_path = tracing.trace_file_path("/traces", "pkg")
+        self.assertTrue(file_path.startswith("/traces/pkg_"))
+        self.assertTrue(file_path.endswith(".trace.json"))
@@ -0,0 +1,184 @@
+import os
+import json
+import shutil
+import tempfile
+from unittest import TestCase
+from unittest.mock import Mock
+
+from prodtools.server import base_manifest
+from prodtools.server import filestransfer
+from prodtools.server import transfer_manager
+from prodtools.utils import remote_server
+
+
+class FailingServer(object):
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def sync(self, source, dest, timeout=None, files=None):
+        self.calls += 1
+        if self.calls <= self.failures:
+            return remote_server.SyncResult(12, output="connection error")
+        return remote_server.SyncResult(0, 10)
+
+    def __str__(self):
+        return "failing"
+
+
+class TestTransferManager(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.source = os.path.join(self.path, "web", "bases", "pdf", "abc")
+        os.makedirs(os.path.join(self.source, "v1n1"))
+        with open(os.path.join(self.source, "v1n1", "a01.pdf"), "wb") as fp:
+            fp.write(b"pdf content")
+        self.servers = [
+            remote_server.get_server(os.path.join(self.path, name), "user")
+            for name in ("server1", "server2")]
+        self.journal = os.path.join(self.path, "transfer.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_transfer_copies_to_all_servers(self):
+        manager = transfer_manager.TransferManager(
+            self.servers, journal_path=self.journal)
+        tasks = manager.transfer([(self.source, "/bases/pdf/abc")])
+        self.assertEqual([t.transferred_bytes for t in tasks], [11, 11])
+        for name in ("server1", "server2"):
+            self.assertTrue(os.path.isfile(os.path.join(
+                self.path, name, "bases", "pdf", "abc", "v1n1", "a01.pdf")))
+
+    def test_transfer_skips_unchanged_files(self):
+        manager = transfer_manager.TransferManager(self.servers)
+        manager.transfer([(self.source, "/bases/pdf/abc")])
+        tasks = manager.transfer([(self.source, "/bases/pdf/abc")])
+        self.assertEqual([t.transferred_bytes for t in tasks], [0, 0])
+
+    def test_transfer_retries_failed_task(self):
+        server = FailingServer(2)
+        manager = transfer_manager.TransferManager(
+            [server], backoff=0, journal_path=self.journal)
+        tasks = manager.transfer([(self.source, "/dest")])
+        self.assertEqual(tasks[0].attempts, 3)
+        self.assertTrue(tasks[0].ok)
+        with open(self.journal) as fp:
+            returncodes = [json.loads(line)["returncode"] for line in fp]
+        self.assertEqual(returncodes, [12, 12, 0])
+
+    def test_transfer_raises_error_after_max_attempts(self):
+        manager = transfer_manager.TransferManager(
+            [FailingServer(5)], max_attempts=2, backoff=0)
+        with self.assertRaises(transfer_manager.TransferError) as exc:
+            manager.transfer([(self.source, "/dest")])
+        self.assertEqual(exc.exception.failures[0].attempts, 2)
+
+    def test_transfer_fails_if_source_does_not_exist(self):
+        manager = transfer_manager.TransferManager(
+            self.servers[:1], max_attempts=1)
+        with self.assertRaises(transfer_manager.TransferError):
+            manager.transfer([(os.path.join(self.path, "x"), "/dest")])
+
+
+class TestRemoteServer(TestCase):
+
+    def test_sync_args_creates_dest_in_the_same_connection(self):
+        server = remote_server.RemoteServer("host:2222", "user")
+        self.assertEqual(
+            server.sync_args("/var/www/bases/pdf/abc", "/web/bases/pdf/abc"),
+            ["rsync", "-CrK", "--stats",
+             "--rsync-path", 'mkdir -p "/web/bases/pdf/abc" && rsync',
+             "-e", "ssh -p 2222",
+             "/var/www/bases/pdf/abc/", "user@host:/web/bases/pdf/abc"])
+
+
+class TestBaseManifest(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.base = os.path.join(self.path, "artigo")
+        os.makedirs(self.base)
+        self.mst = os.path.join(self.base, "artigo.mst")
+        with open(self.mst, "wb") as fp:
+            fp.write(b"a" * 10 + b"b" * 10 + b"c" * 5)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_changed_ranges_returns_new_files(self):
+        manifest = base_manifest.build_manifest(self.base, block_size=10)
+        self.assertEqual(
+            base_manifest.changed_ranges(None, manifest, 10),
+            {"artigo.mst": None})
+
+    def test_changed_ranges_returns_changed_blocks(self):
+        previous = base_manifest.build_manifest(self.base, block_size=10)
+        with open(self.mst, "r+b") as fp:
+            fp.seek(12)
+            fp.write(b"X")
+            fp.seek(25)
+            fp.write(b"d" * 10)
+        os.utime(self.mst, (1, 1))
+        current = base_manifest.build_manifest(
+            self.base, previous, block_size=10)
+        changes = base_manifest.changed_ranges(previous, current, 10)
+        self.assertEqual(changes, {"artigo.mst": [(10, 25)]})
+        self.assertEqual(base_manifest.changes_size(changes, current), 25)
+
+    def test_local_server_writes_only_changed_ranges(self):
+        server = remote_server.LocalServer(os.path.join(self.path, "web"))
+        server.sync(self.base, "/bases/artigo")
+        previous = base_manifest.build_manifest(self.base, block_size=10)
+        with open(self.mst, "r+b") as fp:
+            fp.seek(20)
+            fp.write(b"Z")
+        os.utime(self.mst, (1, 1))
+        current = base_manifest.build_manifest(
+            self.base, previous, block_size=10)
+        changes = base_manifest.changed_ranges(previous, current, 10)
+        result = server.sync(self.base, "/bases/artigo", files=changes)
+        self.assertEqual(result.transferred_bytes, 5)
+        with open(os.path.join(
+                self.path, "web", "bases", "artigo", "artigo.mst"), "rb") as fp:
+            self.assertEqual(fp.read(), b"a" * 10 + b"b" * 10 + b"Zcccc")
+
+
+class TestTransferWebsiteBases(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        local = os.path.join(self.path, "local")
+        for folder in ("artigo", "issue", "newissue", "title"):
+            os.makedirs(os.path.join(local, "bases", folder))
+            with open(os.path.join(
+                    local, "bases", folder, folder + ".mst"), "wb") as fp:
+                fp.write(b"x" * 100)
+        self.config = Mock(
+            is_enabled_transference=True,
+            transference_servers=[os.path.join(self.path, "server")],
+            transference_user="user",
+            transference_workers=2,
+            transference_attempts=1,
+            transference_journal=None,
+            transference_manifests_path=os.path.join(self.path, "manifests"),
+            local_web_app_path=local,
+            remote_web_app_path="/web")
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_transfer_website_bases_sends_only_changes(self):
+        transfer = filestransfer.SciELOWebFilesTransfer(self.config)
+        self.assertEqual(
+            transfer.transfer_website_bases(dry_run=True),
+            {"artigo": 100, "issue": 100, "newissue": 100, "title": 100})
+        self.assertFalse(os.path.isdir(os.path.join(self.path, "server")))
+        transfer.transfer_website_bases()
+        self.assertTrue(os.path.isfile(os.path.join(
+            self.path, "server", "web", "bases", "title", "title.mst")))
+        self.assertEqual(
+            transfer.transfer_website_bases(dry_run=True),
+            {"artigo": 0, "issue": 0, "newissue": 0, "title": 0})
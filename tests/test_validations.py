@@ -0,0 +1,56 @@
+import os
+import json
+import shutil
+import tempfile
+from unittest import TestCase
+
+from prodtools.reports import validation_status
+from prodtools.validations import validations
+from prodtools.validations.article_validations import ArticleValidations
+
+
+class TestValidationsResult(TestCase):
+
+    def test_as_dict_returns_summary_and_items(self):
+        result = validations.ValidationsResult()
+        result.message = "[ERROR] a [ERROR] b [WARNING] c"
+        result.items = [
+            validations.result_item(
+                "fpage", validation_status.STATUS_ERROR, "a")]
+        self.assertEqual(
+            result.as_dict(),
+            {"summary": {"error": 2, "warning": 1},
+             "items": [{"rule": "fpage", "status": "error", "message": "a"}]})
+
+    def test_result_item_keeps_xml_and_reference(self):
+        item = validations.result_item(
+            "source", validation_status.STATUS_FATAL_ERROR, "msg",
+            "<source/>", "B1")
+        self.assertEqual(item["status"], "fatalerror")
+        self.assertEqual(item["xml"], "<source/>")
+        self.assertEqual(item["reference"], "B1")
+
+
+class TestArticleValidations(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_as_dict_skips_groups_which_were_not_validated(self):
+        artval = ArticleValidations()
+        artval.xml_content_validations = validations.ValidationsResult()
+        artval.xml_content_validations.message = "[BLOCKING ERROR] x"
+        self.assertEqual(
+            artval.as_dict(),
+            {"content": {"summary": {"blockingerror": 1}, "items": []}})
+
+    def test_write_json_writes_compact_json(self):
+        filename = os.path.join(self.path, "a01.validations.json")
+        validations.write_json(filename, {"a": [1, "ç"]})
+        with open(filename, encoding="utf-8") as fp:
+            content = fp.read()
+        self.assertEqual(content, '{"a":[1,"ç"]}')
+        self.assertEqual(json.loads(content), {"a": [1, "ç"]})
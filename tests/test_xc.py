@@ -0,0 +1,32 @@
+from unittest import TestCase
+from unittest.mock import Mock
+
+from prodtools import xc
+from prodtools.server import transfer_manager
+
+
+class TestReceptionTransfer(TestCase):
+
+    def setUp(self):
+        self.reception = xc.Reception.__new__(xc.Reception)
+        self.reception.transfer = Mock()
+        self.reception.mailer = Mock()
+        self.failure = transfer_manager.TransferError([])
+
+    def test_website_transfer_failure_is_mailed_without_raising(self):
+        self.reception.transfer.transfer_website_files.side_effect = (
+            self.failure)
+        self.reception._update_website_files("pkg", "abc", "v1n1")
+        self.assertEqual(self.reception.mailer.mail_failure.call_count, 1)
+
+    def test_report_transfer_failure_is_mailed_without_raising(self):
+        self.reception.transfer.transfer_report_files.side_effect = (
+            self.failure)
+        self.reception._update_report_files("pkg", "abc", "v1n1")
+        self.assertEqual(self.reception.mailer.mail_failure.call_count, 1)
+
+    def test_other_errors_are_raised(self):
+        self.reception.transfer.transfer_website_files.side_effect = (
+            ValueError("bug"))
+        with self.assertRaises(ValueError):
+            self.reception._update_website_files("pkg", "abc", "v1n1")
@@ -21,3 +21,20 @@ class TestConfigurationOfXC(unittest.TestCase):
     def test_email_subject_conversion_failure_returns_none_if_config_is_empty(self):
         self.configuration._data = {}
         self.assertIsNone(self.configuration.email_subject_conversion_failure)
+
+    def test_blank_xc_workers_returns_default(self):
+        self.configuration._data = {"XC_WORKERS": None}
+        self.assertEqual(self.configuration.xc_workers, 1)
+
+    def test_blank_intake_limits_return_defaults(self):
+        self.configuration._data = {
+            "INTAKE_MAX_MEMBERS": None, "INTAKE_MAX_SIZE": None}
+        self.assertEqual(self.configuration.intake_max_members, 5000)
+        self.assertEqual(
+            self.configuration.intake_max_size, 2048 * 1024 * 1024)
+
+    def test_blank_transference_settings_return_defaults(self):
+        self.configuration._data = {
+            "TRANSFER_WORKERS": None, "TRANSFER_ATTEMPTS": None}
+        self.assertEqual(self.configuration.transference_workers, 4)
+        self.assertEqual(self.configuration.transference_attempts, 3)
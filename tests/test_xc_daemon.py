@@ -0,0 +1,70 @@
+import os
+import json
+import shutil
+import tempfile
+from unittest import TestCase
+from unittest.mock import Mock
+from urllib.request import urlopen
+
+from prodtools.server import xc_daemon
+
+
+class TestXCDaemon(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.reception = Mock()
+        self.reception.collection_acron = "scl"
+        self.reception.config.download_path = self.path
+        self.reception.config.title_db = os.path.join(self.path, "title")
+        self.reception.config.issue_db = os.path.join(self.path, "issue")
+        self.reception.queue.pending.return_value = 0
+        self.reception.worker_processors.return_value = []
+        self.reception.receive_package.return_value = {
+            "pkg1": True, "pkg2": False}
+        self.daemon = xc_daemon.XCDaemon(self.reception, health_port=0)
+
+    def tearDown(self):
+        self.daemon.close()
+        shutil.rmtree(self.path)
+
+    def test_run_once_does_nothing_if_there_is_no_package(self):
+        self.assertFalse(self.daemon.run_once())
+        self.reception.receive_package.assert_not_called()
+
+    def test_run_once_receives_packages_and_updates_metrics(self):
+        with open(os.path.join(self.path, "pkg.zip"), "wb") as fp:
+            fp.write(b"zip")
+        self.assertTrue(self.daemon.run_once())
+        metrics = self.daemon.metrics.as_dict()
+        self.assertEqual(metrics["runs"], 1)
+        self.assertEqual(metrics["packages_done"], 1)
+        self.assertEqual(metrics["packages_failed"], 1)
+
+    def test_run_once_calls_gerapadrao_after_packages(self):
+        daemon = xc_daemon.XCDaemon(
+            self.reception, health_port=0, force_gerapadrao=True)
+        self.assertFalse(daemon.run_once())
+        self.reception.gerapadrao.assert_not_called()
+        with open(os.path.join(self.path, "pkg.zip"), "wb") as fp:
+            fp.write(b"zip")
+        self.assertTrue(daemon.run_once())
+        self.reception.outbox_workers.wait.assert_called_with()
+        self.reception.gerapadrao.assert_called_once_with(True)
+
+    def test_refresh_discards_data_if_title_db_changes(self):
+        self.daemon.refresh()
+        self.reception.proc.refresh.assert_called_with(None)
+        with open(os.path.join(self.path, "title.mst"), "wb") as fp:
+            fp.write(b"mst")
+        self.daemon.refresh()
+        self.reception.proc.refresh.assert_called_with(0)
+
+    def test_health_endpoint(self):
+        self.daemon.start_health_server()
+        port = self.daemon._server.server_address[1]
+        url = "http://127.0.0.1:{}/health".format(port)
+        with urlopen(url) as response:
+            data = json.loads(response.read().decode("utf-8"))
+        self.assertEqual(data["status"], "running")
+        self.assertEqual(data["collection"], "scl")
@@ -0,0 +1,202 @@
+import os
+import json
+import shutil
+import tempfile
+from unittest import TestCase
+from unittest.mock import Mock
+
+from prodtools.server import xc_gerapadrao
+
+
+class TestGeraPadraoLock(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.lock_file = os.path.join(self.path, "gerapadrao.lock")
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_acquire_fails_while_other_holds_the_lock(self):
+        lock = xc_gerapadrao.GeraPadraoLock(self.lock_file)
+        other = xc_gerapadrao.GeraPadraoLock(self.lock_file)
+        self.assertTrue(lock.acquire())
+        try:
+            self.assertFalse(other.acquire())
+            self.assertEqual(other.holder()["pid"], os.getpid())
+        finally:
+            lock.release()
+        self.assertTrue(other.acquire())
+        other.release()
+
+    def test_permission_file_keeps_status(self):
+        lock = xc_gerapadrao.GeraPadraoLock(self.lock_file)
+        lock.acquire()
+        with open(self.lock_file) as fp:
+            self.assertEqual(fp.read(), "running")
+        lock.release()
+        with open(self.lock_file) as fp:
+            self.assertEqual(fp.read(), "FINISHED")
+
+    def test_heartbeat_updates_lock_file(self):
+        lock = xc_gerapadrao.GeraPadraoLock(
+            self.lock_file, heartbeat_interval=0.01)
+        lock.acquire()
+        try:
+            first = lock.holder()["heartbeat"]
+            lock._stop.wait(0.1)
+            self.assertNotEqual(lock.holder()["heartbeat"], first)
+        finally:
+            lock.release()
+
+
+class TestIssueChanges(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.serial_path = os.path.join(self.path, "serial")
+        self.state_file = os.path.join(self.path, "state.json")
+        for issue in ("v1n1", "v1n2"):
+            base_path = os.path.join(self.serial_path, "abc", issue, "base")
+            os.makedirs(base_path)
+            with open(os.path.join(base_path, issue + ".mst"), "w") as fp:
+                fp.write(issue)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_select_skips_unchanged_issues(self):
+        changes = xc_gerapadrao.IssueChanges(self.state_file, self.serial_path)
+        items = ["abc v1n1", "abc v1n2", "abc v1n3 del"]
+        selected, skipped, fingerprints = changes.select(items)
+        self.assertEqual(selected, items)
+        changes.update(fingerprints)
+
+        mst = os.path.join(self.serial_path, "abc", "v1n2", "base", "v1n2.mst")
+        with open(mst, "a") as fp:
+            fp.write("changed")
+        changes = xc_gerapadrao.IssueChanges(self.state_file, self.serial_path)
+        selected, skipped, fingerprints = changes.select(items)
+        self.assertEqual(selected, ["abc v1n2", "abc v1n3 del"])
+        self.assertEqual(skipped, ["abc v1n1"])
+
+    def test_select_returns_all_issues_if_sources_changed(self):
+        source = os.path.join(self.path, "title")
+        with open(source + ".mst", "w") as fp:
+            fp.write("title")
+        changes = xc_gerapadrao.IssueChanges(
+            self.state_file, self.serial_path, [source])
+        changes.update(changes.select(["abc v1n1"])[2])
+        with open(source + ".mst", "a") as fp:
+            fp.write("changed")
+        selected, skipped, fingerprints = changes.select(["abc v1n1"])
+        self.assertEqual(selected, ["abc v1n1"])
+
+    def test_select_with_force_returns_unchanged_issues(self):
+        changes = xc_gerapadrao.IssueChanges(self.state_file, self.serial_path)
+        changes.update(changes.select(["abc v1n1"])[2])
+        selected, skipped, fingerprints = changes.select(
+            ["abc v1n1"], force=True)
+        self.assertEqual((selected, skipped), (["abc v1n1"], []))
+
+    def test_register_failure_gives_up_after_max_attempts(self):
+        changes = xc_gerapadrao.IssueChanges(self.state_file, self.serial_path)
+        fingerprints = changes.select(["abc v1n1"])[2]
+        for i in range(xc_gerapadrao.MAX_ATTEMPTS - 1):
+            self.assertEqual(
+                changes.register_failure(fingerprints), (["abc v1n1"], []))
+        self.assertEqual(
+            changes.register_failure(fingerprints), ([], ["abc v1n1"]))
+
+
+class TestGeraPadrao(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.config = Mock(
+            gerapadrao_permission_file=os.path.join(self.path, "lock"),
+            gerapadrao_state_file=os.path.join(self.path, "state.json"),
+            gerapadrao_history_file=os.path.join(self.path, "history.jsonl"),
+            gerapadrao_log_file=os.path.join(self.path, "gerapadrao.log"),
+            gerapadrao_proc_path=self.path,
+            gerapadrao_scilista=os.path.join(self.path, "scilista.lst"),
+            collection_scilista=os.path.join(self.path, "col_scilista.lst"),
+            serial_path=os.path.join(self.path, "serial"),
+            title_db=None,
+            issue_db=None,
+            is_enabled_transference=False,
+            email_subject_gerapadrao="Gerapadrao",
+            email_text_gerapadrao="",
+        )
+        base_path = os.path.join(self.path, "serial", "abc", "v1n1", "base")
+        os.makedirs(base_path)
+        with open(os.path.join(base_path, "v1n1.mst"), "w") as fp:
+            fp.write("v1n1")
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def write_script(self, returncode):
+        # sem shebang nem permissão de execução, como o GeraPadrao.bat
+        script = os.path.join(self.path, "GeraPadrao.bat")
+        with open(script, "w") as fp:
+            fp.write("echo running\nexit {}\n".format(returncode))
+
+    def test_script_args_respects_shebang(self):
+        self.write_script(0)
+        self.assertEqual(
+            xc_gerapadrao.script_args(self.path), ["sh", "./GeraPadrao.bat"])
+        with open(os.path.join(self.path, "GeraPadrao.bat"), "w") as fp:
+            fp.write("#!/bin/bash\nexit 0\n")
+        self.assertEqual(
+            xc_gerapadrao.script_args(self.path), ["./GeraPadrao.bat"])
+
+    def write_scilista(self, content):
+        with open(self.config.collection_scilista, "w") as fp:
+            fp.write(content)
+
+    def history(self):
+        with open(self.config.gerapadrao_history_file) as fp:
+            return [json.loads(line) for line in fp]
+
+    def test_run_registers_exit_code_and_skips_unchanged_issues(self):
+        self.write_script(0)
+        self.write_scilista("abc v1n1\n")
+        gerapadrao = xc_gerapadrao.GeraPadrao("abc", self.config, None)
+        gerapadrao.run()
+        self.assertEqual(self.history()[0]["returncode"], 0)
+        self.assertEqual(self.history()[0]["items"], ["abc v1n1"])
+
+        self.write_scilista("abc v1n1\n")
+        xc_gerapadrao.GeraPadrao("abc", self.config, None).run()
+        self.assertEqual(len(self.history()), 1)
+        self.assertFalse(os.path.isfile(self.config.collection_scilista))
+
+    def test_run_keeps_items_in_scilista_if_gerapadrao_fails(self):
+        self.write_script(3)
+        self.write_scilista("abc v1n1\n")
+        mailer = Mock()
+        xc_gerapadrao.GeraPadrao("abc", self.config, mailer).run()
+        self.assertEqual(self.history()[0]["returncode"], 3)
+        with open(self.config.collection_scilista) as fp:
+            self.assertEqual(fp.read(), "abc v1n1\n")
+        self.assertIn("failed", mailer.send_message.call_args[0][1])
+
+    def test_run_removes_items_which_fail_repeatedly(self):
+        self.write_script(3)
+        self.write_scilista("abc v1n1\n")
+        mailer = Mock()
+        for i in range(xc_gerapadrao.MAX_ATTEMPTS):
+            xc_gerapadrao.GeraPadrao("abc", self.config, mailer).run()
+        self.assertEqual(len(self.history()), xc_gerapadrao.MAX_ATTEMPTS)
+        self.assertFalse(os.path.isfile(self.config.collection_scilista))
+        self.assertIn(
+            "Removed from scilista", mailer.send_message.call_args[0][2])
+
+    def test_run_with_force_processes_unchanged_issues(self):
+        self.write_script(0)
+        self.write_scilista("abc v1n1\n")
+        xc_gerapadrao.GeraPadrao("abc", self.config, None).run()
+        self.write_scilista("abc v1n1\n")
+        xc_gerapadrao.GeraPadrao("abc", self.config, None).run(force=True)
+        self.assertEqual(len(self.history()), 2)